@@ -1,5 +1,29 @@
+import argparse
 from microservice_implementation import run_addition_server
 
 if __name__ == "__main__":
-    run_addition_server()
-
+    parser = argparse.ArgumentParser(description="Addition microservice")
+    parser.add_argument("--port", type=int, default=50051,
+                        help="Port to listen on; run several replicas on different ports")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes sharing the port via SO_REUSEPORT")
+    parser.add_argument("--max-workers", type=int,
+                        help="gRPC handler threads per worker process (default 10)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Serve with grpc.aio and offload queue writes to a thread pool")
+    parser.add_argument("--batch-window-ms", type=float, default=0,
+                        help="Coalesce concurrent requests arriving within this window (0 disables)")
+    args = parser.parse_args()
+    if args.use_async:
+        # grpc.aio serves RPCs on one event loop and has no micro-batcher
+        if args.max_workers is not None or args.batch_window_ms:
+            parser.error("--max-workers and --batch-window-ms do not apply with --async")
+        from async_microservice_implementation import run_addition_server_async
+        run_addition_server_async(port=args.port, workers=args.workers)
+    else:
+        run_addition_server(
+            port=args.port,
+            workers=args.workers,
+            max_workers=args.max_workers or 10,
+            batch_window=args.batch_window_ms / 1000
+        )
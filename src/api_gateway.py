@@ -1,13 +1,32 @@
 import os
+import hmac
+import math
+import time
 import uuid
+import decimal
+import argparse
+import itertools
+import threading
+import multiprocessing
 import grpc
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
 import calculator_pb2
 import calculator_pb2_grpc
-from mom_implementation import MessageBroker
+from mom_implementation import (
+    QueueFullError, parse_priority, DEFAULT_TENANT, PRIORITY_NAMES,
+    TERMINAL_STATUSES
+)
+from metrics import Metrics
+import tracing
+import profiling
+import grpc_options
+import broker_client
+from load_balancer import EndpointPool
+from expression import parse_expression
 
 app = Flask(__name__)
+metrics = Metrics()
 
 # Configuration
 SERVICE_PORTS = {
@@ -17,6 +36,174 @@ SERVICE_PORTS = {
     'divide': 50054
 }
 
+# Replicas serving each operation. Override with a comma separated list, e.g.
+# SERVICE_ENDPOINTS_ADD=localhost:50051,localhost:50061
+SERVICE_ENDPOINTS = {
+    operation: os.environ.get(
+        f'SERVICE_ENDPOINTS_{operation.upper()}', f'localhost:{port}'
+    ).split(',')
+    for operation, port in SERVICE_PORTS.items()
+}
+
+# round_robin, least_outstanding or power_of_two
+LOAD_BALANCER = os.environ.get('LOAD_BALANCER', 'power_of_two')
+
+endpoint_pools = {
+    operation: EndpointPool(addresses, LOAD_BALANCER)
+    for operation, addresses in SERVICE_ENDPOINTS.items()
+}
+
+# Replicas of the expression service (expression_service.py)
+EXPRESSION_ENDPOINTS = os.environ.get('EXPRESSION_ENDPOINTS', 'localhost:50055').split(',')
+expression_pool = EndpointPool(EXPRESSION_ENDPOINTS, LOAD_BALANCER)
+
+# MOM queue consumed by the service behind each operation
+QUEUE_NAMES = {
+    'add': 'addition',
+    'subtract': 'subtraction',
+    'multiply': 'multiplication',
+    'divide': 'division',
+    'evaluate': 'expressions'
+}
+
+# gRPC method for each operation; the requested precision selects the variant
+GRPC_METHODS = {
+    'add': 'Add',
+    'subtract': 'Subtract',
+    'multiply': 'Multiply',
+    'divide': 'Divide'
+}
+
+# 'double' matches Python floats and is the default; 'float' is the original
+# 32-bit variant; 'decimal' keeps every digit at an extra cost
+PRECISION_VARIANTS = {
+    'float': ('', calculator_pb2.CalculationRequest),
+    'double': ('Double', calculator_pb2.DoubleCalculationRequest),
+    'decimal': ('Decimal', calculator_pb2.DecimalCalculationRequest)
+}
+DEFAULT_PRECISION = 'double'
+
+# Default end-to-end deadline (seconds) for each operation, including retries
+SERVICE_TIMEOUTS = {
+    'add': 5.0,
+    'subtract': 5.0,
+    'multiply': 5.0,
+    'divide': 5.0,
+    'evaluate': 30.0
+}
+
+# Upper bound for deadlines requested by clients via X-Request-Timeout / "timeout"
+MAX_REQUEST_TIMEOUT = 30.0
+RETRY_INTERVAL = 1.0
+# Seconds clients are asked to wait when a full queue sheds their request
+SHED_RETRY_AFTER = int(os.environ.get('SHED_RETRY_AFTER', '5'))
+PRIORITY_LABELS = {value: name for name, value in PRIORITY_NAMES.items()}
+
+# Long-poll (?wait=) and event stream (?timeout=) limits for queued operations
+DEFAULT_WATCH_TIMEOUT = 60.0
+MAX_WATCH_TIMEOUT = 300.0
+SSE_KEEPALIVE_INTERVAL = 15.0
+# Long-polls and event streams each hold a request thread until they end, so
+# only this many may be open per worker; 0 allows half of --threads
+MAX_WATCHERS = int(os.environ.get('MAX_WATCHERS', '0'))
+WATCHER_RETRY_AFTER = 5
+
+# Token required in X-Admin-Token by the /admin routes; without one they only
+# answer requests from this host
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def get_request_timeout(operation, data):
+    """Resolve the deadline for this request from the header, body or per-operation default"""
+    requested = request.headers.get('X-Request-Timeout', data.get('timeout'))
+    if requested is None:
+        return SERVICE_TIMEOUTS.get(operation, MAX_REQUEST_TIMEOUT)
+
+    try:
+        timeout = float(requested)
+    except (TypeError, ValueError):
+        raise ValueError(f"Request timeout must be a number of seconds, got {requested!r}")
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError("Request timeout must be a positive number of seconds")
+    return min(timeout, MAX_REQUEST_TIMEOUT)
+
+# gRPC channels are expensive to set up, so each worker process keeps a pool per
+# service and reuses it for every request. Channels never survive a fork, hence
+# the pool is keyed by the owning pid.
+_channels = {}
+_channels_pid = None
+_channels_lock = threading.Lock()
+_channel_counter = itertools.count()
+
+# A channel is one HTTP/2 connection, i.e. one pre-forked worker on the service
+# side; open several to spread load over SO_REUSEPORT worker processes
+CHANNELS_PER_ENDPOINT = int(os.environ.get('CHANNELS_PER_ENDPOINT', '1'))
+
+
+def get_endpoint_channels(target):
+    """Return the pooled channels for a service address, creating them on first use"""
+    global _channels, _channels_pid
+    with _channels_lock:
+        if _channels_pid != os.getpid():
+            _channels = {}
+            _channels_pid = os.getpid()
+        channels = _channels.get(target)
+        if channels is None:
+            # A local subchannel pool stops gRPC from collapsing them into one connection
+            channels = _channels[target] = [
+                grpc.insecure_channel(target, options=grpc_options.channel_options(
+                    ('grpc.use_local_subchannel_pool', 1)
+                ))
+                for _ in range(CHANNELS_PER_ENDPOINT)
+            ]
+        return channels
+
+
+def get_channel(target):
+    """Return the next pooled channel for a service address"""
+    channels = get_endpoint_channels(target)
+    return channels[next(_channel_counter) % len(channels)]
+
+
+def warm_channels(timeout=1):
+    """Connect every service channel up front so the first requests skip the handshake"""
+    for service, addresses in SERVICE_ENDPOINTS.items():
+        for address in addresses:
+            try:
+                for channel in get_endpoint_channels(address):
+                    grpc.channel_ready_future(channel).result(timeout=timeout)
+            except grpc.FutureTimeoutError:
+                print(f"Service {service} at {address} is not reachable yet")
+
+# Every request gets a span, continuing the caller's trace if it sent a traceparent
+@app.before_request
+def start_request_span():
+    if tracing.enabled():
+        g.trace_span = tracing.start_span(
+            f"{request.method} {request.url_rule.rule if request.url_rule else request.path}",
+            parent=request.headers.get(tracing.TRACEPARENT_HEADER)
+        )
+        g.trace_token = tracing.activate(g.trace_span)
+    if profiling.enabled():
+        g.profile_start = time.perf_counter()
+
+@app.after_request
+def end_request_span(response):
+    profile_start = g.pop('profile_start', None)
+    if profile_start is not None:
+        profiling.record(
+            f"{request.method} {request.url_rule.rule if request.url_rule else request.path}",
+            time.perf_counter() - profile_start
+        )
+    trace_span = g.pop('trace_span', None)
+    if trace_span is not None:
+        trace_span.set_attribute('http.status_code', response.status_code)
+        response.headers[tracing.TRACEPARENT_HEADER] = trace_span.traceparent
+        tracing.deactivate(g.pop('trace_token'))
+        trace_span.end()
+    return response
+
 # Health check endpoints for services
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -25,18 +212,67 @@ def health_check():
 @app.route('/services/health', methods=['GET'])
 def services_health_check():
     health_status = {}
+    replicas = {}
     
-    for service, port in SERVICE_PORTS.items():
-        try:
-            # Try to establish a gRPC connection to check if service is available
-            with grpc.insecure_channel(f'localhost:{port}') as channel:
-                future = grpc.channel_ready_future(channel)
+    for service, addresses in SERVICE_ENDPOINTS.items():
+        replicas[service] = {}
+        for address in addresses:
+            try:
+                # Try to establish a gRPC connection to check if the replica is available
+                future = grpc.channel_ready_future(get_channel(address))
                 future.result(timeout=1)  # Wait for 1 second
-                health_status[service] = "up"
-        except Exception:
-            health_status[service] = "down"
+                replicas[service][address] = "up"
+            except Exception:
+                replicas[service][address] = "down"
+        # A service is up while at least one of its replicas is
+        health_status[service] = "up" if "up" in replicas[service].values() else "down"
     
-    return jsonify({"services": health_status}), 200
+    return jsonify({"services": health_status, "replicas": replicas}), 200
+
+def shed_response(operation, priority, operation_id):
+    """429 for a request the MOM backlog has no room for"""
+    priority_name = PRIORITY_LABELS.get(priority, str(priority))
+    metrics.increment(f"shed.{operation}")
+    metrics.increment(f"shed.{operation}.{priority_name}")
+    response = jsonify({
+        "error": "Service unavailable and its queue is full. Retry later.",
+        "operation_id": operation_id,
+        "status": "rejected"
+    })
+    response.headers['Retry-After'] = str(SHED_RETRY_AFTER)
+    return response, 429
+
+def client_operation_id(data):
+    """The operation ID chosen by the client, or a new one
+    
+    The MOM deduplicates on it, so retries of a request with the same ID
+    are computed once and get the same answer.
+    """
+    operation_id = request.headers.get('Idempotency-Key', data.get('operation_id'))
+    return str(operation_id) if operation_id else str(uuid.uuid4())
+
+def conflicts_with(message_data, fields):
+    """Whether a stored message was queued with other arguments than fields
+
+    Fields the message does not record, like number_type on messages
+    batched by older services, are not compared.
+    """
+    content = message_data['content']
+    return any(key in content and content[key] != value for key, value in fields.items())
+
+def conflict_response(operation_id):
+    return jsonify({
+        "error": "operation_id / Idempotency-Key already used for a request with other arguments",
+        "operation_id": operation_id
+    }), 422
+
+def reused_operation_id(data, operation_id, fields):
+    """Whether a client-chosen operation ID already belongs to a different request,
+    whose result a retry would otherwise be given"""
+    if not (request.headers.get('Idempotency-Key') or data.get('operation_id')):
+        return False
+    _, _, op = find_operation(operation_id)
+    return op is not None and conflicts_with(op, fields)
 
 @app.route('/calculate', methods=['POST'])
 def calculate():
@@ -53,11 +289,36 @@ def calculate():
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
         operation = data['operation'].lower()
-        num1 = float(data['num1'])
-        num2 = float(data['num2'])
+        precision = str(data.get('precision', DEFAULT_PRECISION)).lower()
+        if precision not in PRECISION_VARIANTS:
+            return jsonify({
+                "error": f"Unsupported precision: {precision}",
+                "supported_precisions": list(PRECISION_VARIANTS.keys())
+            }), 400
+        
+        if precision == 'decimal':
+            # Keep operands as strings so no digit is lost on the way
+            num1 = str(data['num1'])
+            num2 = str(data['num2'])
+            try:
+                decimal.Decimal(num1)
+                decimal.Decimal(num2)
+            except decimal.InvalidOperation:
+                return jsonify({"error": "Operands must be decimal numbers"}), 400
+        else:
+            num1 = float(data['num1'])
+            num2 = float(data['num2'])
+        
+        # Scheduling attributes used if the request has to wait in the MOM
+        try:
+            priority = parse_priority(data.get('priority'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        tenant = request.headers.get('X-Tenant-ID', data.get('tenant', DEFAULT_TENANT))
         
-        # Generate a unique operation ID
-        operation_id = str(uuid.uuid4())
+        # A client retrying a request sends the same operation ID (or
+        # Idempotency-Key header) and gets the result of the first attempt
+        operation_id = client_operation_id(data)
         
         # Check if operation is supported
         if operation not in SERVICE_PORTS:
@@ -66,34 +327,67 @@ def calculate():
                 "supported_operations": list(SERVICE_PORTS.keys())
             }), 400
         
-        port = SERVICE_PORTS[operation]
+        pool = endpoint_pools[operation]
+        queue = broker_client.get_queue(QUEUE_NAMES[operation])
+        
+        # With every replica down the request can only be queued; reject it
+        # right away when the backlog has no room for its priority
+        if pool.all_failing() and not queue.has_capacity(priority):
+            return shed_response(operation, priority, operation_id)
+        
+        try:
+            timeout = get_request_timeout(operation, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        start_time = time.monotonic()
+        deadline = start_time + timeout
         
         # Create gRPC request
-        calculation_request = calculator_pb2.CalculationRequest(
+        method_suffix, request_class = PRECISION_VARIANTS[precision]
+        method_name = GRPC_METHODS[operation] + method_suffix
+        calculation_request = request_class(
             num1=num1,
             num2=num2,
             operation_id=operation_id
         )
+        if precision == 'decimal':
+            calculation_request.precision = int(data.get('digits', 0))
+        
+        # Operands as the service stores them (float precision rounds to 32 bits)
+        arguments = {
+            'num1': calculation_request.num1,
+            'num2': calculation_request.num2,
+            'operation': operation,
+            'number_type': precision
+        }
+        if reused_operation_id(data, operation_id, arguments):
+            return conflict_response(operation_id)
         
         # Set up retries for resilience
         max_retries = 3
         retry_count = 0
+        deadline_exceeded = False
+        failed_endpoints = []
         
         while retry_count < max_retries:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                deadline_exceeded = True
+                break
+            
+            # Prefer a replica that has not already failed this request
+            endpoint = pool.pick(exclude=failed_endpoints)
             try:
-                with grpc.insecure_channel(f'localhost:{port}') as channel:
-                    if operation == 'add':
-                        stub = calculator_pb2_grpc.CalculatorStub(channel)
-                        response = stub.Add(calculation_request)
-                    elif operation == 'subtract':
-                        stub = calculator_pb2_grpc.CalculatorStub(channel)
-                        response = stub.Subtract(calculation_request)
-                    elif operation == 'multiply':
-                        stub = calculator_pb2_grpc.CalculatorStub(channel)
-                        response = stub.Multiply(calculation_request)
-                    elif operation == 'divide':
-                        stub = calculator_pb2_grpc.CalculatorStub(channel)
-                        response = stub.Divide(calculation_request)
+                with tracing.span(f"grpc.client {method_name}", endpoint=endpoint.address,
+                                  attempt=retry_count + 1), pool.track(endpoint):
+                    with tracing.span("gateway.get_channel"):
+                        stub = calculator_pb2_grpc.CalculatorStub(get_channel(endpoint.address))
+                    response = getattr(stub, method_name)(
+                        calculation_request, timeout=remaining, metadata=tracing.grpc_metadata(),
+                        compression=grpc_options.call_compression(calculation_request)
+                    )
+                
+                metrics.observe(f"calculate.{operation}", time.monotonic() - start_time)
                 
                 # Check if operation was successful
                 if response.success:
@@ -102,6 +396,7 @@ def calculate():
                         "num1": num1,
                         "num2": num2,
                         "result": response.result,
+                        "precision": precision,
                         "operation_id": operation_id
                     }), 200
                 else:
@@ -111,56 +406,446 @@ def calculate():
                     }), 400
                     
             except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+                    # The budget is spent; retrying cannot succeed in time
+                    deadline_exceeded = True
+                    break
+                
                 retry_count += 1
                 if retry_count >= max_retries:
-                    # Log the operation to the MOM for later processing
-                    queue = MessageBroker().get_queue(operation)
-                    queue.enqueue({
-                        'num1': num1,
-                        'num2': num2,
-                        'operation': operation,
-                        'operation_id': operation_id
-                    })
-                    
-                    return jsonify({
-                        "error": f"Service unavailable after {max_retries} attempts. Request queued for later processing.",
-                        "operation_id": operation_id,
-                        "status": "queued"
-                    }), 503
+                    break
                 
-                # Wait before retrying
-                import time
-                time.sleep(1)
+                # Another replica may take the retry right away
+                failed_endpoints.append(endpoint)
+                if len(failed_endpoints) < len(pool.endpoints):
+                    continue
+                failed_endpoints = []
+                
+                # Wait before retrying, but never past the deadline
+                sleep_time = min(RETRY_INTERVAL, deadline - time.monotonic())
+                if sleep_time > 0:
+                    with tracing.span("gateway.retry_sleep", seconds=round(sleep_time, 3)):
+                        time.sleep(sleep_time)
+        
+        # Log the operation to the MOM for later processing by the service
+        message = dict(arguments, operation_id=operation_id)
+        if precision == 'decimal' and calculation_request.precision:
+            message['precision'] = calculation_request.precision
+        try:
+            _, earlier = queue.enqueue_operation(message, priority=priority, tenant=tenant)
+        except QueueFullError:
+            return shed_response(operation, priority, operation_id)
+        if earlier is not None and conflicts_with(earlier, arguments):
+            return conflict_response(operation_id)
+        if earlier is not None and earlier['status'] == 'completed':
+            return jsonify({
+                "operation": operation,
+                "num1": num1,
+                "num2": num2,
+                "result": earlier['result'],
+                "precision": precision,
+                "operation_id": operation_id
+            }), 200
+        
+        elapsed = time.monotonic() - start_time
+        metrics.observe(f"calculate.{operation}", elapsed)
+        
+        if deadline_exceeded:
+            metrics.increment(f"deadline_exceeded.{operation}")
+            metrics.observe(f"deadline_exceeded.{operation}", elapsed)
+            return jsonify({
+                "error": f"Deadline of {timeout}s exceeded. Request queued for later processing.",
+                "operation_id": operation_id,
+                "status": "queued"
+            }), 504
+        
+        return jsonify({
+            "error": f"Service unavailable after {max_retries} attempts. Request queued for later processing.",
+            "operation_id": operation_id,
+            "status": "queued"
+        }), 503
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Endpoint to check the status of a queued operation
-@app.route('/operation/<operation_id>', methods=['GET'])
-def check_operation_status(operation_id):
-    # Check all service queues for the operation
-    for service in SERVICE_PORTS.keys():
-        queue = MessageBroker().get_queue(service)
-        
-        # This is a simplistic implementation - in a real system you'd have
-        # a more efficient way to look up operations by ID
-        pending_operations = queue.get_pending_operations()
-        for op in pending_operations:
-            if op['content'].get('operation_id') == operation_id:
+# Evaluate a whole expression such as "(a + b) * (c - d) / e" on the expression service
+@app.route('/evaluate', methods=['POST'])
+def evaluate():
+    try:
+        data = request.get_json()
+        
+        if not data or 'expression' not in data:
+            return jsonify({"error": "Missing required field: expression"}), 400
+        
+        expression = str(data['expression'])
+        variables = {name: str(value) for name, value in (data.get('variables') or {}).items()}
+        precision = str(data.get('precision', DEFAULT_PRECISION)).lower()
+        if precision not in ('double', 'decimal'):
+            return jsonify({
+                "error": f"Unsupported precision: {precision}",
+                "supported_precisions": ['double', 'decimal']
+            }), 400
+        
+        # Reject bad input here rather than after a round trip
+        try:
+            parse_expression(expression, variables, decimal.Decimal if precision == 'decimal' else float)
+            priority = parse_priority(data.get('priority'))
+        except (ValueError, decimal.InvalidOperation) as e:
+            return jsonify({"error": str(e) or "Invalid number in expression"}), 400
+        tenant = request.headers.get('X-Tenant-ID', data.get('tenant', DEFAULT_TENANT))
+        
+        operation_id = client_operation_id(data)
+        try:
+            timeout = get_request_timeout('evaluate', data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        start_time = time.monotonic()
+        evaluate_request = calculator_pb2.ExpressionRequest(
+            expression=expression,
+            variables=variables,
+            operation_id=operation_id,
+            precision=precision,
+            digits=int(data.get('digits', 0))
+        )
+        arguments = {
+            'expression': expression,
+            'variables': variables,
+            'precision': precision,
+            'digits': evaluate_request.digits
+        }
+        if reused_operation_id(data, operation_id, arguments):
+            return conflict_response(operation_id)
+        
+        # Attempts on other replicas share one deadline
+        deadline = start_time + timeout
+        failed_endpoints = []
+        for _ in expression_pool.endpoints:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Spent on failed replicas; queue the evaluation like below
+                break
+            endpoint = expression_pool.pick(exclude=failed_endpoints)
+            try:
+                with tracing.span("grpc.client Evaluate", endpoint=endpoint.address), \
+                        expression_pool.track(endpoint):
+                    stub = calculator_pb2_grpc.ExpressionEvaluatorStub(get_channel(endpoint.address))
+                    response = stub.Evaluate(
+                        evaluate_request, timeout=remaining, metadata=tracing.grpc_metadata(),
+                        compression=grpc_options.call_compression(evaluate_request)
+                    )
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+                    # The service keeps going; the result can be watched for
+                    metrics.increment("deadline_exceeded.evaluate")
+                    return jsonify({
+                        "error": f"Deadline of {timeout}s exceeded. Evaluation continues.",
+                        "operation_id": operation_id,
+                        "status": "processing"
+                    }), 504
+                failed_endpoints.append(endpoint)
+                continue
+            
+            metrics.observe("evaluate", time.monotonic() - start_time)
+            if response.success:
                 return jsonify({
+                    "expression": expression,
+                    "result": response.result if precision == 'decimal' else float(response.result),
+                    "precision": precision,
                     "operation_id": operation_id,
-                    "status": op['status'],
-                    "service": service,
-                    "timestamp": op['timestamp']
+                    "steps": response.steps,
+                    "reused_steps": response.reused_steps
                 }), 200
+            if response.queued:
+                return jsonify({
+                    "error": response.error_message,
+                    "operation_id": operation_id,
+                    "status": "queued"
+                }), 503
+            return jsonify({"error": response.error_message, "operation_id": operation_id}), 400
+        
+        # The expression service is down; it picks the evaluation up from the MOM
+        queue = broker_client.get_queue(QUEUE_NAMES['evaluate'])
+        try:
+            _, earlier = queue.enqueue_operation(
+                dict(arguments, operation='evaluate', operation_id=operation_id),
+                priority=priority, tenant=tenant
+            )
+        except QueueFullError:
+            return shed_response('evaluate', priority, operation_id)
+        if earlier is not None and conflicts_with(earlier, arguments):
+            return conflict_response(operation_id)
+        if earlier is not None and earlier['status'] == 'completed':
+            result = earlier['result']
+            return jsonify({
+                "expression": expression,
+                "result": result if precision == 'decimal' else float(result),
+                "precision": precision,
+                "operation_id": operation_id
+            }), 200
+        
+        return jsonify({
+            "error": "Expression service unavailable. Evaluation queued for later processing.",
+            "operation_id": operation_id,
+            "status": "queued"
+        }), 503
     
-    return jsonify({
-        "error": f"Operation ID {operation_id} not found or already processed"
-    }), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Gateway metrics, including tail latency of deadline-exceeded calls
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    snapshot = metrics.snapshot()
+    snapshot["load_balancing"] = {
+        operation: pool.stats() for operation, pool in endpoint_pools.items()
+    }
+    snapshot["load_balancing"]["evaluate"] = expression_pool.stats()
+    snapshot["queues"] = {}
+    for operation, queue_name in QUEUE_NAMES.items():
+        queue = broker_client.get_queue(queue_name)
+        depth, size_bytes = queue.backlog_stats()
+        snapshot["queues"][operation] = {
+            "depth": depth,
+            "bytes": size_bytes,
+            "max_depth": queue.max_depth,
+            "max_bytes": queue.max_bytes,
+            "shards": len(queue.shards)
+        }
+    return jsonify(snapshot), 200
+
+def find_operation(operation_id):
+    """Return (service, queue, message_data) for a queued operation, or Nones"""
+    # This is a simplistic implementation - in a real system you'd have
+    # a more efficient way to look up operations by ID
+    for service, queue_name in QUEUE_NAMES.items():
+        queue = broker_client.get_queue(queue_name)
+        op = queue.find_operation(operation_id)
+        if op is not None:
+            return service, queue, op
+    return None, None, None
+
+def operation_payload(service, op):
+    """JSON view of a queued operation and, once known, its outcome"""
+    payload = {
+        "operation_id": op['content'].get('operation_id'),
+        "status": op['status'],
+        "service": service,
+        "priority": op.get('priority'),
+        "tenant": op.get('tenant'),
+        "timestamp": op['timestamp']
+    }
+    if op['status'] == 'completed':
+        payload["result"] = op.get('result')
+    elif op['status'] == 'failed':
+        payload["error"] = op.get('result')
+    elif op['status'] == 'dead_letter':
+        # Poison messages end up in the dead-letter queue
+        payload["attempts"] = op.get('attempts', 0)
+        payload["reason"] = op.get('dead_letter_reason')
+    return payload
+
+def get_wait_time(name, default):
+    try:
+        return max(0.0, min(float(request.args.get(name, default)), MAX_WATCH_TIMEOUT))
+    except ValueError:
+        return default
+
+# Set by run_production_server before workers fork; unlimited on the dev server
+_watcher_slots = None
+
+def set_watcher_limit(threads):
+    global _watcher_slots
+    limit = MAX_WATCHERS or max(1, threads // 2)
+    _watcher_slots = threading.BoundedSemaphore(limit)
+    print(f"Gateway serves at most {limit} long-polls/event streams per worker")
+
+def acquire_watcher():
+    """Claim a watcher slot; False once the worker has MAX_WATCHERS open"""
+    return _watcher_slots is None or _watcher_slots.acquire(blocking=False)
+
+def release_watcher():
+    if _watcher_slots is not None:
+        _watcher_slots.release()
+
+def watchers_busy_response():
+    response = jsonify({"error": "Too many clients are waiting for operations; retry later"})
+    response.headers['Retry-After'] = str(WATCHER_RETRY_AFTER)
+    return response, 503
+
+# Endpoint to check the status of a queued operation. With ?wait=N it long-polls,
+# answering as soon as the operation finishes or after N seconds
+@app.route('/operation/<operation_id>', methods=['GET'])
+def check_operation_status(operation_id):
+    service, queue, op = find_operation(operation_id)
+    if op is None:
+        return jsonify({"error": f"Operation ID {operation_id} not found"}), 404
+    
+    wait = get_wait_time('wait', 0)
+    if wait > 0 and op['status'] not in TERMINAL_STATUSES:
+        if not acquire_watcher():
+            return watchers_busy_response()
+        try:
+            op = queue.wait_for_completion(op['id'], wait) or op
+        finally:
+            release_watcher()
+    return jsonify(operation_payload(service, op)), 200
+
+def sse_event(payload):
+    return f"event: status\ndata: {json.dumps(payload)}\n\n"
+
+# Server-Sent Events stream of an operation's status, closed once it finishes
+@app.route('/operation/<operation_id>/events', methods=['GET'])
+def stream_operation_status(operation_id):
+    service, queue, op = find_operation(operation_id)
+    if op is None:
+        return jsonify({"error": f"Operation ID {operation_id} not found"}), 404
+    
+    timeout = get_wait_time('timeout', DEFAULT_WATCH_TIMEOUT)
+    
+    def generate(op):
+        yield sse_event(operation_payload(service, op))
+        deadline = time.monotonic() + timeout
+        while op['status'] not in TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield f"event: timeout\ndata: {json.dumps({'operation_id': operation_id})}\n\n"
+                return
+            latest = queue.wait_for_completion(op['id'], min(remaining, SSE_KEEPALIVE_INTERVAL))
+            if latest is None:
+                return
+            if latest['status'] != op['status']:
+                yield sse_event(operation_payload(service, latest))
+            else:
+                # Comment line that keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+            op = latest
+    
+    if not acquire_watcher():
+        return watchers_busy_response()
+    response = Response(generate(op), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # The server closes the response when the stream ends or the client leaves
+    response.call_on_close(release_watcher)
+    return response
+
+# Messages a service could not process within the redelivery limit
+@app.route('/queues/<operation>/dead-letters', methods=['GET'])
+def list_dead_letters(operation):
+    if operation not in QUEUE_NAMES:
+        return jsonify({"error": f"Unsupported operation: {operation}"}), 400
+    
+    queue = broker_client.get_queue(QUEUE_NAMES[operation])
+    return jsonify({"operation": operation, "messages": queue.get_dead_letters()}), 200
+
+def admin_forbidden():
+    """403 response unless the request may use the /admin routes, else None"""
+    if ADMIN_TOKEN:
+        allowed = hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(),
+                                      ADMIN_TOKEN.encode())
+    else:
+        allowed = request.remote_addr in LOCAL_ADDRESSES
+    if allowed:
+        return None
+    return jsonify({"error": "Admin access denied"}), 403
+
+# Profiling of the worker process that serves the request (see profiling.py)
+@app.route('/admin/profile', methods=['GET'])
+def get_profile():
+    forbidden = admin_forbidden()
+    if forbidden:
+        return forbidden
+    return jsonify(profiling.report()), 200
+
+@app.route('/admin/profile/start', methods=['POST'])
+def start_profile():
+    forbidden = admin_forbidden()
+    if forbidden:
+        return forbidden
+    interval = request.args.get('interval', type=float)
+    started = profiling.start(interval)
+    return jsonify({"started": started, "pid": os.getpid()}), 200
+
+@app.route('/admin/profile/stop', methods=['POST'])
+def stop_profile():
+    forbidden = admin_forbidden()
+    if forbidden:
+        return forbidden
+    stopped = profiling.stop()
+    return jsonify({"stopped": stopped, "pid": os.getpid()}), 200
+
+# Collapsed stacks for flamegraph.pl or speedscope
+@app.route('/admin/profile/stacks', methods=['GET'])
+def get_profile_stacks():
+    forbidden = admin_forbidden()
+    if forbidden:
+        return forbidden
+    return Response(profiling.collapsed(), mimetype='text/plain')
+
+def post_worker_init():
+    warm_channels()
+    profiling.start_from_env()
+
+def run_production_server(host, port, workers, threads):
+    """Serve the gateway with pre-forked gunicorn workers, one channel pool per worker"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn not installed; falling back to a single threaded process.")
+        print("Install it with: pip install gunicorn")
+        warm_channels()
+        profiling.start_from_env()
+        app.run(host=host, port=port, threaded=True, debug=False, use_reloader=False)
+        return
+    
+    set_watcher_limit(threads)
+    
+    class GatewayApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads)
+            # Runs in each worker after fork and before it accepts connections
+            self.cfg.set('post_worker_init', lambda worker: post_worker_init())
+        
+        def load(self):
+            return app
+    
+    GatewayApplication().run()
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="API Gateway for the MOM-gRPC calculator")
+    parser.add_argument(
+        "--mode",
+        choices=["production", "dev"],
+        default="production",
+        help="'production' runs pre-forked workers, 'dev' runs Flask's debug server"
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="Number of worker processes in production mode (default: CPU count)"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=4,
+        help="Request threads per worker in production mode"
+    )
+    args = parser.parse_args()
+    
     # Create the queues directory if it doesn't exist
     os.makedirs("queues", exist_ok=True)
     
-    # Start the Flask app
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    if args.mode == "dev":
+        # Start the Flask development server
+        profiling.start_from_env()
+        app.run(host=args.host, port=args.port, debug=True)
+    else:
+        run_production_server(args.host, args.port, args.workers, args.threads)
@@ -0,0 +1,111 @@
+# asyncio versions of the calculator client
+import asyncio
+from concurrent import futures
+import grpc
+import calculator_pb2_grpc
+from client import (
+    CalculatorClient,
+    GRPC_ENDPOINTS,
+    build_grpc_request,
+    grpc_result
+)
+
+
+async def run_many_async(calculate, operations, max_concurrency):
+    """Await calculate() over operation dicts with at most max_concurrency in flight"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(op):
+        async with semaphore:
+            return await calculate(op['operation'], op['num1'], op['num2'], op.get('precision'))
+
+    return await asyncio.gather(*(run(op) for op in operations))
+
+
+class AsyncCalculatorClient:
+    """Gateway client for asyncio code
+
+    requests has no asyncio support, so calls run on a thread pool sharing one
+    pooled session; the event loop is never blocked.
+    """
+    def __init__(self, gateway_url="http://localhost:5000", max_concurrency=10):
+        self.client = CalculatorClient(gateway_url, pool_size=max_concurrency)
+        self.executor = futures.ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="calculator-client"
+        )
+        self.max_concurrency = max_concurrency
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def calculate(self, operation, num1, num2, precision=None):
+        return await self._run(self.client.calculate, operation, num1, num2, precision)
+
+    async def calculate_many(self, operations, max_concurrency=None):
+        """Send many calculations concurrently; results keep the input order"""
+        return await run_many_async(self.calculate, operations,
+                                    max_concurrency or self.max_concurrency)
+
+    async def watch_operation(self, operation_id, timeout=60):
+        return await self._run(self.client.watch_operation, operation_id, timeout)
+
+    async def health_check(self):
+        return await self._run(self.client.health_check)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+class AsyncGrpcCalculatorClient:
+    """Calls the calculator services directly with grpc.aio, skipping the gateway"""
+    def __init__(self, target=None, endpoints=None, timeout=5.0):
+        if target:
+            self.endpoints = {operation: target for operation in GRPC_ENDPOINTS}
+        else:
+            self.endpoints = dict(GRPC_ENDPOINTS, **(endpoints or {}))
+        self.timeout = timeout
+        # Created lazily so channels bind to the running event loop
+        self.channels = {}
+        self.stubs = {}
+
+    def _stub(self, operation):
+        address = self.endpoints[operation]
+        if address not in self.stubs:
+            self.channels[address] = grpc.aio.insecure_channel(address)
+            self.stubs[address] = calculator_pb2_grpc.CalculatorStub(self.channels[address])
+        return self.stubs[address]
+
+    async def calculate(self, operation, num1, num2, precision=None):
+        """Run one calculation on the service for the operation"""
+        try:
+            method_name, request = build_grpc_request(operation, num1, num2, precision)
+            stub = self._stub(operation)
+            response = await getattr(stub, method_name)(request, timeout=self.timeout)
+            return grpc_result(operation, num1, num2, precision, response)
+        except ValueError as e:
+            return {"error": str(e)}
+        except grpc.RpcError as e:
+            print(f"Request failed: {e.code()} - {e.details()}")
+            return {"error": e.details() or str(e.code())}
+
+    async def calculate_many(self, operations, max_concurrency=64):
+        """Send many calculations concurrently; results keep the input order"""
+        return await run_many_async(self.calculate, operations, max_concurrency)
+
+    async def close(self):
+        for channel in self.channels.values():
+            await channel.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
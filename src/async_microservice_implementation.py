@@ -0,0 +1,380 @@
+# grpc.aio versions of the calculator microservices
+import os
+import asyncio
+import contextvars
+from concurrent import futures
+import grpc
+import calculator_pb2
+import calculator_pb2_grpc
+import tracing
+import profiling
+import grpc_options
+from mom_implementation import PRIORITY_NORMAL, DEFAULT_TENANT, TERMINAL_STATUSES
+from microservice_implementation import (
+    AdditionService,
+    SubtractionService,
+    MultiplicationService,
+    DivisionService,
+    DEFAULT_DECIMAL_PRECISION,
+    MAX_DECIMAL_PRECISION,
+    DEFAULT_WATCH_TIMEOUT,
+    MAX_WATCH_TIMEOUT,
+    WATCH_CHECK_INTERVAL,
+    decimal_executor,
+    compute_decimal,
+    parse_decimal,
+    find_operation,
+    finished_response,
+    operation_status,
+    run_prefork
+)
+
+
+class AsyncQueueWriter:
+    """Runs blocking MessageQueue writes on a small thread pool with bounded backlog"""
+    def __init__(self, message_queue, max_threads=4, max_pending=1024):
+        self.message_queue = message_queue
+        self.executor = futures.ThreadPoolExecutor(
+            max_workers=max_threads,
+            thread_name_prefix=f"{message_queue.queue_name}-writer"
+        )
+        self.max_pending = max_pending
+        self.pending = None
+
+    async def _run(self, func, *args):
+        # Created lazily so it binds to the server's event loop
+        if self.pending is None:
+            self.pending = asyncio.Semaphore(self.max_pending)
+        # When the disk falls behind, new RPCs wait here instead of piling up
+        # an unbounded number of writes in the executor
+        async with self.pending:
+            loop = asyncio.get_running_loop()
+            # run_in_executor does not carry context over, so queue spans
+            # would lose the RPC's trace without the copy
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, context.run, func, *args)
+
+    async def enqueue_operation(self, message, status='pending'):
+        """(message_id, earlier message with the same operation_id or None)"""
+        return await self._run(self.message_queue.enqueue_operation, message, PRIORITY_NORMAL,
+                               DEFAULT_TENANT, status)
+
+    async def mark_completed(self, message_id, result=None):
+        return await self._run(self.message_queue.mark_completed, message_id, result)
+
+    async def mark_failed(self, message_id, error=None):
+        return await self._run(self.message_queue.mark_failed, message_id, error)
+
+
+async def watch_operation_async(message_queues, request, context):
+    """WatchOperation for grpc.aio; queue reads and waits run on the default executor"""
+    loop = asyncio.get_running_loop()
+    message_queue, message_data = await loop.run_in_executor(
+        None, find_operation, message_queues, request.operation_id
+    )
+    if message_data is None:
+        await context.abort(grpc.StatusCode.NOT_FOUND, f"Unknown operation: {request.operation_id}")
+    yield operation_status(message_data)
+
+    timeout = min(request.timeout_seconds or DEFAULT_WATCH_TIMEOUT, MAX_WATCH_TIMEOUT)
+    deadline = loop.time() + timeout
+    while message_data['status'] not in TERMINAL_STATUSES and not context.cancelled():
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        latest = await loop.run_in_executor(
+            None, message_queue.wait_for_completion,
+            message_data['id'], min(remaining, WATCH_CHECK_INTERVAL)
+        )
+        if latest is None:
+            return
+        if latest['status'] != message_data['status']:
+            yield operation_status(latest)
+        message_data = latest
+
+
+class AsyncQueuedCalculatorServicer(calculator_pb2_grpc.CalculatorServicer):
+    # The synchronous servicer providing the operation, validation and queue
+    service_class = None
+
+    def __init__(self):
+        self.service = self.service_class()
+        self.writer = AsyncQueueWriter(self.service.message_queue)
+
+    def start_recovery(self, poll_interval=5):
+        self.service.start_recovery(poll_interval)
+
+    def _is_abandoned(self, context):
+        time_remaining = context.time_remaining()
+        return context.cancelled() or (time_remaining is not None and time_remaining <= 0)
+
+    async def handle(self, request, context, response_class=calculator_pb2.CalculationResponse,
+                     number_type='float'):
+        """Persist, compute and acknowledge a calculation without blocking the event loop"""
+        operation_id = request.operation_id
+
+        if self._is_abandoned(context):
+            return response_class(
+                result=0,
+                operation_id=operation_id,
+                success=False,
+                error_message="Request cancelled or deadline exceeded"
+            )
+
+        message_id = None
+        try:
+            self.service.validate(request.num1, request.num2)
+
+            # Enqueue the request for failover support
+            message_id, earlier = await self.writer.enqueue_operation({
+                'num1': request.num1,
+                'num2': request.num2,
+                'operation': self.service.operation,
+                'operation_id': operation_id,
+                'number_type': number_type
+            }, status='processing')
+            if earlier is not None and earlier['status'] in TERMINAL_STATUSES:
+                # A retry of an operation that was already answered
+                return finished_response(response_class, earlier, float)
+
+            result = self.service.perform_operation(request.num1, request.num2)
+
+            await self.writer.mark_completed(message_id, result)
+
+            return response_class(
+                result=result,
+                operation_id=operation_id,
+                success=True
+            )
+        except Exception as e:
+            if message_id is not None:
+                await self.writer.mark_failed(message_id, str(e))
+            return response_class(
+                result=0,
+                operation_id=operation_id,
+                success=False,
+                error_message=str(e)
+            )
+
+    async def WatchOperation(self, request, context):
+        async for update in watch_operation_async([self.service.message_queue], request, context):
+            yield update
+
+    async def handle_decimal(self, request, context):
+        """Arbitrary precision path; the arithmetic runs on the shared decimal pool"""
+        operation_id = request.operation_id
+
+        if self._is_abandoned(context):
+            return calculator_pb2.DecimalCalculationResponse(
+                result="0",
+                operation_id=operation_id,
+                success=False,
+                error_message="Request cancelled or deadline exceeded"
+            )
+
+        message_id = None
+        try:
+            precision = request.precision or DEFAULT_DECIMAL_PRECISION
+            if precision > MAX_DECIMAL_PRECISION:
+                raise ValueError(f"Precision is limited to {MAX_DECIMAL_PRECISION} digits")
+            num1 = parse_decimal(request.num1)
+            num2 = parse_decimal(request.num2)
+            self.service.validate(num1, num2)
+
+            message_id, earlier = await self.writer.enqueue_operation({
+                'num1': request.num1,
+                'num2': request.num2,
+                'operation': self.service.operation,
+                'operation_id': operation_id,
+                'number_type': 'decimal',
+                'precision': precision
+            }, status='processing')
+            if earlier is not None and earlier['status'] in TERMINAL_STATUSES:
+                return finished_response(calculator_pb2.DecimalCalculationResponse, earlier, str)
+
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                decimal_executor, compute_decimal,
+                self.service.perform_operation, num1, num2, precision
+            )
+
+            await self.writer.mark_completed(message_id, str(result))
+
+            return calculator_pb2.DecimalCalculationResponse(
+                result=str(result),
+                operation_id=operation_id,
+                success=True
+            )
+        except Exception as e:
+            if message_id is not None:
+                await self.writer.mark_failed(message_id, str(e) or type(e).__name__)
+            return calculator_pb2.DecimalCalculationResponse(
+                result="0",
+                operation_id=operation_id,
+                success=False,
+                error_message=str(e) or type(e).__name__
+            )
+
+
+class AsyncAdditionService(AsyncQueuedCalculatorServicer):
+    service_class = AdditionService
+
+    async def Add(self, request, context):
+        return await self.handle(request, context)
+
+    async def AddDouble(self, request, context):
+        return await self.handle(request, context, calculator_pb2.DoubleCalculationResponse, 'double')
+
+    async def AddDecimal(self, request, context):
+        return await self.handle_decimal(request, context)
+
+
+class AsyncSubtractionService(AsyncQueuedCalculatorServicer):
+    service_class = SubtractionService
+
+    async def Subtract(self, request, context):
+        return await self.handle(request, context)
+
+    async def SubtractDouble(self, request, context):
+        return await self.handle(request, context, calculator_pb2.DoubleCalculationResponse, 'double')
+
+    async def SubtractDecimal(self, request, context):
+        return await self.handle_decimal(request, context)
+
+
+class AsyncMultiplicationService(AsyncQueuedCalculatorServicer):
+    service_class = MultiplicationService
+
+    async def Multiply(self, request, context):
+        return await self.handle(request, context)
+
+    async def MultiplyDouble(self, request, context):
+        return await self.handle(request, context, calculator_pb2.DoubleCalculationResponse, 'double')
+
+    async def MultiplyDecimal(self, request, context):
+        return await self.handle_decimal(request, context)
+
+
+class AsyncDivisionService(AsyncQueuedCalculatorServicer):
+    service_class = DivisionService
+
+    async def Divide(self, request, context):
+        return await self.handle(request, context)
+
+    async def DivideDouble(self, request, context):
+        return await self.handle(request, context, calculator_pb2.DoubleCalculationResponse, 'double')
+
+    async def DivideDecimal(self, request, context):
+        return await self.handle_decimal(request, context)
+
+
+class AsyncCombinedCalculatorService(calculator_pb2_grpc.CalculatorServicer):
+    def __init__(self):
+        self.addition = AsyncAdditionService()
+        self.subtraction = AsyncSubtractionService()
+        self.multiplication = AsyncMultiplicationService()
+        self.division = AsyncDivisionService()
+
+    def start_recovery(self, poll_interval=5):
+        for service in (self.addition, self.subtraction, self.multiplication, self.division):
+            service.start_recovery(poll_interval)
+
+    async def Add(self, request, context):
+        return await self.addition.Add(request, context)
+
+    async def AddDouble(self, request, context):
+        return await self.addition.AddDouble(request, context)
+
+    async def AddDecimal(self, request, context):
+        return await self.addition.AddDecimal(request, context)
+
+    async def Subtract(self, request, context):
+        return await self.subtraction.Subtract(request, context)
+
+    async def SubtractDouble(self, request, context):
+        return await self.subtraction.SubtractDouble(request, context)
+
+    async def SubtractDecimal(self, request, context):
+        return await self.subtraction.SubtractDecimal(request, context)
+
+    async def Multiply(self, request, context):
+        return await self.multiplication.Multiply(request, context)
+
+    async def MultiplyDouble(self, request, context):
+        return await self.multiplication.MultiplyDouble(request, context)
+
+    async def MultiplyDecimal(self, request, context):
+        return await self.multiplication.MultiplyDecimal(request, context)
+
+    async def Divide(self, request, context):
+        return await self.division.Divide(request, context)
+
+    async def DivideDouble(self, request, context):
+        return await self.division.DivideDouble(request, context)
+
+    async def DivideDecimal(self, request, context):
+        return await self.division.DivideDecimal(request, context)
+
+    async def WatchOperation(self, request, context):
+        message_queues = [
+            service.service.message_queue
+            for service in (self.addition, self.subtraction, self.multiplication, self.division)
+        ]
+        async for update in watch_operation_async(message_queues, request, context):
+            yield update
+
+
+async def _serve_async(worker_index, service_factory, service_name, port):
+    server = grpc.aio.server(
+        interceptors=((tracing.server_interceptors(use_async=True) or [])
+                      + profiling.server_interceptors(use_async=True)),
+        options=grpc_options.server_options(('grpc.so_reuseport', 1)),
+        compression=grpc_options.server_compression()
+    )
+    servicer = service_factory()
+    calculator_pb2_grpc.add_CalculatorServicer_to_server(servicer, server)
+    server.add_insecure_port(f'[::]:{port}')
+    await server.start()
+    print(f"{service_name} async service running on port {port} (pid {os.getpid()})")
+    profiling.start_from_env()
+
+    # Workers share the queue, so one consumer per service is enough
+    if worker_index == 0:
+        servicer.start_recovery()
+
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(0)
+
+
+def _run_async_server_process(worker_index, service_factory, service_name, port):
+    try:
+        asyncio.run(_serve_async(worker_index, service_factory, service_name, port))
+    except KeyboardInterrupt:
+        pass
+
+
+def serve_async(service_factory, service_name, port, workers=1):
+    """Serve a calculator servicer on grpc.aio servers, optionally pre-forked"""
+    run_prefork(_run_async_server_process, (service_factory, service_name, port), workers)
+
+
+def run_addition_server_async(port=50051, workers=1):
+    serve_async(AsyncAdditionService, "Addition", port, workers)
+
+
+def run_subtraction_server_async(port=50052, workers=1):
+    serve_async(AsyncSubtractionService, "Subtraction", port, workers)
+
+
+def run_multiplication_server_async(port=50053, workers=1):
+    serve_async(AsyncMultiplicationService, "Multiplication", port, workers)
+
+
+def run_division_server_async(port=50054, workers=1):
+    serve_async(AsyncDivisionService, "Division", port, workers)
+
+
+def run_combined_server_async(port=50050, workers=1):
+    serve_async(AsyncCombinedCalculatorService, "Combined calculator", port, workers)
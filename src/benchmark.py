@@ -0,0 +1,660 @@
+# benchmark.py
+# Micro-benchmarks for deployment layouts and hot paths of the calculator system
+import gc
+import os
+import sys
+import time
+import json
+import uuid
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+import multiprocessing
+from concurrent import futures
+import grpc
+import calculator_pb2
+import calculator_pb2_grpc
+from storage_backends import BACKENDS
+from message_record import MessageRecord
+from mom_implementation import MessageQueue, ShardedQueue
+from replication import Replicator
+from broker_client import RemoteQueue, get_queue
+import broker_pb2
+import broker_pb2_grpc
+import grpc_options
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SPLIT_LAYOUT = {
+    'Add': ("addition_service.py", 50051),
+    'Subtract': ("subtraction_service.py", 50052),
+    'Multiply': ("multiplication_service.py", 50053),
+    'Divide': ("division_service.py", 50054)
+}
+COMBINED_PORT = 50050
+
+
+def start_processes(scripts, workdir, extra_args=(), env=None):
+    """Start service scripts with their queues inside workdir; env adds variables"""
+    processes = []
+    for script_name, port in scripts:
+        cmd = [sys.executable, os.path.join(SRC_DIR, script_name), "--port", str(port)]
+        cmd += list(extra_args)
+        processes.append(subprocess.Popen(
+            cmd, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env=dict(os.environ, **env) if env else None
+        ))
+    return processes
+
+
+def stop_processes(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def wait_until_ready(addresses, timeout=10):
+    for address in addresses:
+        with grpc.insecure_channel(address) as channel:
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+
+
+def resident_memory_kb(pid):
+    """Resident set size of a process in kB (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def run_load(targets, requests, concurrency, make_request=None):
+    """Issue requests round-robin over (address, method) targets and return req/s"""
+    channels = {address: grpc.insecure_channel(address) for address, _ in targets}
+    stubs = {address: calculator_pb2_grpc.CalculatorStub(channel) for address, channel in channels.items()}
+    make_request = make_request or (lambda i: calculator_pb2.CalculationRequest(
+        num1=i, num2=3, operation_id=str(uuid.uuid4())
+    ))
+
+    def call(i):
+        address, method = targets[i % len(targets)]
+        getattr(stubs[address], method)(make_request(i), timeout=10)
+
+    # Warm up connections before timing
+    for i in range(len(targets)):
+        call(i)
+
+    start_time = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(requests)))
+    elapsed = time.perf_counter() - start_time
+
+    for channel in channels.values():
+        channel.close()
+    return requests / elapsed
+
+
+def benchmark_layout(layout, requests, concurrency):
+    """Measure memory and throughput of the split (4 processes) or combined layout"""
+    workdir = tempfile.mkdtemp(prefix=f"bench-{layout}-")
+    if layout == "split":
+        scripts = list(SPLIT_LAYOUT.values())
+        targets = [(f"localhost:{port}", method) for method, (_, port) in SPLIT_LAYOUT.items()]
+    else:
+        scripts = [("calculator_service.py", COMBINED_PORT)]
+        targets = [(f"localhost:{COMBINED_PORT}", method) for method in SPLIT_LAYOUT]
+
+    processes = start_processes(scripts, workdir)
+    try:
+        wait_until_ready({address for address, _ in targets})
+        idle_rss = sum(resident_memory_kb(process.pid) for process in processes)
+        throughput = run_load(targets, requests, concurrency)
+        loaded_rss = sum(resident_memory_kb(process.pid) for process in processes)
+    finally:
+        stop_processes(processes)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "layout": layout,
+        "processes": len(processes),
+        "idle_rss_mb": round(idle_rss / 1024, 1),
+        "loaded_rss_mb": round(loaded_rss / 1024, 1),
+        "requests_per_second": round(throughput, 1)
+    }
+
+
+def benchmark_batching(batch_window_ms, requests, concurrency):
+    """Measure Add throughput with and without server-side micro-batching"""
+    workdir = tempfile.mkdtemp(prefix="bench-batching-")
+    port = SPLIT_LAYOUT['Add'][1]
+    extra_args = ["--max-workers", str(concurrency), "--batch-window-ms", str(batch_window_ms)]
+    processes = start_processes([("addition_service.py", port)], workdir, extra_args)
+    try:
+        wait_until_ready([f"localhost:{port}"])
+        throughput = run_load([(f"localhost:{port}", 'Add')], requests, concurrency)
+    finally:
+        stop_processes(processes)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "batch_window_ms": batch_window_ms,
+        "concurrency": concurrency,
+        "requests_per_second": round(throughput, 1)
+    }
+
+
+# Every request carries a new operation_id; a repeated one would be answered
+# from the stored result instead of being computed
+PRECISION_REQUESTS = {
+    'Add': lambda i: calculator_pb2.CalculationRequest(
+        num1=i, num2=0.1, operation_id=str(uuid.uuid4())),
+    'AddDouble': lambda i: calculator_pb2.DoubleCalculationRequest(
+        num1=i, num2=0.1, operation_id=str(uuid.uuid4())),
+    'AddDecimal': lambda i: calculator_pb2.DecimalCalculationRequest(
+        num1=str(i), num2="0.1", operation_id=str(uuid.uuid4()))
+}
+
+
+def benchmark_precision(requests, concurrency):
+    """Compare float, double and decimal Add throughput on the combined server"""
+    workdir = tempfile.mkdtemp(prefix="bench-precision-")
+    address = f"localhost:{COMBINED_PORT}"
+    processes = start_processes([("calculator_service.py", COMBINED_PORT)], workdir)
+    results = []
+    try:
+        wait_until_ready([address])
+        # Untimed pass so thread pools and the queue directory are warm for every variant
+        for method, make_request in PRECISION_REQUESTS.items():
+            run_load([(address, method)], requests // 4, concurrency, make_request)
+        for method, make_request in PRECISION_REQUESTS.items():
+            throughput = run_load([(address, method)], requests, concurrency, make_request)
+            results.append({"method": method, "requests_per_second": round(throughput, 1)})
+    finally:
+        stop_processes(processes)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def benchmark_backends(messages, batch_size=100, threads=4):
+    """Time the queue operations of every storage backend in one process"""
+    workdir = tempfile.mkdtemp(prefix="bench-backends-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    results = []
+    try:
+        for backend in sorted(BACKENDS):
+            try:
+                queue = MessageQueue(f"bench-{backend}", backend=backend)
+            except RuntimeError as e:
+                results.append({"backend": backend, "skipped": str(e)})
+                continue
+
+            timings = {}
+            start = time.perf_counter()
+            for i in range(messages):
+                queue.enqueue({'num1': i, 'num2': 1, 'operation': 'add', 'operation_id': f"op-{i}"})
+            timings["enqueue"] = time.perf_counter() - start
+
+            # New messages are written without the queue lock where the backend allows it
+            start = time.perf_counter()
+            with futures.ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(lambda i: queue.enqueue({'num1': i, 'num2': 1}), range(messages)))
+            timings["threaded_enqueue"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(messages * 2):
+                message_data = queue.dequeue()
+                queue.mark_completed(message_data['id'], message_data['content']['num1'] + 1)
+            timings["dequeue_ack"] = (time.perf_counter() - start) / 2
+
+            start = time.perf_counter()
+            for i in range(messages // 10):
+                queue.find_operation(f"op-{i * 10}")
+            timings["find_operation"] = (time.perf_counter() - start) * 10
+
+            start = time.perf_counter()
+            for offset in range(0, messages, batch_size):
+                queue.enqueue_batch([{'num1': i, 'num2': 1} for i in range(batch_size)])
+            timings["enqueue_batch"] = time.perf_counter() - start
+
+            result = {"backend": backend, "durable": BACKENDS[backend].durable,
+                      "shared": BACKENDS[backend].shared}
+            for name, elapsed in timings.items():
+                result[f"{name}_per_second"] = round(messages / elapsed, 1)
+            results.append(result)
+            queue.backend.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _pending_content(i):
+    return {'num1': float(i), 'num2': 1.5, 'operation': 'add', 'operation_id': str(uuid.uuid4())}
+
+
+def _as_dicts(contents):
+    # How every message was held before MessageRecord
+    return [{
+        'id': f"{time.time()}_{i}",
+        'timestamp': time.time(),
+        'content': content,
+        'status': 'pending',
+        'priority': 1,
+        'tenant': 'default'
+    } for i, content in enumerate(contents)]
+
+
+def _as_records(contents):
+    return [
+        MessageRecord(f"{time.time()}_{i}", time.time(), content, 'pending', 1, 'default')
+        for i, content in enumerate(contents)
+    ]
+
+
+def _traced_bytes(build, *args):
+    gc.collect()
+    tracemalloc.start()
+    held = build(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size
+
+
+def benchmark_memory(messages):
+    """Memory held per million pending messages, as dicts and as MessageRecords
+
+    overhead leaves out the message contents, which are the same dicts in
+    both layouts.
+    """
+    contents = [_pending_content(i) for i in range(messages)]
+    content_bytes = _traced_bytes(lambda count: [_pending_content(i) for i in range(count)],
+                                  messages)
+    results = []
+    for layout, build in (("dict", _as_dicts), ("record", _as_records)):
+        total = _traced_bytes(build, contents) + content_bytes
+        results.append({
+            "layout": layout,
+            "mib_per_million": round(total * 1000000 / messages / 2 ** 20, 1),
+            "overhead_mib_per_million": round(
+                (total - content_bytes) * 1000000 / messages / 2 ** 20, 1
+            )
+        })
+    return results
+
+
+def _handoff_consumer(queue_name, backend, messages, connection):
+    """Drain messages in another process and report how long each one waited"""
+    queue = MessageQueue(queue_name, backend=backend)
+    latencies = []
+    connection.send("ready")
+    while len(latencies) < messages:
+        message_data = queue.dequeue()
+        if message_data is None:
+            queue.wait_for_messages(1.0)
+            continue
+        latencies.append(time.time() - message_data['content']['sent_at'])
+        queue.mark_completed(message_data['id'])
+    connection.send(latencies)
+
+
+def benchmark_handoff(messages, interval=0.005):
+    """Latency from enqueue in one process to dequeue in another, per shared backend
+
+    Messages are sent one at a time, interval seconds apart, the way the
+    gateway falls back to the queue, so this measures how fast a waiting
+    consumer notices a message rather than throughput.
+    """
+    workdir = tempfile.mkdtemp(prefix="bench-handoff-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    context = multiprocessing.get_context('spawn')
+    results = []
+    try:
+        for backend in sorted(BACKENDS):
+            if not BACKENDS[backend].shared:
+                continue
+            try:
+                queue = MessageQueue(f"handoff-{backend}", backend=backend)
+            except RuntimeError as e:
+                results.append({"backend": backend, "skipped": str(e)})
+                continue
+
+            receiver, sender = context.Pipe(duplex=False)
+            consumer = context.Process(
+                target=_handoff_consumer, args=(queue.queue_name, backend, messages, sender)
+            )
+            consumer.start()
+            receiver.recv()
+            # Let the consumer settle into wait_for_messages
+            time.sleep(0.5)
+            for i in range(messages):
+                queue.enqueue({'num1': i, 'num2': 1, 'sent_at': time.time()})
+                time.sleep(interval)
+            latencies = sorted(receiver.recv())
+            consumer.join()
+
+            results.append({
+                "backend": backend,
+                "notifies": BACKENDS[backend].notifies,
+                "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+                "p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1)
+            })
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _shard_worker(role, queue_name, shards, index, messages, barrier):
+    """Enqueue messages into a sharded queue, or drain one of its shards"""
+    queue = ShardedQueue(queue_name, shards)
+    barrier.wait()
+    if role == "producer":
+        for i in range(messages):
+            queue.enqueue({'num1': i, 'num2': 1, 'operation_id': str(uuid.uuid4())})
+        return
+    shard = queue.shards[index]
+    while True:
+        message_data = shard.dequeue()
+        if message_data is None:
+            return
+        shard.mark_completed(message_data['id'], message_data['content']['num1'] + 1)
+
+
+def _run_shard_workers(role, queue_name, shards, messages, context):
+    """Run one worker process per shard and time them from a common start"""
+    barrier = context.Barrier(shards + 1)
+    workers = [
+        context.Process(target=_shard_worker,
+                        args=(role, queue_name, shards, index, messages // shards, barrier))
+        for index in range(shards)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def benchmark_shards(messages, shard_counts=(1, 2, 4)):
+    """Enqueue and drain throughput of a sharded queue with one process per shard"""
+    workdir = tempfile.mkdtemp(prefix="bench-shards-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    context = multiprocessing.get_context('spawn')
+    results = []
+    try:
+        for shards in shard_counts:
+            queue_name = f"shards-{shards}"
+            enqueue_time = _run_shard_workers("producer", queue_name, shards, messages, context)
+            drain_time = _run_shard_workers("consumer", queue_name, shards, messages, context)
+            results.append({
+                "shards": shards,
+                "enqueue_per_second": round(messages / enqueue_time, 1),
+                "drain_per_second": round(messages / drain_time, 1)
+            })
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+REPLICA_PORTS = (50091, 50092)
+
+
+def benchmark_replication(messages, threads=8):
+    """Enqueue latency and throughput with 0, 1 or 2 follower acknowledgements
+
+    Two replica_server.py followers run locally, each with its own directory.
+    """
+    workdir = tempfile.mkdtemp(prefix="bench-replication-")
+    cwd = os.getcwd()
+    processes = []
+    for index, port in enumerate(REPLICA_PORTS):
+        processes += start_processes([("replica_server.py", port)], workdir,
+                                     ("--data-dir", f"replica-{index}"))
+    addresses = [f"localhost:{port}" for port in REPLICA_PORTS]
+    os.chdir(workdir)
+    results = []
+    try:
+        wait_until_ready(addresses)
+        for acks in (None, 0, 1, 2):
+            replicator = Replicator(addresses, acks) if acks is not None else None
+            queue = MessageQueue(f"replicated-{acks}", replicator=replicator)
+            # Writes only wait for connected followers, so connect before timing
+            while replicator is not None and not all(follower.connected
+                                                     for follower in replicator.followers):
+                time.sleep(0.01)
+            queue.enqueue({'warmup': True})
+            latencies = []
+            for i in range(messages):
+                start = time.perf_counter()
+                queue.enqueue({'num1': i, 'num2': 1})
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+
+            # Concurrent writers share batches to the followers
+            start = time.perf_counter()
+            with futures.ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(lambda i: queue.enqueue({'num1': i, 'num2': 1}), range(messages)))
+            elapsed = time.perf_counter() - start
+
+            results.append({
+                "follower_acks": "off" if acks is None else acks,
+                "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+                "p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+                "threaded_enqueue_per_second": round(messages / elapsed, 1)
+            })
+    finally:
+        os.chdir(cwd)
+        stop_processes(processes)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+BROKER_PORT = 50081
+
+
+def _drain(queue, messages, subscribe=False):
+    """Seconds to lease and acknowledge messages from queue, one at a time"""
+    start = time.perf_counter()
+    if subscribe:
+        stream = queue.subscribe(prefetch=16)
+        for _ in range(messages):
+            queue.mark_completed(next(stream)['id'], 0)
+        stream.close()
+    else:
+        for _ in range(messages):
+            queue.mark_completed(queue.dequeue()['id'], 0)
+    return time.perf_counter() - start
+
+
+def benchmark_broker(messages):
+    """Enqueue latency and drain throughput of local queues and broker_server.py queues
+
+    Both use the default backend (MOM_BACKEND); the broker keeps its queue in
+    memory on top of it and pushes messages to subscribers.
+    """
+    workdir = tempfile.mkdtemp(prefix="bench-broker-")
+    cwd = os.getcwd()
+    processes = start_processes([("broker_server.py", BROKER_PORT)], workdir)
+    os.chdir(workdir)
+    results = []
+    try:
+        wait_until_ready([f"localhost:{BROKER_PORT}"])
+        local = MessageQueue("local")
+        remote = get_queue("remote", f"localhost:{BROKER_PORT}")
+        for name, queue in (("local", local), ("broker", remote)):
+            latencies = []
+            for i in range(messages):
+                start = time.perf_counter()
+                queue.enqueue({'num1': i, 'num2': 1})
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            dequeue_elapsed = _drain(queue, messages)
+            result = {
+                "queue": name,
+                "enqueue_p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+                "enqueue_p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+                "dequeue_ack_per_second": round(messages / dequeue_elapsed, 1)
+            }
+            if isinstance(queue, RemoteQueue):
+                queue.enqueue_batch([{'num1': i, 'num2': 1} for i in range(messages)])
+                result["subscribe_ack_per_second"] = round(
+                    messages / _drain(queue, messages, subscribe=True), 1
+                )
+            results.append(result)
+    finally:
+        os.chdir(cwd)
+        stop_processes(processes)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+GRPC_OPTIONS_PORT = 50082
+
+# name -> (broker server environment, client compression, client minimum bytes,
+# channel options)
+GRPC_OPTION_SETS = {
+    "default": ({}, 'none', 0, {}),
+    "gzip": ({'GRPC_SERVER_COMPRESSION': 'gzip'}, 'gzip', 0, {}),
+    "deflate": ({'GRPC_SERVER_COMPRESSION': 'deflate'}, 'deflate', 0, {}),
+    "gzip_min_1k": ({}, 'gzip', 1024, {}),
+    "window_4m": ({'GRPC_WINDOW_BYTES': str(4 << 20)}, 'none', 0, {'window_bytes': 4 << 20}),
+    "keepalive_10s": ({'GRPC_KEEPALIVE_MS': '10000'}, 'none', 0, {'keepalive_ms': 10000}),
+}
+
+
+def _operation_content(i):
+    """A queued calculation as the gateway writes it"""
+    return json.dumps({
+        'operation': 'add', 'num1': i, 'num2': 3, 'operation_id': str(uuid.uuid4()),
+        'number_type': 'double', 'traceparent': f"00-{uuid.uuid4().hex}-{uuid.uuid4().hex[:16]}-01"
+    }).encode()
+
+
+def benchmark_grpc_options(messages, batch_size=500):
+    """Small unary calls and large batches to broker_server.py under each option set
+
+    small: one-message Enqueue calls; batch: EnqueueBatch of batch_size
+    messages; list: the ListMessages response holding every pending message.
+    The broker keeps its queues in memory so the transport dominates.
+    """
+    results = []
+    for name, (server_env, compression, min_bytes, options) in GRPC_OPTION_SETS.items():
+        workdir = tempfile.mkdtemp(prefix="bench-grpc-")
+        processes = start_processes([("broker_server.py", GRPC_OPTIONS_PORT)], workdir,
+                                    env=dict(server_env, MOM_BACKEND='memory'))
+        address = f"localhost:{GRPC_OPTIONS_PORT}"
+        channel = grpc.insecure_channel(address, options=grpc_options.channel_options(
+            max_message_bytes=64 << 20, **options
+        ))
+        stub = broker_pb2_grpc.BrokerStub(channel)
+
+        def call(method, request):
+            return method(request, timeout=30,
+                          compression=grpc_options.call_compression(request, compression, min_bytes))
+
+        try:
+            wait_until_ready([address])
+            small = [broker_pb2.EnqueueRequest(queue=f"small-{name}", content=_operation_content(i))
+                     for i in range(messages)]
+            call(stub.Enqueue, small[0])
+            latencies = []
+            for request in small:
+                start = time.perf_counter()
+                call(stub.Enqueue, request)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+
+            # Every batch carries new operation_ids, or the broker would only
+            # look up the messages of the first one
+            batches = [
+                broker_pb2.EnqueueBatchRequest(
+                    queue=f"batch-{name}", contents=[_operation_content(i) for i in range(batch_size)]
+                )
+                for _ in range(max(1, messages // batch_size))
+            ]
+            start = time.perf_counter()
+            for batch in batches:
+                call(stub.EnqueueBatch, batch)
+            batch_elapsed = time.perf_counter() - start
+
+            list_request = broker_pb2.ListRequest(queue=f"batch-{name}", kind='pending')
+            start = time.perf_counter()
+            response = call(stub.ListMessages, list_request)
+            list_elapsed = time.perf_counter() - start
+
+            results.append({
+                "options": name,
+                "small_p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+                "small_p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+                "batch_kb": round(batches[0].ByteSize() / 1024, 1),
+                "batch_messages_per_second": round(len(batches) * batch_size / batch_elapsed, 1),
+                "list_mb": round(response.ByteSize() / (1 << 20), 2),
+                "list_ms": round(list_elapsed * 1000, 1)
+            })
+        finally:
+            channel.close()
+            stop_processes(processes)
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the MOM-gRPC calculator")
+    parser.add_argument("benchmark", choices=["layout", "batching", "precision", "backends", "handoff", "memory", "shards", "replication", "broker", "grpc"], help="Which benchmark to run")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--messages", type=int, default=1000, help="Messages per measured configuration (backends, handoff, memory, shards, replication, broker, grpc)")
+    args = parser.parse_args()
+
+    if args.benchmark == "layout":
+        for layout in ("split", "combined"):
+            result = benchmark_layout(layout, args.requests, args.concurrency)
+            print(json.dumps(result))
+    elif args.benchmark == "batching":
+        for batch_window_ms in (0, 1, 5):
+            result = benchmark_batching(batch_window_ms, args.requests, args.concurrency)
+            print(json.dumps(result))
+    elif args.benchmark == "precision":
+        for result in benchmark_precision(args.requests, args.concurrency):
+            print(json.dumps(result))
+    elif args.benchmark == "backends":
+        for result in benchmark_backends(args.messages):
+            print(json.dumps(result))
+    elif args.benchmark == "handoff":
+        for result in benchmark_handoff(args.messages):
+            print(json.dumps(result))
+    elif args.benchmark == "memory":
+        for result in benchmark_memory(args.messages):
+            print(json.dumps(result))
+    elif args.benchmark == "shards":
+        for result in benchmark_shards(args.messages):
+            print(json.dumps(result))
+    elif args.benchmark == "replication":
+        for result in benchmark_replication(args.messages):
+            print(json.dumps(result))
+    elif args.benchmark == "broker":
+        for result in benchmark_broker(args.messages):
+            print(json.dumps(result))
+    elif args.benchmark == "grpc":
+        for result in benchmark_grpc_options(args.messages):
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# broker_client.py
+# Queues served by a broker process (broker_server.py), used like local MessageQueues
+import os
+import json
+import time
+import threading
+import grpc
+import broker_pb2
+import broker_pb2_grpc
+import tracing
+import profiling
+import grpc_options
+from mom_implementation import (
+    MessageBroker,
+    QueueFullError,
+    PRIORITY_NORMAL,
+    DEFAULT_TENANT
+)
+
+# host:port of the broker; when unset every process opens the queues itself
+BROKER_ADDRESS = os.environ.get('MOM_BROKER_ADDRESS', '')
+# Seconds a broker call may take (waits add their own timeout on top)
+BROKER_TIMEOUT = float(os.environ.get('MOM_BROKER_TIMEOUT', '10'))
+
+
+def _json(data):
+    return json.dumps(data).encode()
+
+
+def _message(response):
+    return json.loads(response.data) if response.found else None
+
+
+class RemoteQueue:
+    """A queue living in the broker, with the MessageQueue API
+
+    Sharding, lease expiry and cleanup happen inside the broker, so the queue
+    is its own single shard here and requeue_expired/cleanup_old_messages do
+    nothing.
+    """
+    def __init__(self, queue_name, stub):
+        self.queue_name = queue_name
+        self.stub = stub
+        # (max_depth, max_bytes) from the latest QueueStats response
+        self.limits = None
+
+    @property
+    def shards(self):
+        return [self]
+
+    def _call(self, method, request, timeout=BROKER_TIMEOUT):
+        return method(request, timeout=timeout, metadata=tracing.grpc_metadata(),
+                      compression=grpc_options.call_compression(request))
+
+    def _stats(self, priority=PRIORITY_NORMAL, new_messages=1, new_bytes=0):
+        stats = self._call(self.stub.QueueStats, broker_pb2.StatsRequest(
+            queue=self.queue_name, priority=priority, new_messages=new_messages,
+            new_bytes=new_bytes
+        ))
+        self.limits = (stats.max_depth, stats.max_bytes)
+        return stats
+
+    # The limits come with every stats response, so reading them after
+    # backlog_stats() or has_capacity() costs no further call
+    @property
+    def max_depth(self):
+        if self.limits is None:
+            self._stats()
+        return self.limits[0]
+
+    @property
+    def max_bytes(self):
+        if self.limits is None:
+            self._stats()
+        return self.limits[1]
+
+    def backlog_stats(self):
+        stats = self._stats()
+        return stats.depth, stats.size_bytes
+
+    def has_capacity(self, priority=PRIORITY_NORMAL, new_messages=1, new_bytes=0):
+        return self._stats(priority, new_messages, new_bytes).has_capacity
+
+    def _enqueued(self, response, priority):
+        if response.queue_full:
+            raise QueueFullError(self.queue_name, response.depth, response.size_bytes, priority)
+        return [(message_id, json.loads(earlier) if earlier else None)
+                for message_id, earlier in zip(response.message_ids, response.earlier)]
+
+    def enqueue(self, message, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT, status='pending'):
+        return self.enqueue_operation(message, priority, tenant, status)[0]
+
+    def enqueue_operation(self, message, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                          status='pending'):
+        response = self._call(self.stub.Enqueue, broker_pb2.EnqueueRequest(
+            queue=self.queue_name, content=_json(message), priority=priority,
+            tenant=tenant, status=status
+        ))
+        return self._enqueued(response, priority)[0]
+
+    def enqueue_batch(self, messages, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                      status='pending'):
+        return [message_id for message_id, _ in self.enqueue_operations(messages, priority,
+                                                                         tenant, status)]
+
+    def enqueue_operations(self, messages, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                           status='pending'):
+        response = self._call(self.stub.EnqueueBatch, broker_pb2.EnqueueBatchRequest(
+            queue=self.queue_name, contents=[_json(message) for message in messages],
+            priority=priority, tenant=tenant, status=status
+        ))
+        return self._enqueued(response, priority)
+
+    def dequeue(self, scheduler=None):
+        """Lease the next pending message; any scheduler means the broker's fair one"""
+        return _message(self._call(self.stub.Dequeue, broker_pb2.DequeueRequest(
+            queue=self.queue_name, fair=scheduler is not None
+        )))
+
+    def subscribe(self, prefetch=0):
+        """Yield messages as the broker pushes them, holding at most prefetch unacknowledged
+
+        Every message must be acknowledged (mark_completed, mark_failed,
+        update_batch or release) to make room for the next one. Messages still
+        held when the stream ends go back to pending.
+        """
+        stream = self.stub.Subscribe(
+            broker_pb2.SubscribeRequest(queue=self.queue_name, prefetch=prefetch),
+            metadata=tracing.grpc_metadata()
+        )
+        try:
+            for response in stream:
+                yield _message(response)
+        finally:
+            stream.cancel()
+
+    def wait_for_messages(self, timeout):
+        # The broker cannot signal new messages outside a subscription
+        time.sleep(timeout)
+        return False
+
+    def requeue_expired(self):
+        return 0, 0
+
+    def get_dead_letters(self):
+        return self._list('dead_letter')
+
+    def get_pending_operations(self):
+        return self._list('pending')
+
+    def _list(self, kind):
+        response = self._call(self.stub.ListMessages,
+                              broker_pb2.ListRequest(queue=self.queue_name, kind=kind))
+        return [json.loads(message_data) for message_data in response.messages]
+
+    def mark_completed(self, message_id, result=None):
+        self.update_batch([(message_id, 'completed', result)])
+
+    def mark_failed(self, message_id, error=None):
+        self.update_batch([(message_id, 'failed', error)])
+
+    def update_batch(self, updates):
+        response = self._call(self.stub.Ack, broker_pb2.AckRequest(queue=self.queue_name, acks=[
+            broker_pb2.Acknowledgement(
+                message_id=message_id, status=status,
+                result=_json(result) if result is not None else b''
+            )
+            for message_id, status, result in updates
+        ]))
+        return list(response.updated)
+
+    def release(self, message_id):
+        response = self._call(self.stub.Nack, broker_pb2.MessageRequest(
+            queue=self.queue_name, message_id=message_id
+        ))
+        return response.updated[0]
+
+    def save_progress(self, message_id, progress):
+        response = self._call(self.stub.SaveProgress, broker_pb2.ProgressRequest(
+            queue=self.queue_name, message_id=message_id, progress=_json(progress)
+        ))
+        return response.updated[0]
+
+    def get_message(self, message_id):
+        return _message(self._call(self.stub.GetMessage, broker_pb2.MessageRequest(
+            queue=self.queue_name, message_id=message_id
+        )))
+
+    def find_operation(self, operation_id):
+        return _message(self._call(self.stub.GetMessage, broker_pb2.MessageRequest(
+            queue=self.queue_name, operation_id=operation_id
+        )))
+
+    def wait_for_completion(self, message_id, timeout):
+        return _message(self._call(
+            self.stub.WaitForCompletion,
+            broker_pb2.WaitRequest(queue=self.queue_name, message_id=message_id,
+                                   timeout_seconds=timeout),
+            timeout=BROKER_TIMEOUT + timeout
+        ))
+
+    def cleanup_old_messages(self, max_age_hours=24):
+        pass
+
+
+_stubs = {}
+_stubs_lock = threading.Lock()
+
+
+profiling.register(RemoteQueue)
+
+
+def _stub(address):
+    with _stubs_lock:
+        # Channels do not survive fork(), so each process opens its own
+        key = (address, os.getpid())
+        if key not in _stubs:
+            _stubs[key] = broker_pb2_grpc.BrokerStub(
+                grpc.insecure_channel(address, options=grpc_options.channel_options())
+            )
+        return _stubs[key]
+
+
+def get_queue(queue_name, address=None):
+    """The queue called queue_name: in the broker at address (MOM_BROKER_ADDRESS
+    by default) if there is one, otherwise opened by this process"""
+    address = address or BROKER_ADDRESS
+    if not address:
+        return MessageBroker().get_queue(queue_name)
+    return RemoteQueue(queue_name, _stub(address))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: broker.proto
+# Protobuf Python Version: 5.29.0
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    5,
+    29,
+    0,
+    '',
+    'broker.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0c\x62roker.proto\x12\x06\x62roker\"o\n\x0fReplicatedWrite\x12\x12\n\nqueue_name\x18\x01 \x01(\t\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x0e\n\x06record\x18\x03 \x01(\x0c\x12\x10\n\x08snapshot\x18\x04 \x01(\x08\x12\x12\n\nwritten_at\x18\x05 \x01(\x03\"M\n\x10ReplicationBatch\x12\x10\n\x08sequence\x18\x01 \x01(\x04\x12\'\n\x06writes\x18\x02 \x03(\x0b\x32\x17.broker.ReplicatedWrite\"9\n\x0eReplicationAck\x12\x10\n\x08sequence\x18\x01 \x01(\x04\x12\x15\n\rerror_message\x18\x02 \x01(\t\"b\n\x0e\x45nqueueRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\x0c\x12\x10\n\x08priority\x18\x03 \x01(\x05\x12\x0e\n\x06tenant\x18\x04 \x01(\t\x12\x0e\n\x06status\x18\x05 \x01(\t\"h\n\x13\x45nqueueBatchRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x10\n\x08\x63ontents\x18\x02 \x03(\x0c\x12\x10\n\x08priority\x18\x03 \x01(\x05\x12\x0e\n\x06tenant\x18\x04 \x01(\t\x12\x0e\n\x06status\x18\x05 \x01(\t\"n\n\x0f\x45nqueueResponse\x12\x13\n\x0bmessage_ids\x18\x01 \x03(\t\x12\x12\n\nqueue_full\x18\x02 \x01(\x08\x12\r\n\x05\x64\x65pth\x18\x03 \x01(\x04\x12\x12\n\nsize_bytes\x18\x04 \x01(\x04\x12\x0f\n\x07\x65\x61rlier\x18\x05 \x03(\x0c\"-\n\x0e\x44\x65queueRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x0c\n\x04\x66\x61ir\x18\x02 \x01(\x08\"I\n\x0eMessageRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x14\n\x0coperation_id\x18\x03 \x01(\t\".\n\x0fMessageResponse\x12\r\n\x05\x66ound\x18\x01 \x01(\x08\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\"E\n\x0f\x41\x63knowledgement\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0e\n\x06result\x18\x03 \x01(\x0c\"B\n\nAckRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12%\n\x04\x61\x63ks\x18\x02 \x03(\x0b\x32\x17.broker.Acknowledgement\"\x1e\n\x0b\x41\x63kResponse\x12\x0f\n\x07updated\x18\x01 \x03(\x08\"3\n\x10SubscribeRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x10\n\x08prefetch\x18\x02 \x01(\r\"F\n\x0fProgressRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x10\n\x08progress\x18\x03 \x01(\x0c\"I\n\x0bWaitRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x17\n\x0ftimeout_seconds\x18\x03 \x01(\x01\"X\n\x0cStatsRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x10\n\x08priority\x18\x02 \x01(\x05\x12\x14\n\x0cnew_messages\x18\x03 \x01(\r\x12\x11\n\tnew_bytes\x18\x04 \x01(\x04\"~\n\rStatsResponse\x12\r\n\x05\x64\x65pth\x18\x01 \x01(\x04\x12\x12\n\nsize_bytes\x18\x02 \x01(\x04\x12\x11\n\tmax_depth\x18\x03 \x01(\x04\x12\x11\n\tmax_bytes\x18\x04 \x01(\x04\x12\x14\n\x0chas_capacity\x18\x05 \x01(\x08\x12\x0e\n\x06shards\x18\x06 \x01(\r\"*\n\x0bListRequest\x12\r\n\x05queue\x18\x01 \x01(\t\x12\x0c\n\x04kind\x18\x02 \x01(\t\" \n\x0cListResponse\x12\x10\n\x08messages\x18\x01 \x03(\x0c\x32R\n\x0bReplication\x12\x43\n\tReplicate\x12\x18.broker.ReplicationBatch\x1a\x16.broker.ReplicationAck\"\x00(\x01\x30\x01\x32\xb9\x05\n\x06\x42roker\x12<\n\x07\x45nqueue\x12\x16.broker.EnqueueRequest\x1a\x17.broker.EnqueueResponse\"\x00\x12\x46\n\x0c\x45nqueueBatch\x12\x1b.broker.EnqueueBatchRequest\x1a\x17.broker.EnqueueResponse\"\x00\x12<\n\x07\x44\x65queue\x12\x16.broker.DequeueRequest\x1a\x17.broker.MessageResponse\"\x00\x12\x30\n\x03\x41\x63k\x12\x12.broker.AckRequest\x1a\x13.broker.AckResponse\"\x00\x12\x35\n\x04Nack\x12\x16.broker.MessageRequest\x1a\x13.broker.AckResponse\"\x00\x12\x42\n\tSubscribe\x12\x18.broker.SubscribeRequest\x1a\x17.broker.MessageResponse\"\x00\x30\x01\x12>\n\x0cSaveProgress\x12\x17.broker.ProgressRequest\x1a\x13.broker.AckResponse\"\x00\x12?\n\nGetMessage\x12\x16.broker.MessageRequest\x1a\x17.broker.MessageResponse\"\x00\x12\x43\n\x11WaitForCompletion\x12\x13.broker.WaitRequest\x1a\x17.broker.MessageResponse\"\x00\x12;\n\nQueueStats\x12\x14.broker.StatsRequest\x1a\x15.broker.StatsResponse\"\x00\x12;\n\x0cListMessages\x12\x13.broker.ListRequest\x1a\x14.broker.ListResponse\"\x00\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'broker_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_REPLICATEDWRITE']._serialized_start=24
+  _globals['_REPLICATEDWRITE']._serialized_end=135
+  _globals['_REPLICATIONBATCH']._serialized_start=137
+  _globals['_REPLICATIONBATCH']._serialized_end=214
+  _globals['_REPLICATIONACK']._serialized_start=216
+  _globals['_REPLICATIONACK']._serialized_end=273
+  _globals['_ENQUEUEREQUEST']._serialized_start=275
+  _globals['_ENQUEUEREQUEST']._serialized_end=373
+  _globals['_ENQUEUEBATCHREQUEST']._serialized_start=375
+  _globals['_ENQUEUEBATCHREQUEST']._serialized_end=479
+  _globals['_ENQUEUERESPONSE']._serialized_start=481
+  _globals['_ENQUEUERESPONSE']._serialized_end=591
+  _globals['_DEQUEUEREQUEST']._serialized_start=593
+  _globals['_DEQUEUEREQUEST']._serialized_end=638
+  _globals['_MESSAGEREQUEST']._serialized_start=640
+  _globals['_MESSAGEREQUEST']._serialized_end=713
+  _globals['_MESSAGERESPONSE']._serialized_start=715
+  _globals['_MESSAGERESPONSE']._serialized_end=761
+  _globals['_ACKNOWLEDGEMENT']._serialized_start=763
+  _globals['_ACKNOWLEDGEMENT']._serialized_end=832
+  _globals['_ACKREQUEST']._serialized_start=834
+  _globals['_ACKREQUEST']._serialized_end=900
+  _globals['_ACKRESPONSE']._serialized_start=902
+  _globals['_ACKRESPONSE']._serialized_end=932
+  _globals['_SUBSCRIBEREQUEST']._serialized_start=934
+  _globals['_SUBSCRIBEREQUEST']._serialized_end=985
+  _globals['_PROGRESSREQUEST']._serialized_start=987
+  _globals['_PROGRESSREQUEST']._serialized_end=1057
+  _globals['_WAITREQUEST']._serialized_start=1059
+  _globals['_WAITREQUEST']._serialized_end=1132
+  _globals['_STATSREQUEST']._serialized_start=1134
+  _globals['_STATSREQUEST']._serialized_end=1222
+  _globals['_STATSRESPONSE']._serialized_start=1224
+  _globals['_STATSRESPONSE']._serialized_end=1350
+  _globals['_LISTREQUEST']._serialized_start=1352
+  _globals['_LISTREQUEST']._serialized_end=1394
+  _globals['_LISTRESPONSE']._serialized_start=1396
+  _globals['_LISTRESPONSE']._serialized_end=1428
+  _globals['_REPLICATION']._serialized_start=1430
+  _globals['_REPLICATION']._serialized_end=1512
+  _globals['_BROKER']._serialized_start=1515
+  _globals['_BROKER']._serialized_end=2212
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,611 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+import broker_pb2 as broker__pb2
+
+GRPC_GENERATED_VERSION = '1.71.0'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + f' but the generated code in broker_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class ReplicationStub(object):
+    """Followers keep a copy of a leader's queues, so queued work survives losing the leader's disk
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Replicate = channel.stream_stream(
+                '/broker.Replication/Replicate',
+                request_serializer=broker__pb2.ReplicationBatch.SerializeToString,
+                response_deserializer=broker__pb2.ReplicationAck.FromString,
+                _registered_method=True)
+
+
+class ReplicationServicer(object):
+    """Followers keep a copy of a leader's queues, so queued work survives losing the leader's disk
+    """
+
+    def Replicate(self, request_iterator, context):
+        """The leader streams batches of writes without waiting for each one; the
+        follower acknowledges every batch, in order, once it is stored
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_ReplicationServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Replicate': grpc.stream_stream_rpc_method_handler(
+                    servicer.Replicate,
+                    request_deserializer=broker__pb2.ReplicationBatch.FromString,
+                    response_serializer=broker__pb2.ReplicationAck.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'broker.Replication', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('broker.Replication', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class Replication(object):
+    """Followers keep a copy of a leader's queues, so queued work survives losing the leader's disk
+    """
+
+    @staticmethod
+    def Replicate(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/broker.Replication/Replicate',
+            broker__pb2.ReplicationBatch.SerializeToString,
+            broker__pb2.ReplicationAck.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+
+class BrokerStub(object):
+    """Queue API of broker_server.py: every queue lives in the broker process
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Enqueue = channel.unary_unary(
+                '/broker.Broker/Enqueue',
+                request_serializer=broker__pb2.EnqueueRequest.SerializeToString,
+                response_deserializer=broker__pb2.EnqueueResponse.FromString,
+                _registered_method=True)
+        self.EnqueueBatch = channel.unary_unary(
+                '/broker.Broker/EnqueueBatch',
+                request_serializer=broker__pb2.EnqueueBatchRequest.SerializeToString,
+                response_deserializer=broker__pb2.EnqueueResponse.FromString,
+                _registered_method=True)
+        self.Dequeue = channel.unary_unary(
+                '/broker.Broker/Dequeue',
+                request_serializer=broker__pb2.DequeueRequest.SerializeToString,
+                response_deserializer=broker__pb2.MessageResponse.FromString,
+                _registered_method=True)
+        self.Ack = channel.unary_unary(
+                '/broker.Broker/Ack',
+                request_serializer=broker__pb2.AckRequest.SerializeToString,
+                response_deserializer=broker__pb2.AckResponse.FromString,
+                _registered_method=True)
+        self.Nack = channel.unary_unary(
+                '/broker.Broker/Nack',
+                request_serializer=broker__pb2.MessageRequest.SerializeToString,
+                response_deserializer=broker__pb2.AckResponse.FromString,
+                _registered_method=True)
+        self.Subscribe = channel.unary_stream(
+                '/broker.Broker/Subscribe',
+                request_serializer=broker__pb2.SubscribeRequest.SerializeToString,
+                response_deserializer=broker__pb2.MessageResponse.FromString,
+                _registered_method=True)
+        self.SaveProgress = channel.unary_unary(
+                '/broker.Broker/SaveProgress',
+                request_serializer=broker__pb2.ProgressRequest.SerializeToString,
+                response_deserializer=broker__pb2.AckResponse.FromString,
+                _registered_method=True)
+        self.GetMessage = channel.unary_unary(
+                '/broker.Broker/GetMessage',
+                request_serializer=broker__pb2.MessageRequest.SerializeToString,
+                response_deserializer=broker__pb2.MessageResponse.FromString,
+                _registered_method=True)
+        self.WaitForCompletion = channel.unary_unary(
+                '/broker.Broker/WaitForCompletion',
+                request_serializer=broker__pb2.WaitRequest.SerializeToString,
+                response_deserializer=broker__pb2.MessageResponse.FromString,
+                _registered_method=True)
+        self.QueueStats = channel.unary_unary(
+                '/broker.Broker/QueueStats',
+                request_serializer=broker__pb2.StatsRequest.SerializeToString,
+                response_deserializer=broker__pb2.StatsResponse.FromString,
+                _registered_method=True)
+        self.ListMessages = channel.unary_unary(
+                '/broker.Broker/ListMessages',
+                request_serializer=broker__pb2.ListRequest.SerializeToString,
+                response_deserializer=broker__pb2.ListResponse.FromString,
+                _registered_method=True)
+
+
+class BrokerServicer(object):
+    """Queue API of broker_server.py: every queue lives in the broker process
+    """
+
+    def Enqueue(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def EnqueueBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Dequeue(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Ack(self, request, context):
+        """Marks messages completed or failed
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Nack(self, request, context):
+        """Returns a message to pending so it is delivered again
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Subscribe(self, request, context):
+        """Pushes pending messages while fewer than prefetch of them are unacknowledged
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SaveProgress(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetMessage(self, request, context):
+        """Looks a message up by message_id, or by operation_id if that is set
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WaitForCompletion(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def QueueStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ListMessages(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_BrokerServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Enqueue': grpc.unary_unary_rpc_method_handler(
+                    servicer.Enqueue,
+                    request_deserializer=broker__pb2.EnqueueRequest.FromString,
+                    response_serializer=broker__pb2.EnqueueResponse.SerializeToString,
+            ),
+            'EnqueueBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.EnqueueBatch,
+                    request_deserializer=broker__pb2.EnqueueBatchRequest.FromString,
+                    response_serializer=broker__pb2.EnqueueResponse.SerializeToString,
+            ),
+            'Dequeue': grpc.unary_unary_rpc_method_handler(
+                    servicer.Dequeue,
+                    request_deserializer=broker__pb2.DequeueRequest.FromString,
+                    response_serializer=broker__pb2.MessageResponse.SerializeToString,
+            ),
+            'Ack': grpc.unary_unary_rpc_method_handler(
+                    servicer.Ack,
+                    request_deserializer=broker__pb2.AckRequest.FromString,
+                    response_serializer=broker__pb2.AckResponse.SerializeToString,
+            ),
+            'Nack': grpc.unary_unary_rpc_method_handler(
+                    servicer.Nack,
+                    request_deserializer=broker__pb2.MessageRequest.FromString,
+                    response_serializer=broker__pb2.AckResponse.SerializeToString,
+            ),
+            'Subscribe': grpc.unary_stream_rpc_method_handler(
+                    servicer.Subscribe,
+                    request_deserializer=broker__pb2.SubscribeRequest.FromString,
+                    response_serializer=broker__pb2.MessageResponse.SerializeToString,
+            ),
+            'SaveProgress': grpc.unary_unary_rpc_method_handler(
+                    servicer.SaveProgress,
+                    request_deserializer=broker__pb2.ProgressRequest.FromString,
+                    response_serializer=broker__pb2.AckResponse.SerializeToString,
+            ),
+            'GetMessage': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetMessage,
+                    request_deserializer=broker__pb2.MessageRequest.FromString,
+                    response_serializer=broker__pb2.MessageResponse.SerializeToString,
+            ),
+            'WaitForCompletion': grpc.unary_unary_rpc_method_handler(
+                    servicer.WaitForCompletion,
+                    request_deserializer=broker__pb2.WaitRequest.FromString,
+                    response_serializer=broker__pb2.MessageResponse.SerializeToString,
+            ),
+            'QueueStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.QueueStats,
+                    request_deserializer=broker__pb2.StatsRequest.FromString,
+                    response_serializer=broker__pb2.StatsResponse.SerializeToString,
+            ),
+            'ListMessages': grpc.unary_unary_rpc_method_handler(
+                    servicer.ListMessages,
+                    request_deserializer=broker__pb2.ListRequest.FromString,
+                    response_serializer=broker__pb2.ListResponse.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'broker.Broker', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('broker.Broker', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class Broker(object):
+    """Queue API of broker_server.py: every queue lives in the broker process
+    """
+
+    @staticmethod
+    def Enqueue(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/Enqueue',
+            broker__pb2.EnqueueRequest.SerializeToString,
+            broker__pb2.EnqueueResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def EnqueueBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/EnqueueBatch',
+            broker__pb2.EnqueueBatchRequest.SerializeToString,
+            broker__pb2.EnqueueResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Dequeue(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/Dequeue',
+            broker__pb2.DequeueRequest.SerializeToString,
+            broker__pb2.MessageResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Ack(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/Ack',
+            broker__pb2.AckRequest.SerializeToString,
+            broker__pb2.AckResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Nack(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/Nack',
+            broker__pb2.MessageRequest.SerializeToString,
+            broker__pb2.AckResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Subscribe(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/broker.Broker/Subscribe',
+            broker__pb2.SubscribeRequest.SerializeToString,
+            broker__pb2.MessageResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SaveProgress(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/SaveProgress',
+            broker__pb2.ProgressRequest.SerializeToString,
+            broker__pb2.AckResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetMessage(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/GetMessage',
+            broker__pb2.MessageRequest.SerializeToString,
+            broker__pb2.MessageResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def WaitForCompletion(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/WaitForCompletion',
+            broker__pb2.WaitRequest.SerializeToString,
+            broker__pb2.MessageResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def QueueStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/QueueStats',
+            broker__pb2.StatsRequest.SerializeToString,
+            broker__pb2.StatsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ListMessages(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/broker.Broker/ListMessages',
+            broker__pb2.ListRequest.SerializeToString,
+            broker__pb2.ListResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,248 @@
+# broker_server.py
+# Standalone broker: owns every queue and serves them over gRPC (see broker_client.py)
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent import futures
+import grpc
+import broker_pb2
+import broker_pb2_grpc
+import tracing
+import profiling
+import grpc_options
+from mom_implementation import (
+    MessageBroker,
+    QueueFullError,
+    WeightedFairScheduler,
+    DEFAULT_TENANT,
+    DEFAULT_VISIBILITY_TIMEOUT
+)
+
+# Unacknowledged messages a subscriber may hold when it does not ask for a number
+DEFAULT_PREFETCH = int(os.environ.get('MOM_BROKER_PREFETCH', '16'))
+# How often expired leases are requeued
+REQUEUE_INTERVAL = float(os.environ.get('MOM_BROKER_REQUEUE_INTERVAL', '5'))
+
+
+def _json(data):
+    return json.dumps(data).encode()
+
+
+def _loads(data):
+    return json.loads(data) if data else None
+
+
+def _message(message_data):
+    if message_data is None:
+        return broker_pb2.MessageResponse(found=False)
+    return broker_pb2.MessageResponse(found=True, data=_json(message_data))
+
+
+class Subscription:
+    """Messages pushed to one subscriber and not acknowledged yet"""
+    def __init__(self, prefetch, lease_seconds):
+        self.prefetch = prefetch
+        self.lease_seconds = lease_seconds
+        # message_id -> when its lease runs out and the broker may requeue it
+        self.in_flight = {}
+        self.condition = threading.Condition()
+
+    def wait_for_credit(self, timeout):
+        """Whether the subscriber may take another message, waiting up to timeout seconds"""
+        with self.condition:
+            now = time.time()
+            for message_id, expires_at in list(self.in_flight.items()):
+                if expires_at <= now:
+                    del self.in_flight[message_id]
+            if len(self.in_flight) < self.prefetch:
+                return True
+            self.condition.wait(timeout)
+            return len(self.in_flight) < self.prefetch
+
+    def delivered(self, message_id):
+        with self.condition:
+            self.in_flight[message_id] = time.time() + self.lease_seconds
+
+    def settled(self, message_id):
+        with self.condition:
+            self.in_flight.pop(message_id, None)
+            self.condition.notify_all()
+
+
+class BrokerServicer(broker_pb2_grpc.BrokerServicer):
+    """Serves the queues of this process, which is the only one that opens them
+
+    Queues are opened with exclusive=True, so reads come from memory and a
+    dequeue only looks at pending messages.
+    """
+    def __init__(self):
+        self.broker = MessageBroker()
+        self.schedulers = {}
+        # message_id -> Subscription it was pushed to
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+    def _queue(self, queue_name):
+        return self.broker.get_queue(queue_name, exclusive=True)
+
+    def _scheduler(self, queue_name):
+        with self.lock:
+            return self.schedulers.setdefault(queue_name, WeightedFairScheduler())
+
+    def _settled(self, message_id):
+        with self.lock:
+            subscription = self.subscriptions.pop(message_id, None)
+        if subscription is not None:
+            subscription.settled(message_id)
+
+    def _enqueue(self, request, contents):
+        queue = self._queue(request.queue)
+        try:
+            results = queue.enqueue_operations(
+                [_loads(content) for content in contents], request.priority,
+                request.tenant or DEFAULT_TENANT, request.status or 'pending'
+            )
+        except QueueFullError as e:
+            return broker_pb2.EnqueueResponse(queue_full=True, depth=e.depth,
+                                              size_bytes=e.size_bytes)
+        return broker_pb2.EnqueueResponse(
+            message_ids=[message_id for message_id, _ in results],
+            earlier=[_json(earlier) if earlier is not None else b'' for _, earlier in results]
+        )
+
+    def Enqueue(self, request, context):
+        return self._enqueue(request, [request.content])
+
+    def EnqueueBatch(self, request, context):
+        return self._enqueue(request, request.contents)
+
+    def Dequeue(self, request, context):
+        scheduler = self._scheduler(request.queue) if request.fair else None
+        return _message(self._queue(request.queue).dequeue(scheduler))
+
+    def Ack(self, request, context):
+        updated = self._queue(request.queue).update_batch([
+            (ack.message_id, ack.status, _loads(ack.result)) for ack in request.acks
+        ])
+        for ack in request.acks:
+            self._settled(ack.message_id)
+        return broker_pb2.AckResponse(updated=updated)
+
+    def Nack(self, request, context):
+        updated = self._queue(request.queue).release(request.message_id)
+        self._settled(request.message_id)
+        return broker_pb2.AckResponse(updated=[updated])
+
+    def Subscribe(self, request, context):
+        queue = self._queue(request.queue)
+        scheduler = self._scheduler(request.queue)
+        subscription = Subscription(request.prefetch or DEFAULT_PREFETCH,
+                                    getattr(queue, 'visibility_timeout', DEFAULT_VISIBILITY_TIMEOUT))
+        try:
+            while context.is_active():
+                if not subscription.wait_for_credit(1.0):
+                    continue
+                message_data = queue.dequeue(scheduler)
+                if message_data is None:
+                    queue.wait_for_messages(1.0)
+                    continue
+                subscription.delivered(message_data['id'])
+                with self.lock:
+                    self.subscriptions[message_data['id']] = subscription
+                yield _message(message_data)
+        finally:
+            # A subscriber that went away cannot acknowledge what it holds
+            with subscription.condition:
+                unacknowledged = list(subscription.in_flight)
+            for message_id in unacknowledged:
+                self._settled(message_id)
+                queue.release(message_id)
+
+    def SaveProgress(self, request, context):
+        updated = self._queue(request.queue).save_progress(request.message_id,
+                                                           _loads(request.progress))
+        return broker_pb2.AckResponse(updated=[updated])
+
+    def GetMessage(self, request, context):
+        queue = self._queue(request.queue)
+        if request.operation_id:
+            return _message(queue.find_operation(request.operation_id))
+        return _message(queue.get_message(request.message_id))
+
+    def WaitForCompletion(self, request, context):
+        return _message(self._queue(request.queue).wait_for_completion(
+            request.message_id, request.timeout_seconds
+        ))
+
+    def QueueStats(self, request, context):
+        queue = self._queue(request.queue)
+        depth, size_bytes = queue.backlog_stats()
+        return broker_pb2.StatsResponse(
+            depth=depth,
+            size_bytes=size_bytes,
+            max_depth=queue.max_depth,
+            max_bytes=queue.max_bytes,
+            has_capacity=queue.has_capacity(request.priority, request.new_messages,
+                                            request.new_bytes),
+            shards=len(queue.shards)
+        )
+
+    def ListMessages(self, request, context):
+        queue = self._queue(request.queue)
+        if request.kind == 'dead_letter':
+            messages = queue.get_dead_letters()
+        else:
+            messages = queue.get_pending_operations()
+        return broker_pb2.ListResponse(messages=[_json(message_data) for message_data in messages])
+
+
+def _maintain(broker):
+    """Requeue expired leases of every open queue, and clean up old messages hourly"""
+    last_cleanup = time.monotonic()
+    while True:
+        time.sleep(REQUEUE_INTERVAL)
+        for queue in list(broker.queues.values()):
+            try:
+                queue.requeue_expired()
+                if time.monotonic() - last_cleanup > 3600:
+                    queue.cleanup_old_messages()
+            except Exception as e:
+                print(f"Error maintaining queue {queue.queue_name}: {e}")
+        if time.monotonic() - last_cleanup > 3600:
+            last_cleanup = time.monotonic()
+
+
+def run_broker_server(port=50080, max_workers=64):
+    # Every subscriber holds a handler thread for as long as it is connected
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        interceptors=(tracing.server_interceptors() or []) + profiling.server_interceptors(),
+        options=grpc_options.server_options(),
+        compression=grpc_options.server_compression()
+    )
+    servicer = BrokerServicer()
+    broker_pb2_grpc.add_BrokerServicer_to_server(servicer, server)
+    server.add_insecure_port(f'[::]:{port}')
+    server.start()
+    print(f"Broker running on port {port} (pid {os.getpid()}), queues in {os.getcwd()}")
+    profiling.start_from_env()
+
+    maintenance_thread = threading.Thread(target=_maintain, args=(servicer.broker,))
+    maintenance_thread.daemon = True
+    maintenance_thread.start()
+    try:
+        while True:
+            time.sleep(86400)  # One day in seconds
+    except KeyboardInterrupt:
+        server.stop(0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Broker owning every queue, served over gRPC")
+    parser.add_argument("--port", type=int, default=50080, help="Port to listen on")
+    parser.add_argument("--max-workers", type=int, default=64,
+                        help="Handler threads; each subscriber holds one")
+    args = parser.parse_args()
+    run_broker_server(args.port, args.max_workers)
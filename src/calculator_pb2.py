@@ -24,17 +24,39 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10\x63\x61lculator.proto\x12\ncalculator\"F\n\x12\x43\x61lculationRequest\x12\x0c\n\x04num1\x18\x01 \x01(\x02\x12\x0c\n\x04num2\x18\x02 \x01(\x02\x12\x14\n\x0coperation_id\x18\x03 \x01(\t\"c\n\x13\x43\x61lculationResponse\x12\x0e\n\x06result\x18\x01 \x01(\x02\x12\x14\n\x0coperation_id\x18\x02 \x01(\t\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\x15\n\rerror_message\x18\x04 \x01(\t2\xc1\x02\n\nCalculator\x12H\n\x03\x41\x64\x64\x12\x1e.calculator.CalculationRequest\x1a\x1f.calculator.CalculationResponse\"\x00\x12M\n\x08Subtract\x12\x1e.calculator.CalculationRequest\x1a\x1f.calculator.CalculationResponse\"\x00\x12M\n\x08Multiply\x12\x1e.calculator.CalculationRequest\x1a\x1f.calculator.CalculationResponse\"\x00\x12K\n\x06\x44ivide\x12\x1e.calculator.CalculationRequest\x1a\x1f.calculator.CalculationResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10\x63\x61lculator.proto\x12\ncalculator\"F\n\x12\x43\x61lculationRequest\x12\x0c\n\x04num1\x18\x01 \x01(\x02\x12\x0c\n\x04num2\x18\x02 \x01(\x02\x12\x14\n\x0coperation_id\x18\x03 \x01(\t\"c\n\x13\x43\x61lculationResponse\x12\x0e\n\x06result\x18\x01 \x01(\x02\x12\x14\n\x0coperation_id\x18\x02 \x01(\t\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\x15\n\rerror_message\x18\x04 \x01(\t\"L\n\x18\x44oubleCalculationRequest\x12\x0c\n\x04num1\x18\x01 \x01(\x01\x12\x0c\n\x04num2\x18\x02 \x01(\x01\x12\x14\n\x0coperation_id\x18\x03 \x01(\t\"i\n\x19\x44oubleCalculationResponse\x12\x0e\n\x06result\x18\x01 \x01(\x01\x12\x14\n\x0coperation_id\x18\x02 \x01(\t\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\x15\n\rerror_message\x18\x04 \x01(\t\"`\n\x19\x44\x65\x63imalCalculationRequest\x12\x0c\n\x04num1\x18\x01 \x01(\t\x12\x0c\n\x04num2\x18\x02 \x01(\t\x12\x14\n\x0coperation_id\x18\x03 \x01(\t\x12\x11\n\tprecision\x18\x04 \x01(\r\"j\n\x1a\x44\x65\x63imalCalculationResponse\x12\x0e\n\x06result\x18\x01 \x01(\t\x12\x14\n\x0coperation_id\x18\x02 \x01(\t\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\x15\n\rerror_message\x18\x04 \x01(\t\"F\n\x15WatchOperationRequest\x12\x14\n\x0coperation_id\x18\x01 \x01(\t\x12\x17\n\x0ftimeout_seconds\x18\x02 \x01(\r\"^\n\x0fOperationStatus\x12\x14\n\x0coperation_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0e\n\x06result\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\"\xd3\x01\n\x11\x45xpressionRequest\x12\x12\n\nexpression\x18\x01 \x01(\t\x12?\n\tvariables\x18\x02 \x03(\x0b\x32,.calculator.ExpressionRequest.VariablesEntry\x12\x14\n\x0coperation_id\x18\x03 \x01(\t\x12\x11\n\tprecision\x18\x04 \x01(\t\x12\x0e\n\x06\x64igits\x18\x05 \x01(\r\x1a\x30\n\x0eVariablesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x97\x01\n\x12\x45xpressionResponse\x12\x0e\n\x06result\x18\x01 \x01(\t\x12\x14\n\x0coperation_id\x18\x02 \x01(\t\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\x15\n\rerror_message\x18\x04 \x01(\t\x12\x0e\n\x06queued\x18\x05 \x01(\x08\x12\r\n\x05steps\x18\x06 \x01(\r\x12\x14\n\x0creused_steps\x18\x07 \x01(\r2\x9d\t\n\nCalculator\x12H\n\x03\x41\x64\x64\x12\x1e.calculator.CalculationRequest\x1a\x1f.calculator.CalculationResponse\"\x00\x12M\n\x08Subtract\x12\x1e.calculator.CalculationRequest\x1a\x1f.calculator.CalculationResponse\"\x00\x12M\n\x08Multiply\x12\x1e.calculator.CalculationRequest\x1a\x1f.calculator.CalculationResponse\"\x00\x12K\n\x06\x44ivide\x12\x1e.calculator.CalculationRequest\x1a\x1f.calculator.CalculationResponse\"\x00\x12Z\n\tAddDouble\x12$.calculator.DoubleCalculationRequest\x1a%.calculator.DoubleCalculationResponse\"\x00\x12_\n\x0eSubtractDouble\x12$.calculator.DoubleCalculationRequest\x1a%.calculator.DoubleCalculationResponse\"\x00\x12_\n\x0eMultiplyDouble\x12$.calculator.DoubleCalculationRequest\x1a%.calculator.DoubleCalculationResponse\"\x00\x12]\n\x0c\x44ivideDouble\x12$.calculator.DoubleCalculationRequest\x1a%.calculator.DoubleCalculationResponse\"\x00\x12]\n\nAddDecimal\x12%.calculator.DecimalCalculationRequest\x1a&.calculator.DecimalCalculationResponse\"\x00\x12\x62\n\x0fSubtractDecimal\x12%.calculator.DecimalCalculationRequest\x1a&.calculator.DecimalCalculationResponse\"\x00\x12\x62\n\x0fMultiplyDecimal\x12%.calculator.DecimalCalculationRequest\x1a&.calculator.DecimalCalculationResponse\"\x00\x12`\n\rDivideDecimal\x12%.calculator.DecimalCalculationRequest\x1a&.calculator.DecimalCalculationResponse\"\x00\x12T\n\x0eWatchOperation\x12!.calculator.WatchOperationRequest\x1a\x1b.calculator.OperationStatus\"\x00\x30\x01\x32\x62\n\x13\x45xpressionEvaluator\x12K\n\x08\x45valuate\x12\x1d.calculator.ExpressionRequest\x1a\x1e.calculator.ExpressionResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'calculator_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_EXPRESSIONREQUEST_VARIABLESENTRY']._loaded_options = None
+  _globals['_EXPRESSIONREQUEST_VARIABLESENTRY']._serialized_options = b'8\001'
   _globals['_CALCULATIONREQUEST']._serialized_start=32
   _globals['_CALCULATIONREQUEST']._serialized_end=102
   _globals['_CALCULATIONRESPONSE']._serialized_start=104
   _globals['_CALCULATIONRESPONSE']._serialized_end=203
-  _globals['_CALCULATOR']._serialized_start=206
-  _globals['_CALCULATOR']._serialized_end=527
+  _globals['_DOUBLECALCULATIONREQUEST']._serialized_start=205
+  _globals['_DOUBLECALCULATIONREQUEST']._serialized_end=281
+  _globals['_DOUBLECALCULATIONRESPONSE']._serialized_start=283
+  _globals['_DOUBLECALCULATIONRESPONSE']._serialized_end=388
+  _globals['_DECIMALCALCULATIONREQUEST']._serialized_start=390
+  _globals['_DECIMALCALCULATIONREQUEST']._serialized_end=486
+  _globals['_DECIMALCALCULATIONRESPONSE']._serialized_start=488
+  _globals['_DECIMALCALCULATIONRESPONSE']._serialized_end=594
+  _globals['_WATCHOPERATIONREQUEST']._serialized_start=596
+  _globals['_WATCHOPERATIONREQUEST']._serialized_end=666
+  _globals['_OPERATIONSTATUS']._serialized_start=668
+  _globals['_OPERATIONSTATUS']._serialized_end=762
+  _globals['_EXPRESSIONREQUEST']._serialized_start=765
+  _globals['_EXPRESSIONREQUEST']._serialized_end=976
+  _globals['_EXPRESSIONREQUEST_VARIABLESENTRY']._serialized_start=928
+  _globals['_EXPRESSIONREQUEST_VARIABLESENTRY']._serialized_end=976
+  _globals['_EXPRESSIONRESPONSE']._serialized_start=979
+  _globals['_EXPRESSIONRESPONSE']._serialized_end=1130
+  _globals['_CALCULATOR']._serialized_start=1133
+  _globals['_CALCULATOR']._serialized_end=2314
+  _globals['_EXPRESSIONEVALUATOR']._serialized_start=2316
+  _globals['_EXPRESSIONEVALUATOR']._serialized_end=2414
 # @@protoc_insertion_point(module_scope)
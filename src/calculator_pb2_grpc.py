@@ -54,6 +54,51 @@ class CalculatorStub(object):
                 request_serializer=calculator__pb2.CalculationRequest.SerializeToString,
                 response_deserializer=calculator__pb2.CalculationResponse.FromString,
                 _registered_method=True)
+        self.AddDouble = channel.unary_unary(
+                '/calculator.Calculator/AddDouble',
+                request_serializer=calculator__pb2.DoubleCalculationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.DoubleCalculationResponse.FromString,
+                _registered_method=True)
+        self.SubtractDouble = channel.unary_unary(
+                '/calculator.Calculator/SubtractDouble',
+                request_serializer=calculator__pb2.DoubleCalculationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.DoubleCalculationResponse.FromString,
+                _registered_method=True)
+        self.MultiplyDouble = channel.unary_unary(
+                '/calculator.Calculator/MultiplyDouble',
+                request_serializer=calculator__pb2.DoubleCalculationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.DoubleCalculationResponse.FromString,
+                _registered_method=True)
+        self.DivideDouble = channel.unary_unary(
+                '/calculator.Calculator/DivideDouble',
+                request_serializer=calculator__pb2.DoubleCalculationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.DoubleCalculationResponse.FromString,
+                _registered_method=True)
+        self.AddDecimal = channel.unary_unary(
+                '/calculator.Calculator/AddDecimal',
+                request_serializer=calculator__pb2.DecimalCalculationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.DecimalCalculationResponse.FromString,
+                _registered_method=True)
+        self.SubtractDecimal = channel.unary_unary(
+                '/calculator.Calculator/SubtractDecimal',
+                request_serializer=calculator__pb2.DecimalCalculationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.DecimalCalculationResponse.FromString,
+                _registered_method=True)
+        self.MultiplyDecimal = channel.unary_unary(
+                '/calculator.Calculator/MultiplyDecimal',
+                request_serializer=calculator__pb2.DecimalCalculationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.DecimalCalculationResponse.FromString,
+                _registered_method=True)
+        self.DivideDecimal = channel.unary_unary(
+                '/calculator.Calculator/DivideDecimal',
+                request_serializer=calculator__pb2.DecimalCalculationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.DecimalCalculationResponse.FromString,
+                _registered_method=True)
+        self.WatchOperation = channel.unary_stream(
+                '/calculator.Calculator/WatchOperation',
+                request_serializer=calculator__pb2.WatchOperationRequest.SerializeToString,
+                response_deserializer=calculator__pb2.OperationStatus.FromString,
+                _registered_method=True)
 
 
 class CalculatorServicer(object):
@@ -83,6 +128,63 @@ class CalculatorServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def AddDouble(self, request, context):
+        """Double precision variants (64-bit operands and result)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SubtractDouble(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MultiplyDouble(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DivideDouble(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def AddDecimal(self, request, context):
+        """Arbitrary precision variants (operands and result as decimal strings)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SubtractDecimal(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MultiplyDecimal(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DivideDecimal(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WatchOperation(self, request, context):
+        """Streams the status of a queued operation until it reaches a final state
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_CalculatorServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -106,6 +208,51 @@ def add_CalculatorServicer_to_server(servicer, server):
                     request_deserializer=calculator__pb2.CalculationRequest.FromString,
                     response_serializer=calculator__pb2.CalculationResponse.SerializeToString,
             ),
+            'AddDouble': grpc.unary_unary_rpc_method_handler(
+                    servicer.AddDouble,
+                    request_deserializer=calculator__pb2.DoubleCalculationRequest.FromString,
+                    response_serializer=calculator__pb2.DoubleCalculationResponse.SerializeToString,
+            ),
+            'SubtractDouble': grpc.unary_unary_rpc_method_handler(
+                    servicer.SubtractDouble,
+                    request_deserializer=calculator__pb2.DoubleCalculationRequest.FromString,
+                    response_serializer=calculator__pb2.DoubleCalculationResponse.SerializeToString,
+            ),
+            'MultiplyDouble': grpc.unary_unary_rpc_method_handler(
+                    servicer.MultiplyDouble,
+                    request_deserializer=calculator__pb2.DoubleCalculationRequest.FromString,
+                    response_serializer=calculator__pb2.DoubleCalculationResponse.SerializeToString,
+            ),
+            'DivideDouble': grpc.unary_unary_rpc_method_handler(
+                    servicer.DivideDouble,
+                    request_deserializer=calculator__pb2.DoubleCalculationRequest.FromString,
+                    response_serializer=calculator__pb2.DoubleCalculationResponse.SerializeToString,
+            ),
+            'AddDecimal': grpc.unary_unary_rpc_method_handler(
+                    servicer.AddDecimal,
+                    request_deserializer=calculator__pb2.DecimalCalculationRequest.FromString,
+                    response_serializer=calculator__pb2.DecimalCalculationResponse.SerializeToString,
+            ),
+            'SubtractDecimal': grpc.unary_unary_rpc_method_handler(
+                    servicer.SubtractDecimal,
+                    request_deserializer=calculator__pb2.DecimalCalculationRequest.FromString,
+                    response_serializer=calculator__pb2.DecimalCalculationResponse.SerializeToString,
+            ),
+            'MultiplyDecimal': grpc.unary_unary_rpc_method_handler(
+                    servicer.MultiplyDecimal,
+                    request_deserializer=calculator__pb2.DecimalCalculationRequest.FromString,
+                    response_serializer=calculator__pb2.DecimalCalculationResponse.SerializeToString,
+            ),
+            'DivideDecimal': grpc.unary_unary_rpc_method_handler(
+                    servicer.DivideDecimal,
+                    request_deserializer=calculator__pb2.DecimalCalculationRequest.FromString,
+                    response_serializer=calculator__pb2.DecimalCalculationResponse.SerializeToString,
+            ),
+            'WatchOperation': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchOperation,
+                    request_deserializer=calculator__pb2.WatchOperationRequest.FromString,
+                    response_serializer=calculator__pb2.OperationStatus.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'calculator.Calculator', rpc_method_handlers)
@@ -224,3 +371,321 @@ class Calculator(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def AddDouble(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.Calculator/AddDouble',
+            calculator__pb2.DoubleCalculationRequest.SerializeToString,
+            calculator__pb2.DoubleCalculationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SubtractDouble(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.Calculator/SubtractDouble',
+            calculator__pb2.DoubleCalculationRequest.SerializeToString,
+            calculator__pb2.DoubleCalculationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MultiplyDouble(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.Calculator/MultiplyDouble',
+            calculator__pb2.DoubleCalculationRequest.SerializeToString,
+            calculator__pb2.DoubleCalculationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def DivideDouble(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.Calculator/DivideDouble',
+            calculator__pb2.DoubleCalculationRequest.SerializeToString,
+            calculator__pb2.DoubleCalculationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def AddDecimal(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.Calculator/AddDecimal',
+            calculator__pb2.DecimalCalculationRequest.SerializeToString,
+            calculator__pb2.DecimalCalculationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SubtractDecimal(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.Calculator/SubtractDecimal',
+            calculator__pb2.DecimalCalculationRequest.SerializeToString,
+            calculator__pb2.DecimalCalculationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MultiplyDecimal(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.Calculator/MultiplyDecimal',
+            calculator__pb2.DecimalCalculationRequest.SerializeToString,
+            calculator__pb2.DecimalCalculationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def DivideDecimal(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.Calculator/DivideDecimal',
+            calculator__pb2.DecimalCalculationRequest.SerializeToString,
+            calculator__pb2.DecimalCalculationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def WatchOperation(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/calculator.Calculator/WatchOperation',
+            calculator__pb2.WatchOperationRequest.SerializeToString,
+            calculator__pb2.OperationStatus.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+
+class ExpressionEvaluatorStub(object):
+    """Evaluates whole expressions, dispatching every step to the Calculator services
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Evaluate = channel.unary_unary(
+                '/calculator.ExpressionEvaluator/Evaluate',
+                request_serializer=calculator__pb2.ExpressionRequest.SerializeToString,
+                response_deserializer=calculator__pb2.ExpressionResponse.FromString,
+                _registered_method=True)
+
+
+class ExpressionEvaluatorServicer(object):
+    """Evaluates whole expressions, dispatching every step to the Calculator services
+    """
+
+    def Evaluate(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_ExpressionEvaluatorServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Evaluate': grpc.unary_unary_rpc_method_handler(
+                    servicer.Evaluate,
+                    request_deserializer=calculator__pb2.ExpressionRequest.FromString,
+                    response_serializer=calculator__pb2.ExpressionResponse.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'calculator.ExpressionEvaluator', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('calculator.ExpressionEvaluator', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class ExpressionEvaluator(object):
+    """Evaluates whole expressions, dispatching every step to the Calculator services
+    """
+
+    @staticmethod
+    def Evaluate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/calculator.ExpressionEvaluator/Evaluate',
+            calculator__pb2.ExpressionRequest.SerializeToString,
+            calculator__pb2.ExpressionResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -3,21 +3,79 @@ import json
 import time
 import uuid
 import argparse
+from concurrent import futures
+from requests.adapters import HTTPAdapter
+import grpc
+import calculator_pb2
+import calculator_pb2_grpc
+
+# Statuses after which a queued operation will not change any more
+TERMINAL_STATUSES = ('completed', 'failed', 'dead_letter')
+
+# Default service addresses for talking gRPC directly, bypassing the gateway
+GRPC_ENDPOINTS = {
+    'add': 'localhost:50051',
+    'subtract': 'localhost:50052',
+    'multiply': 'localhost:50053',
+    'divide': 'localhost:50054'
+}
+GRPC_METHODS = {
+    'add': 'Add',
+    'subtract': 'Subtract',
+    'multiply': 'Multiply',
+    'divide': 'Divide'
+}
+PRECISION_VARIANTS = {
+    'float': ('', calculator_pb2.CalculationRequest),
+    'double': ('Double', calculator_pb2.DoubleCalculationRequest),
+    'decimal': ('Decimal', calculator_pb2.DecimalCalculationRequest)
+}
+
+
+def run_many(calculate, operations, max_concurrency):
+    """Run calculate() over operation dicts with at most max_concurrency in flight
+
+    Results come back in the order of the operations.
+    """
+    def run(op):
+        return calculate(op['operation'], op['num1'], op['num2'], op.get('precision'))
+    
+    with futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return list(executor.map(run, operations))
+
 
 class CalculatorClient:
-    def __init__(self, gateway_url="http://localhost:5000"):
+    def __init__(self, gateway_url="http://localhost:5000", pool_size=10):
         self.gateway_url = gateway_url
+        # One session keeps connections to the gateway alive between calls;
+        # pool_size bounds the connections reused by concurrent calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def close(self):
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
         
-    def calculate(self, operation, num1, num2):
+    def calculate(self, operation, num1, num2, precision=None):
         """Send a calculation request to the API Gateway"""
         payload = {
             "operation": operation,
             "num1": num1,
             "num2": num2
         }
+        # 'float', 'double' (gateway default) or 'decimal' (pass operands as strings)
+        if precision is not None:
+            payload["precision"] = precision
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.gateway_url}/calculate", 
                 json=payload,
                 headers={"Content-Type": "application/json"}
@@ -25,16 +83,20 @@ class CalculatorClient:
             
             if response.status_code == 200:
                 return response.json()
-            elif response.status_code == 503:
-                # Service unavailable, request was queued
+            elif response.status_code in (503, 504):
+                # Service unavailable or too slow, request was queued
                 result = response.json()
                 print(f"Operation queued: {result}")
                 
-                # Poll for status if an operation_id was provided
+                # Wait for the pushed result if an operation_id was provided
                 if 'operation_id' in result:
-                    return self.poll_operation_status(result['operation_id'])
+                    return self.watch_operation(result['operation_id'])
                 else:
                     return result
+            elif response.status_code == 429:
+                # Queue full, the request was not accepted
+                print(f"Rejected, retry after {response.headers.get('Retry-After')}s")
+                return response.json()
             else:
                 print(f"Error: {response.status_code} - {response.text}")
                 return response.json()
@@ -43,41 +105,83 @@ class CalculatorClient:
             print(f"Request failed: {e}")
             return {"error": str(e)}
     
-    def poll_operation_status(self, operation_id, max_polls=10, poll_interval=2):
-        """Poll for the status of a queued operation"""
+    def calculate_many(self, operations, max_concurrency=8):
+        """Send many calculations concurrently over the pooled connections
+        
+        operations are dicts with 'operation', 'num1', 'num2' and optionally
+        'precision'; results are returned in the same order.
+        """
+        return run_many(self.calculate, operations, max_concurrency)
+    
+    def watch_operation(self, operation_id, timeout=60):
+        """Wait for a queued operation on the gateway's event stream"""
+        print(f"Waiting for operation {operation_id}...")
+        
+        try:
+            response = self.session.get(
+                f"{self.gateway_url}/operation/{operation_id}/events",
+                params={"timeout": timeout},
+                stream=True,
+                timeout=(5, timeout + 20)
+            )
+            if response.status_code != 200:
+                print(f"Event stream unavailable: {response.status_code} - {response.text}")
+                return self.poll_operation_status(operation_id)
+            
+            with response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    result = json.loads(line[len("data:"):])
+                    status = result.get('status')
+                    if status in TERMINAL_STATUSES:
+                        print(f"Operation {status}: {result}")
+                        return result
+                    if status:
+                        print(f"Operation status: {status}. Waiting...")
+        except requests.exceptions.RequestException as e:
+            print(f"Event stream failed: {e}")
+            return self.poll_operation_status(operation_id)
+        
+        return {"error": f"Operation timed out after {timeout} seconds"}
+    
+    def poll_operation_status(self, operation_id, max_polls=10, wait=6):
+        """Long-poll for the status of a queued operation"""
         print(f"Polling for operation {operation_id}...")
         
         for i in range(max_polls):
             try:
-                response = requests.get(
-                    f"{self.gateway_url}/operation/{operation_id}"
+                # The gateway holds the request until the operation finishes or wait runs out
+                response = self.session.get(
+                    f"{self.gateway_url}/operation/{operation_id}",
+                    params={"wait": wait},
+                    timeout=wait + 10
                 )
                 
                 if response.status_code == 200:
                     result = response.json()
-                    if result.get('status') == 'completed':
-                        print(f"Operation completed: {result}")
+                    if result.get('status') in TERMINAL_STATUSES:
+                        print(f"Operation {result['status']}: {result}")
                         return result
                     print(f"Operation status: {result.get('status')}. Waiting...")
                 else:
                     print(f"Error checking status: {response.status_code} - {response.text}")
-                    
-                # Wait before polling again
-                time.sleep(poll_interval)
+                    time.sleep(wait)
                 
             except requests.exceptions.RequestException as e:
                 print(f"Status check failed: {e}")
+                time.sleep(wait)
         
-        return {"error": f"Operation timed out after {max_polls * poll_interval} seconds"}
+        return {"error": f"Operation timed out after {max_polls * wait} seconds"}
     
     def health_check(self):
         """Check the health of the API Gateway and services"""
         try:
             # Check API Gateway health
-            gateway_response = requests.get(f"{self.gateway_url}/health")
+            gateway_response = self.session.get(f"{self.gateway_url}/health")
             
             # Check services health
-            services_response = requests.get(f"{self.gateway_url}/services/health")
+            services_response = self.session.get(f"{self.gateway_url}/services/health")
             
             return {
                 "gateway": gateway_response.json() if gateway_response.ok else {"error": gateway_response.text},
@@ -87,6 +191,97 @@ class CalculatorClient:
             return {"error": f"Health check failed: {str(e)}"}
 
 
+def build_grpc_request(operation, num1, num2, precision=None):
+    """Return (method name, request message) for a calculation"""
+    if operation not in GRPC_METHODS:
+        raise ValueError(f"Unsupported operation: {operation}")
+    precision = precision or 'double'
+    if precision not in PRECISION_VARIANTS:
+        raise ValueError(f"Unsupported precision: {precision}")
+    
+    method_suffix, request_class = PRECISION_VARIANTS[precision]
+    if precision == 'decimal':
+        num1, num2 = str(num1), str(num2)
+    request = request_class(num1=num1, num2=num2, operation_id=str(uuid.uuid4()))
+    return GRPC_METHODS[operation] + method_suffix, request
+
+
+def grpc_result(operation, num1, num2, precision, response):
+    """Shape a gRPC response like the gateway's JSON answer"""
+    if not response.success:
+        return {
+            "error": response.error_message or "Unknown error",
+            "operation_id": response.operation_id
+        }
+    return {
+        "operation": operation,
+        "num1": num1,
+        "num2": num2,
+        "result": response.result,
+        "precision": precision or 'double',
+        "operation_id": response.operation_id
+    }
+
+
+class GrpcCalculatorClient:
+    """Calls the calculator services directly over gRPC, skipping the gateway
+    
+    There is no MOM fallback on this path: if a service is down the call fails.
+    Pass target to send every operation to one address (e.g. the combined
+    service on port 50050), or endpoints to override single operations.
+    """
+    def __init__(self, target=None, endpoints=None, timeout=5.0):
+        if target:
+            self.endpoints = {operation: target for operation in GRPC_ENDPOINTS}
+        else:
+            self.endpoints = dict(GRPC_ENDPOINTS, **(endpoints or {}))
+        self.timeout = timeout
+        # One channel per address, shared by all operations served there
+        self.channels = {}
+        self.stubs = {}
+        for address in set(self.endpoints.values()):
+            self.channels[address] = grpc.insecure_channel(address)
+            self.stubs[address] = calculator_pb2_grpc.CalculatorStub(self.channels[address])
+    
+    def close(self):
+        for channel in self.channels.values():
+            channel.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def calculate(self, operation, num1, num2, precision=None):
+        """Run one calculation on the service for the operation"""
+        try:
+            method_name, request = build_grpc_request(operation, num1, num2, precision)
+            stub = self.stubs[self.endpoints[operation]]
+            response = getattr(stub, method_name)(request, timeout=self.timeout)
+            return grpc_result(operation, num1, num2, precision, response)
+        except ValueError as e:
+            return {"error": str(e)}
+        except grpc.RpcError as e:
+            print(f"Request failed: {e.code()} - {e.details()}")
+            return {"error": e.details() or str(e.code())}
+    
+    def calculate_many(self, operations, max_concurrency=8):
+        """Send many calculations concurrently; results keep the input order"""
+        return run_many(self.calculate, operations, max_concurrency)
+    
+    def health_check(self):
+        """Check which service addresses accept connections"""
+        services = {}
+        for address, channel in self.channels.items():
+            try:
+                grpc.channel_ready_future(channel).result(timeout=self.timeout)
+                services[address] = "healthy"
+            except grpc.FutureTimeoutError:
+                services[address] = "unavailable"
+        return {"services": services}
+
+
 def run_manual_mode(client):
     while True:
         print("\n=== Calculator Client Menu ===")
@@ -160,8 +355,21 @@ def main():
         help="Base URL of the API Gateway (default: http://localhost:5000)"
     )
 
+    parser.add_argument(
+        "--grpc",
+        action="store_true",
+        help="Call the services directly over gRPC instead of through the gateway"
+    )
+    parser.add_argument(
+        "--target",
+        help="With --grpc, send every operation to this address (e.g. localhost:50050)"
+    )
+
     args = parser.parse_args()
-    client = CalculatorClient(gateway_url=args.url)
+    if args.grpc:
+        client = GrpcCalculatorClient(target=args.target)
+    else:
+        client = CalculatorClient(gateway_url=args.url)
 
     if args.mode == "manual":
         run_manual_mode(client)
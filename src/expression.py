@@ -0,0 +1,217 @@
+# Parsing and parallel evaluation of arithmetic expressions
+import ast
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent import futures
+
+# Guards against expressions that would tie up the services for too long
+MAX_EXPRESSION_LENGTH = 10000
+MAX_EXPRESSION_NODES = 1000
+
+BINARY_OPERATIONS = {
+    ast.Add: 'add',
+    ast.Sub: 'subtract',
+    ast.Mult: 'multiply',
+    ast.Div: 'divide'
+}
+SYMBOLS = {'add': '+', 'subtract': '-', 'multiply': '*', 'divide': '/'}
+# Operand order does not matter for these, so a+b and b+a share one node
+COMMUTATIVE = ('add', 'multiply')
+
+
+class ExpressionNode:
+    """One value of the DAG: a number, or an operation on two other nodes"""
+    __slots__ = ('key', 'operation', 'left', 'right', 'value')
+
+    def __init__(self, key, operation=None, left=None, right=None, value=None):
+        self.key = key
+        self.operation = operation
+        self.left = left
+        self.right = right
+        self.value = value
+
+    @property
+    def is_leaf(self):
+        return self.operation is None
+
+
+def parse_expression(expression, variables=None, number=float):
+    """Parse an arithmetic expression into a DAG and return its root node
+
+    Supports + - * /, parentheses, unary minus, numeric literals and named
+    variables. number converts literal text and variable values, e.g. float or
+    a decimal converter. Identical sub-expressions become a single node.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}")
+    except (RecursionError, MemoryError):
+        raise ValueError("Expression is nested too deeply")
+
+    variables = variables or {}
+    nodes = {}
+
+    def intern(key, **fields):
+        if key not in nodes:
+            if len(nodes) >= MAX_EXPRESSION_NODES:
+                raise ValueError(f"Expression has more than {MAX_EXPRESSION_NODES} terms")
+            nodes[key] = ExpressionNode(key, **fields)
+        return nodes[key]
+
+    def leaf(value):
+        return intern(str(value), value=value)
+
+    def build(node):
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return leaf(number(ast.get_source_segment(expression.strip(), node)))
+        if isinstance(node, ast.Name):
+            if node.id not in variables:
+                raise ValueError(f"Undefined variable: {node.id}")
+            return leaf(number(variables[node.id]))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            operand = build(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            if operand.is_leaf:
+                return leaf(-operand.value)
+            return combine('subtract', leaf(number('0')), operand)
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in BINARY_OPERATIONS:
+                raise ValueError(f"Unsupported operator in expression: {type(node.op).__name__}")
+            return combine(BINARY_OPERATIONS[type(node.op)], build(node.left), build(node.right))
+        raise ValueError(f"Unsupported syntax in expression: {type(node).__name__}")
+
+    def combine(operation, left, right):
+        if operation in COMMUTATIVE and right.key < left.key:
+            left, right = right, left
+        key = f"({left.key}{SYMBOLS[operation]}{right.key})"
+        return intern(key, operation=operation, left=left, right=right)
+
+    try:
+        return build(tree.body)
+    except RecursionError:
+        raise ValueError("Expression is nested too deeply")
+
+
+def topological_order(root):
+    """Operation nodes of the DAG, each after the nodes it depends on"""
+    order = []
+    seen = set()
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if node.is_leaf or (node.key in seen and not expanded):
+            continue
+        if expanded:
+            order.append(node)
+            continue
+        seen.add(node.key)
+        stack.append((node, True))
+        stack.append((node.right, False))
+        stack.append((node.left, False))
+    return order
+
+
+class ExpressionEvaluator:
+    """Runs the operations of expression DAGs, independent ones in parallel
+
+    Results of sub-expressions are kept in a bounded LRU cache shared by all
+    evaluations, keyed by scope (e.g. the precision) and sub-expression.
+    """
+    def __init__(self, max_parallel=8, cache_size=1024):
+        self.executor = futures.ThreadPoolExecutor(
+            max_workers=max_parallel, thread_name_prefix="expression"
+        )
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    def _cached(self, key):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return True, self.cache[key]
+        return False, None
+
+    def _remember(self, key, value):
+        if not self.cache_size:
+            return
+        with self.lock:
+            self.cache[key] = value
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def evaluate(self, root, compute, progress=None, on_step=None, scope=''):
+        """Evaluate the DAG under root and return (result, stats)
+
+        compute(operation, num1, num2, key) performs the step of the node with
+        that key, which is the same on every evaluation. progress maps node
+        keys to results already known, e.g. saved before a failure, and
+        on_step(key, result) is called for every other step once its result
+        is known, whether computed or taken from the cache. If a step fails
+        the steps already running are allowed to finish (and reported to
+        on_step) before the error is raised.
+        """
+        if root.is_leaf:
+            return root.value, {"steps": 0, "reused_steps": 0}
+
+        values = dict(progress or {})
+        stats = {"steps": 0, "reused_steps": 0}
+        pending = []
+        for node in topological_order(root):
+            if node.key in values:
+                stats["reused_steps"] += 1
+                continue
+            hit, value = self._cached((scope, node.key))
+            if hit:
+                values[node.key] = value
+                stats["reused_steps"] += 1
+                if on_step is not None:
+                    on_step(node.key, value)
+            else:
+                pending.append(node)
+
+        def value_of(node):
+            return node.value if node.is_leaf else values[node.key]
+
+        def ready(node):
+            return all(child.is_leaf or child.key in values for child in (node.left, node.right))
+
+        running = {}
+        error = None
+        while pending or running:
+            # Dispatch every step whose operands are known
+            if error is None:
+                for node in [node for node in pending if ready(node)]:
+                    pending.remove(node)
+                    # Each step runs in a copy of the caller's context (e.g. its trace)
+                    future = self.executor.submit(
+                        contextvars.copy_context().run,
+                        compute, node.operation, value_of(node.left), value_of(node.right), node.key
+                    )
+                    running[future] = node
+            if not running:
+                break
+
+            done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                try:
+                    value = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                values[node.key] = value
+                stats["steps"] += 1
+                self._remember((scope, node.key), value)
+                if on_step is not None:
+                    on_step(node.key, value)
+
+        if error is not None:
+            raise error
+        return values[root.key], stats
@@ -0,0 +1,298 @@
+# expression_service.py
+# Evaluates whole expressions by dispatching their steps to the calculator services
+import os
+import uuid
+import hashlib
+import argparse
+import threading
+from concurrent import futures
+import grpc
+import calculator_pb2
+import calculator_pb2_grpc
+import tracing
+import profiling
+import grpc_options
+import broker_client
+from mom_implementation import TERMINAL_STATUSES
+from load_balancer import EndpointPool
+from expression import parse_expression, ExpressionEvaluator
+from microservice_implementation import (
+    DEFAULT_DECIMAL_PRECISION,
+    MAX_DECIMAL_PRECISION,
+    parse_decimal,
+    run_prefork
+)
+
+SERVICE_PORTS = {
+    'add': 50051,
+    'subtract': 50052,
+    'multiply': 50053,
+    'divide': 50054
+}
+
+# Same SERVICE_ENDPOINTS_<OP> variables as the gateway
+SERVICE_ENDPOINTS = {
+    operation: os.environ.get(
+        f'SERVICE_ENDPOINTS_{operation.upper()}', f'localhost:{port}'
+    ).split(',')
+    for operation, port in SERVICE_PORTS.items()
+}
+
+GRPC_METHODS = {
+    'add': 'Add',
+    'subtract': 'Subtract',
+    'multiply': 'Multiply',
+    'divide': 'Divide'
+}
+
+EXPRESSION_QUEUE = 'expressions'
+STEP_TIMEOUT = 5.0
+
+
+class StepError(Exception):
+    """A step the service rejected, e.g. a division by zero; retrying cannot help"""
+
+
+class OperationDispatcher:
+    """Sends single steps to the calculator services, trying each replica once"""
+    def __init__(self, endpoints=None, strategy=None):
+        strategy = strategy or os.environ.get('LOAD_BALANCER', 'power_of_two')
+        self.pools = {
+            operation: EndpointPool(addresses, strategy)
+            for operation, addresses in (endpoints or SERVICE_ENDPOINTS).items()
+        }
+        self.stubs = {}
+        self.lock = threading.Lock()
+
+    def _stub(self, address):
+        with self.lock:
+            if address not in self.stubs:
+                self.stubs[address] = calculator_pb2_grpc.CalculatorStub(
+                    grpc.insecure_channel(address, options=grpc_options.channel_options())
+                )
+            return self.stubs[address]
+
+    def compute(self, operation, num1, num2, precision, digits, operation_id):
+        if precision == 'decimal':
+            method_name = GRPC_METHODS[operation] + 'Decimal'
+            request = calculator_pb2.DecimalCalculationRequest(
+                num1=str(num1), num2=str(num2), operation_id=operation_id, precision=digits
+            )
+        else:
+            method_name = GRPC_METHODS[operation] + 'Double'
+            request = calculator_pb2.DoubleCalculationRequest(
+                num1=float(num1), num2=float(num2), operation_id=operation_id
+            )
+
+        pool = self.pools[operation]
+        failed_endpoints = []
+        last_error = None
+        for _ in pool.endpoints:
+            endpoint = pool.pick(exclude=failed_endpoints)
+            try:
+                with tracing.span(f"grpc.client {method_name}", endpoint=endpoint.address), \
+                        pool.track(endpoint):
+                    stub = self._stub(endpoint.address)
+                    response = getattr(stub, method_name)(
+                        request, timeout=STEP_TIMEOUT, metadata=tracing.grpc_metadata(),
+                        compression=grpc_options.call_compression(request)
+                    )
+            except grpc.RpcError as e:
+                failed_endpoints.append(endpoint)
+                last_error = e
+                continue
+
+            if not response.success:
+                raise StepError(response.error_message or "Unknown error")
+            return response.result
+
+        raise last_error
+
+
+class ExpressionService(calculator_pb2_grpc.ExpressionEvaluatorServicer):
+    """Evaluates expressions; each evaluation is a message in the 'expressions' queue
+
+    Finished steps are saved as the message's progress, so an evaluation
+    interrupted by an unreachable service resumes from them later.
+    """
+    def __init__(self, dispatcher=None, max_parallel=8):
+        self.message_queue = broker_client.get_queue(EXPRESSION_QUEUE)
+        self.dispatcher = dispatcher or OperationDispatcher()
+        self.evaluator = ExpressionEvaluator(max_parallel)
+        # Set to end the recovery consumers
+        self.stopped = threading.Event()
+
+    def start_recovery(self, poll_interval=5):
+        """Resume evaluations that were queued or interrupted, one consumer per queue shard"""
+        def resume(op):
+            with tracing.span("expression.resume", parent=op.get('traceparent')):
+                response = self.run(op['id'], op['content'], op.get('progress'))
+            print(f"Resumed evaluation {op['id']}: "
+                  f"{response.result if response.success else response.error_message}")
+            return response
+
+        def consume(shard):
+            while not self.stopped.is_set():
+                # A message queued again because a service is down ends the
+                # pass until the next poll
+                interrupted = False
+                try:
+                    if isinstance(shard, broker_client.RemoteQueue):
+                        # The broker pushes messages as they arrive
+                        for op in shard.subscribe():
+                            if resume(op).queued:
+                                interrupted = True
+                                break
+                    else:
+                        shard.requeue_expired()
+                        while True:
+                            op = shard.dequeue()
+                            if op is None:
+                                break
+                            if resume(op).queued:
+                                interrupted = True
+                                break
+                except Exception as e:
+                    print(f"Error draining {shard.queue_name} queue: {e}")
+                if interrupted:
+                    # Backends that notify would wake up at once for the
+                    # message just released
+                    self.stopped.wait(poll_interval)
+                else:
+                    shard.wait_for_messages(poll_interval)
+
+        for shard in self.message_queue.shards:
+            recovery_thread = threading.Thread(target=consume, args=(shard,))
+            recovery_thread.daemon = True
+            recovery_thread.start()
+
+    def parse(self, content):
+        precision = content.get('precision') or 'double'
+        if precision == 'double':
+            number = float
+        elif precision == 'decimal':
+            number = parse_decimal
+            if (content.get('digits') or 0) > MAX_DECIMAL_PRECISION:
+                raise ValueError(f"Precision is limited to {MAX_DECIMAL_PRECISION} digits")
+        else:
+            raise ValueError(f"Unsupported precision: {precision}")
+        return parse_expression(content['expression'], content.get('variables'), number)
+
+    def Evaluate(self, request, context):
+        operation_id = request.operation_id or str(uuid.uuid4())
+        content = {
+            'expression': request.expression,
+            'variables': dict(request.variables),
+            'precision': request.precision or 'double',
+            'digits': request.digits,
+            'operation': 'evaluate',
+            'operation_id': operation_id
+        }
+        try:
+            root = self.parse(content)
+        except ValueError as e:
+            return calculator_pb2.ExpressionResponse(
+                operation_id=operation_id, success=False, error_message=str(e)
+            )
+
+        message_id, earlier = self.message_queue.enqueue_operation(content, status='processing')
+        if earlier is None:
+            return self.run(message_id, content, root=root)
+        if earlier['status'] == 'completed':
+            # A retry of an evaluation that already finished
+            return calculator_pb2.ExpressionResponse(
+                result=str(earlier['result']), operation_id=operation_id, success=True
+            )
+        if earlier['status'] in TERMINAL_STATUSES:
+            return calculator_pb2.ExpressionResponse(
+                operation_id=operation_id, success=False,
+                error_message=str(earlier.get('result') or earlier.get('dead_letter_reason'))
+            )
+        # Still running or queued: carry on from the steps it finished
+        return self.run(message_id, earlier['content'], earlier.get('progress'))
+
+    def run(self, message_id, content, progress=None, root=None):
+        """Evaluate a queued expression, resuming from progress, and acknowledge it"""
+        operation_id = content['operation_id']
+        precision = content.get('precision') or 'double'
+        digits = content.get('digits') or DEFAULT_DECIMAL_PRECISION
+        progress = dict(progress or {})
+
+        def compute(operation, num1, num2, key):
+            # Named after the step rather than the dispatch order, so a resumed
+            # evaluation finds the results of its own steps and no others
+            step_id = hashlib.sha1(key.encode()).hexdigest()[:16]
+            return self.dispatcher.compute(
+                operation, num1, num2, precision, digits, f"{operation_id}:{step_id}"
+            )
+
+        def on_step(key, value):
+            progress[key] = value
+            self.message_queue.save_progress(message_id, progress)
+
+        try:
+            root = root or self.parse(content)
+            result, stats = self.evaluator.evaluate(
+                root, compute, progress, on_step, scope=f"{precision}:{digits}"
+            )
+            self.message_queue.mark_completed(message_id, str(result))
+            return calculator_pb2.ExpressionResponse(
+                result=str(result),
+                operation_id=operation_id,
+                success=True,
+                steps=stats["steps"],
+                reused_steps=stats["reused_steps"]
+            )
+        except grpc.RpcError as e:
+            # Keep the finished steps and let the consumer retry the rest
+            self.message_queue.release(message_id)
+            return calculator_pb2.ExpressionResponse(
+                operation_id=operation_id,
+                success=False,
+                queued=True,
+                error_message=f"Service unavailable ({e.code().name}). Evaluation queued "
+                              f"with {len(progress)} finished steps."
+            )
+        except Exception as e:
+            self.message_queue.mark_failed(message_id, str(e))
+            return calculator_pb2.ExpressionResponse(
+                operation_id=operation_id, success=False, error_message=str(e)
+            )
+
+
+def _serve_worker(worker_index, port, max_workers, max_parallel):
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        interceptors=(tracing.server_interceptors() or []) + profiling.server_interceptors(),
+        options=grpc_options.server_options(('grpc.so_reuseport', 1)),
+        compression=grpc_options.server_compression()
+    )
+    servicer = ExpressionService(max_parallel=max_parallel)
+    calculator_pb2_grpc.add_ExpressionEvaluatorServicer_to_server(servicer, server)
+    server.add_insecure_port(f'[::]:{port}')
+    server.start()
+    print(f"Expression service running on port {port} (pid {os.getpid()})")
+    profiling.start_from_env()
+
+    if worker_index == 0:
+        servicer.start_recovery()
+
+    try:
+        server.wait_for_termination()
+    finally:
+        server.stop(0)
+
+
+def run_expression_server(port=50055, max_workers=10, workers=1, max_parallel=8):
+    run_prefork(_serve_worker, (port, max_workers, max_parallel), workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expression evaluation service")
+    parser.add_argument("--port", type=int, default=50055, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=1, help="Pre-forked worker processes sharing the port")
+    parser.add_argument("--max-workers", type=int, default=10, help="gRPC handler threads per worker")
+    parser.add_argument("--max-parallel", type=int, default=8,
+                        help="Steps of one evaluation dispatched at the same time")
+    args = parser.parse_args()
+    run_expression_server(args.port, args.max_workers, args.workers, args.max_parallel)
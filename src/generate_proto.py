@@ -27,6 +27,26 @@ service Calculator {
   rpc Subtract (CalculationRequest) returns (CalculationResponse) {}
   rpc Multiply (CalculationRequest) returns (CalculationResponse) {}
   rpc Divide (CalculationRequest) returns (CalculationResponse) {}
+
+  // Double precision variants (64-bit operands and result)
+  rpc AddDouble (DoubleCalculationRequest) returns (DoubleCalculationResponse) {}
+  rpc SubtractDouble (DoubleCalculationRequest) returns (DoubleCalculationResponse) {}
+  rpc MultiplyDouble (DoubleCalculationRequest) returns (DoubleCalculationResponse) {}
+  rpc DivideDouble (DoubleCalculationRequest) returns (DoubleCalculationResponse) {}
+
+  // Arbitrary precision variants (operands and result as decimal strings)
+  rpc AddDecimal (DecimalCalculationRequest) returns (DecimalCalculationResponse) {}
+  rpc SubtractDecimal (DecimalCalculationRequest) returns (DecimalCalculationResponse) {}
+  rpc MultiplyDecimal (DecimalCalculationRequest) returns (DecimalCalculationResponse) {}
+  rpc DivideDecimal (DecimalCalculationRequest) returns (DecimalCalculationResponse) {}
+
+  // Streams the status of a queued operation until it reaches a final state
+  rpc WatchOperation (WatchOperationRequest) returns (stream OperationStatus) {}
+}
+
+// Evaluates whole expressions, dispatching every step to the Calculator services
+service ExpressionEvaluator {
+  rpc Evaluate (ExpressionRequest) returns (ExpressionResponse) {}
 }
 
 message CalculationRequest {
@@ -40,6 +60,63 @@ message CalculationResponse {
   string operation_id = 2;
   bool success = 3;
   string error_message = 4;
+}
+
+message DoubleCalculationRequest {
+  double num1 = 1;
+  double num2 = 2;
+  string operation_id = 3;
+}
+
+message DoubleCalculationResponse {
+  double result = 1;
+  string operation_id = 2;
+  bool success = 3;
+  string error_message = 4;
+}
+
+message DecimalCalculationRequest {
+  string num1 = 1;
+  string num2 = 2;
+  string operation_id = 3;
+  uint32 precision = 4;  // Significant digits; 0 uses the default of 28
+}
+
+message DecimalCalculationResponse {
+  string result = 1;
+  string operation_id = 2;
+  bool success = 3;
+  string error_message = 4;
+}
+
+message WatchOperationRequest {
+  string operation_id = 1;
+  uint32 timeout_seconds = 2;  // 0 uses the server default
+}
+
+message OperationStatus {
+  string operation_id = 1;
+  string status = 2;  // pending, processing, completed, failed or dead_letter
+  string result = 3;  // Set once completed, as a decimal string
+  string error_message = 4;
+}
+
+message ExpressionRequest {
+  string expression = 1;  // e.g. "(a + b) * (c - d) / e"
+  map<string, string> variables = 2;  // Variable values as decimal strings
+  string operation_id = 3;
+  string precision = 4;  // "double" (default) or "decimal"
+  uint32 digits = 5;  // Significant digits for decimal precision
+}
+
+message ExpressionResponse {
+  string result = 1;  // As a decimal string
+  string operation_id = 2;
+  bool success = 3;
+  string error_message = 4;
+  bool queued = 5;  // A service was unreachable; evaluation resumes from the MOM
+  uint32 steps = 6;  // Operations dispatched to the services
+  uint32 reused_steps = 7;  // Operations answered from saved progress or the cache
 }''')
     
     # Generate the Python code
@@ -52,6 +129,9 @@ message CalculationResponse {
         "--python_out=.",
         "--grpc_python_out=.",
         proto_file
+    ] + [
+        # The broker's replication and queue API, shipped alongside this file
+        extra for extra in ["broker.proto"] if os.path.exists(extra)
     ])
     
     if ret_code != 0:
@@ -0,0 +1,82 @@
+# grpc_options.py
+# Compression, message size, flow control and keepalive settings shared by the
+# gRPC channels and servers of every process, from the environment
+import os
+import grpc
+
+COMPRESSION_ALGORITHMS = {
+    'none': None,
+    'gzip': grpc.Compression.Gzip,
+    'deflate': grpc.Compression.Deflate
+}
+
+# Compression of requests sent by the gateway, services and queue clients; only
+# requests of at least GRPC_COMPRESSION_MIN_BYTES are compressed, since small
+# calls get slower and barely smaller
+COMPRESSION = os.environ.get('GRPC_COMPRESSION', 'none')
+COMPRESSION_MIN_BYTES = int(os.environ.get('GRPC_COMPRESSION_MIN_BYTES', '1024'))
+# Compression of every response a server sends, if the caller accepts it
+SERVER_COMPRESSION = os.environ.get('GRPC_SERVER_COMPRESSION', 'none')
+# Largest message sent or received; 0 keeps gRPC's limits (4 MiB received)
+MAX_MESSAGE_BYTES = int(os.environ.get('GRPC_MAX_MESSAGE_BYTES', '0'))
+# Fixed HTTP/2 stream window; 0 lets gRPC size it from the measured bandwidth-delay product
+WINDOW_BYTES = int(os.environ.get('GRPC_WINDOW_BYTES', '0'))
+# Ping idle connections this often to notice dead peers; 0 disables keepalive.
+# Servers accept pings this frequent, so set it on both sides
+KEEPALIVE_MS = int(os.environ.get('GRPC_KEEPALIVE_MS', '0'))
+KEEPALIVE_TIMEOUT_MS = int(os.environ.get('GRPC_KEEPALIVE_TIMEOUT_MS', '20000'))
+
+
+def compression_algorithm(name):
+    if name not in COMPRESSION_ALGORITHMS:
+        raise ValueError(f"Unknown gRPC compression: {name}")
+    return COMPRESSION_ALGORITHMS[name]
+
+
+def _common_options(max_message_bytes, window_bytes, keepalive_ms):
+    options = []
+    if max_message_bytes:
+        options += [('grpc.max_send_message_length', max_message_bytes),
+                    ('grpc.max_receive_message_length', max_message_bytes)]
+    if window_bytes:
+        options += [('grpc.http2.bdp_probe', 0),
+                    ('grpc.http2.lookahead_bytes', window_bytes)]
+    if keepalive_ms:
+        options += [('grpc.keepalive_time_ms', keepalive_ms),
+                    ('grpc.keepalive_timeout_ms', KEEPALIVE_TIMEOUT_MS),
+                    ('grpc.keepalive_permit_without_calls', 1),
+                    ('grpc.http2.max_pings_without_data', 0)]
+    return options
+
+
+def channel_options(*extra, max_message_bytes=MAX_MESSAGE_BYTES, window_bytes=WINDOW_BYTES,
+                    keepalive_ms=KEEPALIVE_MS):
+    """Options for grpc.insecure_channel(); extra options are appended"""
+    return _common_options(max_message_bytes, window_bytes, keepalive_ms) + list(extra)
+
+
+def server_options(*extra, max_message_bytes=MAX_MESSAGE_BYTES, window_bytes=WINDOW_BYTES,
+                   keepalive_ms=KEEPALIVE_MS):
+    """Options for grpc.server()/grpc.aio.server(); extra options are appended"""
+    options = _common_options(max_message_bytes, window_bytes, keepalive_ms)
+    if keepalive_ms:
+        # Otherwise clients pinging more often than every 5 minutes are disconnected
+        options.append(('grpc.http2.min_ping_interval_without_data_ms', keepalive_ms))
+    return options + list(extra)
+
+
+def server_compression(name=SERVER_COMPRESSION):
+    """compression argument for grpc.server()/grpc.aio.server()"""
+    return compression_algorithm(name)
+
+
+def call_compression(request, name=COMPRESSION, min_bytes=COMPRESSION_MIN_BYTES):
+    """compression argument for one call sending request; None sends it uncompressed
+
+    Streaming calls pass request=None and are compressed whenever compression is on.
+    """
+    algorithm = compression_algorithm(name)
+    if algorithm is None or (min_bytes > 0 and request is not None
+                              and request.ByteSize() < min_bytes):
+        return None
+    return algorithm
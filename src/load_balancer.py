@@ -0,0 +1,135 @@
+# Client-side load balancing across the replicas of a calculator service
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Endpoint:
+    """A single service replica with live in-flight and latency statistics"""
+    # Weight of the newest sample in the latency moving average
+    EWMA_ALPHA = 0.3
+    # Latency charged for a failed call so broken replicas are avoided
+    FAILURE_PENALTY = 1.0
+    # Idle replicas forget old latency so a recovered one gets traffic again
+    DECAY_HALF_LIFE = 5.0
+
+    def __init__(self, address):
+        self.address = address
+        self.in_flight = 0
+        self.ewma_latency = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_failure = None
+        self.last_update = time.monotonic()
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+
+    def finish(self, latency, success=True):
+        now = time.monotonic()
+        with self.lock:
+            self.in_flight -= 1
+            if not success:
+                self.failures += 1
+                self.last_failure = now
+                latency = max(latency, self.FAILURE_PENALTY)
+            if self.ewma_latency == 0.0:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency += self.EWMA_ALPHA * (latency - self.ewma_latency)
+            self.last_update = now
+
+    def is_failing(self):
+        """Whether the last call failed within the decay window"""
+        return (self.last_failure is not None and self.last_failure >= self.last_update and
+                time.monotonic() - self.last_failure < self.DECAY_HALF_LIFE)
+
+    def latency(self):
+        """Moving-average latency, decayed by the time since the last sample"""
+        idle = time.monotonic() - self.last_update
+        return self.ewma_latency * 0.5 ** (idle / self.DECAY_HALF_LIFE)
+
+    def load(self):
+        """Expected wait for a new request: queue length scaled by observed latency"""
+        return (self.in_flight + 1) * max(self.latency(), 1e-6)
+
+    def stats(self):
+        return {
+            "address": self.address,
+            "in_flight": self.in_flight,
+            "ewma_latency_ms": round(self.latency() * 1000, 3),
+            "requests": self.requests,
+            "failures": self.failures
+        }
+
+
+class RoundRobinBalancer:
+    def __init__(self):
+        self.counter = itertools.count()
+
+    def pick(self, endpoints):
+        return endpoints[next(self.counter) % len(endpoints)]
+
+
+class LeastOutstandingBalancer:
+    def pick(self, endpoints):
+        return min(endpoints, key=lambda endpoint: (endpoint.in_flight, endpoint.latency()))
+
+
+class PowerOfTwoChoicesBalancer:
+    def pick(self, endpoints):
+        if len(endpoints) == 1:
+            return endpoints[0]
+        first, second = random.sample(endpoints, 2)
+        return first if first.load() <= second.load() else second
+
+
+BALANCERS = {
+    'round_robin': RoundRobinBalancer,
+    'least_outstanding': LeastOutstandingBalancer,
+    'power_of_two': PowerOfTwoChoicesBalancer
+}
+
+
+class EndpointPool:
+    """The replicas of one operation and the strategy used to choose between them"""
+    def __init__(self, addresses, strategy='power_of_two'):
+        if not addresses:
+            raise ValueError("At least one endpoint is required")
+        if strategy not in BALANCERS:
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+        self.endpoints = [Endpoint(address) for address in addresses]
+        self.strategy = strategy
+        self.balancer = BALANCERS[strategy]()
+
+    def pick(self, exclude=()):
+        """Choose a replica, avoiding the excluded ones when alternatives exist"""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        return self.balancer.pick(candidates or self.endpoints)
+
+    @contextmanager
+    def track(self, endpoint):
+        """Account for one call to the endpoint, feeding latency and failures back"""
+        endpoint.start()
+        start_time = time.monotonic()
+        success = False
+        try:
+            yield endpoint
+            success = True
+        finally:
+            endpoint.finish(time.monotonic() - start_time, success)
+
+    def all_failing(self):
+        """Whether every replica failed its most recent call"""
+        return all(endpoint.is_failing() for endpoint in self.endpoints)
+
+    def stats(self):
+        return {
+            "strategy": self.strategy,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints]
+        }
@@ -0,0 +1,148 @@
+# Compact in-memory representation of queued messages
+import os
+import time
+import itertools
+from enum import IntEnum
+
+
+class MessageStatus(IntEnum):
+    """Lifecycle of a message; stored as its label in JSON and as its value in binary records"""
+    PENDING = 1
+    PROCESSING = 2
+    COMPLETED = 3
+    FAILED = 4
+    DEAD_LETTER = 5
+
+    @property
+    def label(self):
+        return self.name.lower()
+
+    @property
+    def is_terminal(self):
+        return self in (MessageStatus.COMPLETED, MessageStatus.FAILED, MessageStatus.DEAD_LETTER)
+
+    @classmethod
+    def parse(cls, value):
+        """Accept a MessageStatus, its label ('pending', ...) or its value"""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            try:
+                return cls[value.upper()]
+            except KeyError:
+                raise ValueError(f"Unknown message status: {value}")
+        return cls(value)
+
+
+# Message IDs: 'm', then 12 hex digits of milliseconds since the Unix epoch,
+# 8 of a per-process sequence number and 12 of a random per-process node ID.
+# Every part has a fixed width, so IDs sort as strings in creation order
+# (exactly within a process, to the millisecond across processes), and the
+# 'm' sorts them after the '<seconds>.<fraction>_...' IDs of older messages.
+MESSAGE_ID_PREFIX = 'm'
+# Wall clock time at the start of the process plus monotonic time since, so
+# IDs from one process never go backwards when the clock is adjusted
+_CLOCK_OFFSET = time.time() - time.monotonic()
+_sequence = itertools.count()
+_node = os.urandom(6).hex()
+
+
+def _new_node():
+    # A forked child continues the parent's sequence, so it needs its own node
+    global _node
+    _node = os.urandom(6).hex()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_new_node)
+
+
+def new_message_id():
+    """Return a unique message ID that sorts after every ID this process made before
+    
+    Needs no lock: next() on an itertools.count is atomic, so concurrent
+    threads always get different sequence numbers.
+    """
+    sequence = next(_sequence) & 0xffffffff
+    milliseconds = int((time.monotonic() + _CLOCK_OFFSET) * 1000)
+    return f"{MESSAGE_ID_PREFIX}{milliseconds:012x}{sequence:08x}{_node}"
+
+
+def message_id_floor(timestamp):
+    """Lowest ID a message created at timestamp (seconds) can get, for ID-range scans"""
+    return f"{MESSAGE_ID_PREFIX}{int(timestamp * 1000):012x}"
+
+
+def message_id_time(message_id):
+    """Creation time in seconds encoded in a message ID, or None for older IDs"""
+    if not message_id.startswith(MESSAGE_ID_PREFIX):
+        return None
+    return int(message_id[1:13], 16) / 1000
+
+
+# Optional fields, left out of the dict form while they are None
+OPTIONAL_FIELDS = ('attempts', 'lease_expires_at', 'result', 'progress',
+                   'traceparent', 'dead_letter_reason')
+
+
+class MessageRecord:
+    """One queued message, with slots instead of a per-message dict
+
+    MessageQueue works on records internally and hands dicts in the stored
+    JSON shape (status as its label) to callers, via to_dict().
+    """
+    __slots__ = ('id', 'timestamp', 'content', 'status', 'priority', 'tenant') + OPTIONAL_FIELDS
+
+    def __init__(self, id, timestamp, content, status, priority, tenant, attempts=None,
+                 lease_expires_at=None, result=None, progress=None, traceparent=None,
+                 dead_letter_reason=None):
+        self.id = id
+        self.timestamp = timestamp
+        self.content = content
+        self.status = MessageStatus.parse(status)
+        self.priority = priority
+        self.tenant = tenant
+        self.attempts = attempts
+        self.lease_expires_at = lease_expires_at
+        self.result = result
+        self.progress = progress
+        self.traceparent = traceparent
+        self.dead_letter_reason = dead_letter_reason
+
+    @classmethod
+    def from_dict(cls, data):
+        # Messages written before priorities and tenants existed lack them
+        return cls(
+            data['id'], data['timestamp'], data['content'], data['status'],
+            data.get('priority', 1), data.get('tenant', 'default'),
+            **{field: data[field] for field in OPTIONAL_FIELDS if field in data}
+        )
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'timestamp': self.timestamp,
+            'content': self.content,
+            'status': self.status.label,
+            'priority': self.priority,
+            'tenant': self.tenant
+        }
+        for field in OPTIONAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    def copy(self):
+        record = MessageRecord.__new__(MessageRecord)
+        for field in MessageRecord.__slots__:
+            setattr(record, field, getattr(self, field))
+        return record
+
+    @property
+    def operation_id(self):
+        # Requests without an operation_id carry an empty one
+        return (self.content.get('operation_id') or None) if isinstance(self.content, dict) else None
+
+    def __repr__(self):
+        return f"MessageRecord({self.id!r}, {self.status.label})"
@@ -0,0 +1,67 @@
+# Lightweight in-process metrics (counters and latency percentiles)
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    def __init__(self, max_samples=2048):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Record one latency sample in seconds"""
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def snapshot(self):
+        """Return count and tail percentiles (ms) over the retained samples"""
+        with self.lock:
+            samples = sorted(self.samples)
+            count = self.count
+
+        if not samples:
+            return {"count": count}
+
+        def percentile(p):
+            index = min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))
+            return round(samples[index] * 1000, 3)
+
+        return {
+            "count": count,
+            "p50_ms": percentile(50),
+            "p90_ms": percentile(90),
+            "p99_ms": percentile(99),
+            "max_ms": round(samples[-1] * 1000, 3)
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = {}
+        self.latencies = {}
+        self.lock = threading.Lock()
+
+    def increment(self, name, amount=1):
+        """Increase a named counter"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        """Record a latency sample under the given name"""
+        with self.lock:
+            tracker = self.latencies.get(name)
+            if tracker is None:
+                tracker = self.latencies[name] = LatencyTracker()
+        tracker.observe(seconds)
+
+    def snapshot(self):
+        """Return all counters and latency summaries"""
+        with self.lock:
+            counters = dict(self.counters)
+            latencies = dict(self.latencies)
+        return {
+            "counters": counters,
+            "latencies": {name: tracker.snapshot() for name, tracker in latencies.items()}
+        }
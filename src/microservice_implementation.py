@@ -2,30 +2,49 @@
 import os
 import sys
 import time
+import signal
 import threading
+import decimal
+import multiprocessing
 import grpc
 from concurrent import futures
 import calculator_pb2
 import calculator_pb2_grpc
-from mom_implementation import MessageBroker
+import tracing
+import profiling
+import grpc_options
+import broker_client
+from mom_implementation import WeightedFairScheduler, TERMINAL_STATUSES
 
 class CalculatorServiceBase:
     def __init__(self, service_name, port):
         self.service_name = service_name
         self.port = port
-        self.message_queue = MessageBroker().get_queue(service_name)
+        self.message_queue = broker_client.get_queue(service_name)
         
-    def start_server(self):
-        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    def start_server(self, workers=1):
+        """Serve on self.port, optionally with N pre-forked workers sharing the port"""
+        run_prefork(self._serve_worker, (), workers)
+        
+    def _serve_worker(self, worker_index):
+        self.server = grpc.server(
+            futures.ThreadPoolExecutor(max_workers=10),
+            interceptors=(tracing.server_interceptors() or []) + profiling.server_interceptors(),
+            options=grpc_options.server_options(('grpc.so_reuseport', 1)),
+            compression=grpc_options.server_compression()
+        )
         self.add_service_to_server(self.server)
         self.server.add_insecure_port(f'[::]:{self.port}')
         self.server.start()
-        print(f"{self.service_name} service running on port {self.port}")
+        print(f"{self.service_name} service running on port {self.port} (pid {os.getpid()})")
+        profiling.start_from_env()
         
-        # Start recovery thread to process any pending operations
-        recovery_thread = threading.Thread(target=self.recovery_process)
-        recovery_thread.daemon = True
-        recovery_thread.start()
+        # Start recovery thread to process any pending operations; one
+        # worker is enough since they all share the same queue
+        if worker_index == 0:
+            recovery_thread = threading.Thread(target=self.recovery_process)
+            recovery_thread.daemon = True
+            recovery_thread.start()
         
         try:
             self.server.wait_for_termination()
@@ -35,19 +54,10 @@ class CalculatorServiceBase:
     def recovery_process(self):
         """Process any pending operations from previous runs"""
         print(f"Starting recovery process for {self.service_name}...")
-        pending_operations = self.message_queue.get_pending_operations()
+        processed = drain_queue(self.message_queue, self.perform_operation)
         
-        if pending_operations:
-            print(f"Found {len(pending_operations)} pending operations to recover")
-            for op in pending_operations:
-                try:
-                    content = op['content']
-                    result = self.perform_operation(content['num1'], content['num2'])
-                    self.message_queue.mark_completed(op['id'], result)
-                    print(f"Recovered operation {op['id']} with result {result}")
-                except Exception as e:
-                    self.message_queue.mark_failed(op['id'], str(e))
-                    print(f"Failed to recover operation {op['id']}: {e}")
+        if processed:
+            print(f"Recovered {processed} pending operations")
         else:
             print("No pending operations found")
             
@@ -60,71 +70,328 @@ class CalculatorServiceBase:
         raise NotImplementedError()
 
 
-# Addition Microservice
-class AdditionService(calculator_pb2_grpc.CalculatorServicer):
-    def __init__(self):
-        self.message_queue = MessageBroker().get_queue("addition")
+# Arbitrary precision arithmetic is orders of magnitude slower than floats, so
+# it runs on its own small pool and cannot occupy every gRPC handler thread
+DEFAULT_DECIMAL_PRECISION = 28
+MAX_DECIMAL_PRECISION = 1000
+decimal_executor = futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="decimal")
+
+
+def parse_decimal(value):
+    try:
+        return decimal.Decimal(value)
+    except decimal.InvalidOperation:
+        raise ValueError(f"Invalid decimal number: {value!r}")
+
+
+def compute_decimal(perform_operation, num1, num2, precision):
+    """Run an operation on Decimals with the requested number of significant digits"""
+    with decimal.localcontext() as ctx:
+        ctx.prec = precision
+        return perform_operation(num1, num2)
+
+
+@profiling.timed()
+def perform_queued_operation(perform_operation, content):
+    """Recompute a queued message; returns a JSON-friendly result"""
+    if content.get('number_type') == 'decimal':
+        precision = content.get('precision') or DEFAULT_DECIMAL_PRECISION
+        result = compute_decimal(
+            perform_operation,
+            parse_decimal(content['num1']),
+            parse_decimal(content['num2']),
+            precision
+        )
+        return str(result)
+    return perform_operation(content['num1'], content['num2'])
+
+
+@profiling.timed()
+def recover_message(message_queue, perform_operation, op):
+    """Recompute one queued operation and record the outcome"""
+    # Continues the trace of the request that queued the message
+    with tracing.span("mom.recover", parent=op.get('traceparent'), queue=message_queue.queue_name,
+                      attempt=op.get('attempts', 1)):
+        try:
+            result = perform_queued_operation(perform_operation, op['content'])
+            message_queue.mark_completed(op['id'], result)
+            print(f"Recovered operation {op['id']} with result {result}")
+        except Exception as e:
+            message_queue.mark_failed(op['id'], str(e))
+            print(f"Failed to recover operation {op['id']}: {e}")
+
+
+def drain_queue(message_queue, perform_operation, scheduler=None):
+    """Process the backlog of a queue; returns the number of messages handled"""
+    scheduler = scheduler or WeightedFairScheduler()
+    processed = 0
+    
+    # Operations whose consumer died return to pending once their lease runs
+    # out; after max_attempts deliveries they go to the dead-letter queue
+    # instead of being retried on every recovery cycle
+    message_queue.requeue_expired()
+    
+    # Then the pending backlog, with high priority work drained first but
+    # without starving bulk traffic or any single tenant
+    while True:
+        op = message_queue.dequeue(scheduler)
+        if op is None:
+            break
+        recover_message(message_queue, perform_operation, op)
+        processed += 1
+    
+    return processed
+
+
+# WatchOperation streams stay open for at most this long
+DEFAULT_WATCH_TIMEOUT = 60
+MAX_WATCH_TIMEOUT = 300
+# How often an open watch wakes up to report progress and notice cancellation
+WATCH_CHECK_INTERVAL = 1.0
+
+
+def find_operation(message_queues, operation_id):
+    """Return (queue, message_data) for the queue holding operation_id, or (None, None)"""
+    for message_queue in message_queues:
+        message_data = message_queue.find_operation(operation_id)
+        if message_data is not None:
+            return message_queue, message_data
+    return None, None
+
+
+def finished_response(response_class, message_data, result_type):
+    """The response to a request whose operation a stored message already finished"""
+    operation_id = message_data['content'].get('operation_id', '')
+    if message_data['status'] == 'completed':
+        return response_class(result=result_type(message_data['result']),
+                              operation_id=operation_id, success=True)
+    return response_class(
+        result=result_type(0),
+        operation_id=operation_id,
+        success=False,
+        error_message=operation_status(message_data).error_message or message_data['status']
+    )
+
+
+def operation_status(message_data):
+    """Build the OperationStatus update for a stored message"""
+    status = message_data['status']
+    update = calculator_pb2.OperationStatus(
+        operation_id=message_data['content'].get('operation_id', ''),
+        status=status
+    )
+    if status == 'completed':
+        update.result = str(message_data.get('result'))
+    elif status == 'failed':
+        update.error_message = str(message_data.get('result') or '')
+    elif status == 'dead_letter':
+        update.error_message = message_data.get('dead_letter_reason', '')
+    return update
+
+
+def watch_operation(message_queues, request, context):
+    """Serve WatchOperation: the current status, then each change until a final one"""
+    message_queue, message_data = find_operation(message_queues, request.operation_id)
+    if message_data is None:
+        context.abort(grpc.StatusCode.NOT_FOUND, f"Unknown operation: {request.operation_id}")
+    timeout = min(request.timeout_seconds or DEFAULT_WATCH_TIMEOUT, MAX_WATCH_TIMEOUT)
+    return _stream_operation(message_queue, message_data, timeout, context)
+
+
+def _stream_operation(message_queue, message_data, timeout, context):
+    yield operation_status(message_data)
+    deadline = time.monotonic() + timeout
+    while message_data['status'] not in TERMINAL_STATUSES and context.is_active():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        latest = message_queue.wait_for_completion(
+            message_data['id'], min(remaining, WATCH_CHECK_INTERVAL)
+        )
+        if latest is None:
+            return
+        if latest['status'] != message_data['status']:
+            yield operation_status(latest)
+        message_data = latest
+
+
+class _BatchEntry:
+    __slots__ = ('num1', 'num2', 'operation_id', 'number_type', 'done', 'result', 'error')
+    
+    def __init__(self, num1, num2, operation_id, number_type='float'):
+        self.num1 = num1
+        self.num2 = num2
+        self.operation_id = operation_id
+        self.number_type = number_type
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one queue write, one compute pass and one ack"""
+    def __init__(self, message_queue, operation, compute, max_batch_size=64, max_delay=0.002):
+        self.message_queue = message_queue
+        self.operation = operation
+        self.compute = compute
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.pending = []
+        self.condition = threading.Condition()
         
-    def Add(self, request, context):
-        operation_id = request.operation_id
+    def submit(self, num1, num2, operation_id, number_type='float'):
+        """Block until the batch containing this request is processed; return its result"""
+        entry = _BatchEntry(num1, num2, operation_id, number_type)
+        with self.condition:
+            self.pending.append(entry)
+            # The first request of a batch leads it: it waits for the window
+            # to close and then processes everyone who joined meanwhile
+            leader = len(self.pending) == 1
+            if len(self.pending) >= self.max_batch_size:
+                self.condition.notify_all()
+        
+        if leader:
+            deadline = time.monotonic() + self.max_delay
+            with self.condition:
+                while len(self.pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch, self.pending = self.pending, []
+            self._process(batch)
+        
+        entry.done.wait()
+        if entry.error is not None:
+            raise entry.error
+        return entry.result
+    
+    def _process(self, batch):
         try:
-            # Enqueue the request for failover support
-            message_id = self.message_queue.enqueue({
-                'num1': request.num1,
-                'num2': request.num2,
-                'operation': 'add',
-                'operation_id': operation_id
-            })
+            # Enqueue the whole batch for failover support
+            enqueued = self.message_queue.enqueue_operations([
+                {
+                    'num1': entry.num1,
+                    'num2': entry.num2,
+                    'operation': self.operation,
+                    'operation_id': entry.operation_id,
+                    'number_type': entry.number_type
+                }
+                for entry in batch
+            ], status='processing')
             
-            # Perform the calculation
-            result = request.num1 + request.num2
-            
-            # Mark operation as completed
-            self.message_queue.mark_completed(message_id, result)
+            updates = []
+            for entry, (message_id, earlier) in zip(batch, enqueued):
+                if earlier is not None and earlier['status'] in TERMINAL_STATUSES:
+                    # Answered before; repeat that answer
+                    response = finished_response(calculator_pb2.CalculationResponse, earlier, float)
+                    if response.success:
+                        entry.result = response.result
+                    else:
+                        entry.error = ValueError(response.error_message)
+                    continue
+                try:
+                    entry.result = self.compute(entry.num1, entry.num2)
+                    updates.append((message_id, 'completed', entry.result))
+                except Exception as e:
+                    entry.error = e
+                    updates.append((message_id, 'failed', str(e)))
             
-            return calculator_pb2.CalculationResponse(
-                result=result,
-                operation_id=operation_id,
-                success=True
-            )
+            # Acknowledge every message of the batch at once
+            if updates:
+                self.message_queue.update_batch(updates)
         except Exception as e:
-            # Mark operation as failed
-            if 'message_id' in locals():
-                self.message_queue.mark_failed(message_id, str(e))
-            return calculator_pb2.CalculationResponse(
+            for entry in batch:
+                entry.error = e
+        finally:
+            for entry in batch:
+                entry.done.set()
+
+
+# Shared request handling for the calculator microservices
+class QueuedCalculatorServicer(calculator_pb2_grpc.CalculatorServicer):
+    operation = None
+    queue_name = None
+    
+    def __init__(self, batch_window=0, batch_size=64):
+        self.message_queue = broker_client.get_queue(self.queue_name)
+        # Micro-batching is opt-in: it adds up to batch_window seconds of
+        # latency in exchange for far fewer queue writes under load
+        self.batcher = None
+        if batch_window > 0:
+            self.batcher = MicroBatcher(
+                self.message_queue, self.operation, self.perform_operation,
+                max_batch_size=batch_size, max_delay=batch_window
+            )
+        
+    def start_recovery(self, poll_interval=5):
+        """Keep draining messages queued while this service was unreachable
+        
+        Each shard of the queue gets its own consumer thread.
+        """
+        def consume(shard):
+            scheduler = WeightedFairScheduler()
+            while True:
+                try:
+                    if isinstance(shard, broker_client.RemoteQueue):
+                        # The broker pushes messages as they arrive
+                        for op in shard.subscribe():
+                            recover_message(shard, self.perform_operation, op)
+                    else:
+                        processed = drain_queue(shard, self.perform_operation, scheduler)
+                        if processed:
+                            print(f"Processed {processed} queued {self.operation} operations "
+                                  f"from {shard.queue_name}")
+                except Exception as e:
+                    print(f"Error draining {shard.queue_name} queue: {e}")
+                shard.wait_for_messages(poll_interval)
+        
+        for shard in self.message_queue.shards:
+            recovery_thread = threading.Thread(target=consume, args=(shard,))
+            recovery_thread.daemon = True
+            recovery_thread.start()
+        
+    def handle(self, request, context, response_class=calculator_pb2.CalculationResponse,
+               number_type='float'):
+        """Persist, compute and acknowledge a single float or double calculation request"""
+        operation_id = request.operation_id
+        
+        # The caller's deadline travels with the call; if it already expired
+        # (or the client cancelled) nobody will read the answer, so skip the
+        # queue writes entirely.
+        if not context.is_active():
+            return response_class(
                 result=0,
                 operation_id=operation_id,
                 success=False,
-                error_message=str(e)
+                error_message="Request cancelled or deadline exceeded"
             )
-    
-    def perform_operation(self, num1, num2):
-        return num1 + num2
-
-
-# Subtraction Microservice
-class SubtractionService(calculator_pb2_grpc.CalculatorServicer):
-    def __init__(self):
-        self.message_queue = MessageBroker().get_queue("subtraction")
         
-    def Subtract(self, request, context):
-        operation_id = request.operation_id
+        if self.batcher is not None:
+            return self.handle_batched(request, response_class, number_type)
+        
         try:
+            self.validate(request.num1, request.num2)
+            
             # Enqueue the request for failover support
-            message_id = self.message_queue.enqueue({
+            message_id, earlier = self.message_queue.enqueue_operation({
                 'num1': request.num1,
                 'num2': request.num2,
-                'operation': 'subtract',
-                'operation_id': operation_id
-            })
+                'operation': self.operation,
+                'operation_id': operation_id,
+                'number_type': number_type
+            }, status='processing')
+            if earlier is not None and earlier['status'] in TERMINAL_STATUSES:
+                # A retry of an operation that was already answered
+                return finished_response(response_class, earlier, float)
             
             # Perform the calculation
-            result = request.num1 - request.num2
+            result = self.perform_operation(request.num1, request.num2)
             
             # Mark operation as completed
             self.message_queue.mark_completed(message_id, result)
             
-            return calculator_pb2.CalculationResponse(
+            return response_class(
                 result=result,
                 operation_id=operation_id,
                 success=True
@@ -133,130 +400,256 @@ class SubtractionService(calculator_pb2_grpc.CalculatorServicer):
             # Mark operation as failed
             if 'message_id' in locals():
                 self.message_queue.mark_failed(message_id, str(e))
-            return calculator_pb2.CalculationResponse(
+            return response_class(
                 result=0,
                 operation_id=operation_id,
                 success=False,
                 error_message=str(e)
             )
     
-    def perform_operation(self, num1, num2):
-        return num1 - num2
-
-
-# Multiplication Microservice
-class MultiplicationService(calculator_pb2_grpc.CalculatorServicer):
-    def __init__(self):
-        self.message_queue = MessageBroker().get_queue("multiplication")
-        
-    def Multiply(self, request, context):
+    def handle_batched(self, request, response_class=calculator_pb2.CalculationResponse,
+                       number_type='float'):
+        """Hand the request to the micro-batcher and wait for its share of the batch"""
         operation_id = request.operation_id
         try:
-            # Enqueue the request for failover support
-            message_id = self.message_queue.enqueue({
-                'num1': request.num1,
-                'num2': request.num2,
-                'operation': 'multiply',
-                'operation_id': operation_id
-            })
-            
-            # Perform the calculation
-            result = request.num1 * request.num2
-            
-            # Mark operation as completed
-            self.message_queue.mark_completed(message_id, result)
-            
-            return calculator_pb2.CalculationResponse(
+            self.validate(request.num1, request.num2)
+            result = self.batcher.submit(request.num1, request.num2, operation_id, number_type)
+            return response_class(
                 result=result,
                 operation_id=operation_id,
                 success=True
             )
         except Exception as e:
-            # Mark operation as failed
-            if 'message_id' in locals():
-                self.message_queue.mark_failed(message_id, str(e))
-            return calculator_pb2.CalculationResponse(
+            return response_class(
                 result=0,
                 operation_id=operation_id,
                 success=False,
                 error_message=str(e)
             )
     
-    def perform_operation(self, num1, num2):
-        return num1 * num2
-
-
-# Division Microservice
-class DivisionService(calculator_pb2_grpc.CalculatorServicer):
-    def __init__(self):
-        self.message_queue = MessageBroker().get_queue("division")
-        
-    def Divide(self, request, context):
+    def handle_decimal(self, request, context):
+        """Persist, compute and acknowledge an arbitrary precision calculation request"""
         operation_id = request.operation_id
+        
+        if not context.is_active():
+            return calculator_pb2.DecimalCalculationResponse(
+                result="0",
+                operation_id=operation_id,
+                success=False,
+                error_message="Request cancelled or deadline exceeded"
+            )
+        
         try:
-            # Check for division by zero
-            if request.num2 == 0:
-                raise ValueError("Division by zero is not allowed")
-                
-            # Enqueue the request for failover support
-            message_id = self.message_queue.enqueue({
+            precision = request.precision or DEFAULT_DECIMAL_PRECISION
+            if precision > MAX_DECIMAL_PRECISION:
+                raise ValueError(f"Precision is limited to {MAX_DECIMAL_PRECISION} digits")
+            num1 = parse_decimal(request.num1)
+            num2 = parse_decimal(request.num2)
+            self.validate(num1, num2)
+            
+            # Operands are persisted as strings so no digit is lost
+            message_id, earlier = self.message_queue.enqueue_operation({
                 'num1': request.num1,
                 'num2': request.num2,
-                'operation': 'divide',
-                'operation_id': operation_id
-            })
+                'operation': self.operation,
+                'operation_id': operation_id,
+                'number_type': 'decimal',
+                'precision': precision
+            }, status='processing')
+            if earlier is not None and earlier['status'] in TERMINAL_STATUSES:
+                return finished_response(calculator_pb2.DecimalCalculationResponse, earlier, str)
             
-            # Perform the calculation
-            result = request.num1 / request.num2
+            result = decimal_executor.submit(
+                compute_decimal, self.perform_operation, num1, num2, precision
+            ).result(timeout=context.time_remaining())
             
-            # Mark operation as completed
-            self.message_queue.mark_completed(message_id, result)
+            self.message_queue.mark_completed(message_id, str(result))
             
-            return calculator_pb2.CalculationResponse(
-                result=result,
+            return calculator_pb2.DecimalCalculationResponse(
+                result=str(result),
                 operation_id=operation_id,
                 success=True
             )
         except Exception as e:
-            # Mark operation as failed
             if 'message_id' in locals():
-                self.message_queue.mark_failed(message_id, str(e))
-            return calculator_pb2.CalculationResponse(
-                result=0,
+                self.message_queue.mark_failed(message_id, str(e) or type(e).__name__)
+            return calculator_pb2.DecimalCalculationResponse(
+                result="0",
                 operation_id=operation_id,
                 success=False,
-                error_message=str(e)
+                error_message=str(e) or type(e).__name__
             )
     
+    def WatchOperation(self, request, context):
+        return watch_operation([self.message_queue], request, context)
+    
+    def validate(self, num1, num2):
+        """Reject invalid operands before anything is persisted"""
+        pass
+    
+    def perform_operation(self, num1, num2):
+        """To be implemented by subclasses"""
+        raise NotImplementedError()
+
+
+# Addition Microservice
+class AdditionService(QueuedCalculatorServicer):
+    operation = 'add'
+    queue_name = 'addition'
+        
+    def Add(self, request, context):
+        return self.handle(request, context)
+    
+    def AddDouble(self, request, context):
+        return self.handle(request, context, calculator_pb2.DoubleCalculationResponse, 'double')
+    
+    def AddDecimal(self, request, context):
+        return self.handle_decimal(request, context)
+    
+    def perform_operation(self, num1, num2):
+        return num1 + num2
+
+
+# Subtraction Microservice
+class SubtractionService(QueuedCalculatorServicer):
+    operation = 'subtract'
+    queue_name = 'subtraction'
+        
+    def Subtract(self, request, context):
+        return self.handle(request, context)
+    
+    def SubtractDouble(self, request, context):
+        return self.handle(request, context, calculator_pb2.DoubleCalculationResponse, 'double')
+    
+    def SubtractDecimal(self, request, context):
+        return self.handle_decimal(request, context)
+    
+    def perform_operation(self, num1, num2):
+        return num1 - num2
+
+
+# Multiplication Microservice
+class MultiplicationService(QueuedCalculatorServicer):
+    operation = 'multiply'
+    queue_name = 'multiplication'
+        
+    def Multiply(self, request, context):
+        return self.handle(request, context)
+    
+    def MultiplyDouble(self, request, context):
+        return self.handle(request, context, calculator_pb2.DoubleCalculationResponse, 'double')
+    
+    def MultiplyDecimal(self, request, context):
+        return self.handle_decimal(request, context)
+    
+    def perform_operation(self, num1, num2):
+        return num1 * num2
+
+
+# Division Microservice
+class DivisionService(QueuedCalculatorServicer):
+    operation = 'divide'
+    queue_name = 'division'
+        
+    def Divide(self, request, context):
+        return self.handle(request, context)
+    
+    def DivideDouble(self, request, context):
+        return self.handle(request, context, calculator_pb2.DoubleCalculationResponse, 'double')
+    
+    def DivideDecimal(self, request, context):
+        return self.handle_decimal(request, context)
+    
+    def validate(self, num1, num2):
+        # Check for division by zero
+        if num2 == 0:
+            raise ValueError("Division by zero is not allowed")
+    
     def perform_operation(self, num1, num2):
         if num2 == 0:
             raise ValueError("Division by zero is not allowed")
         return num1 / num2
 
 
-# Server implementations for each microservice
-def run_addition_server():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    calculator_pb2_grpc.add_CalculatorServicer_to_server(
-        AdditionService(), server)
-    server.add_insecure_port('[::]:50051')
-    server.start()
-    print("Addition service running on port 50051")
+# All four operations behind one servicer, for single-process deployments
+class CombinedCalculatorService(calculator_pb2_grpc.CalculatorServicer):
+    def __init__(self, batch_window=0, batch_size=64):
+        # Each operation keeps its own queue, exactly as in the split layout
+        self.addition = AdditionService(batch_window, batch_size)
+        self.subtraction = SubtractionService(batch_window, batch_size)
+        self.multiplication = MultiplicationService(batch_window, batch_size)
+        self.division = DivisionService(batch_window, batch_size)
+        
+    def start_recovery(self, poll_interval=5):
+        for service in (self.addition, self.subtraction, self.multiplication, self.division):
+            service.start_recovery(poll_interval)
+        
+    def Add(self, request, context):
+        return self.addition.Add(request, context)
     
-    try:
-        while True:
-            time.sleep(86400)  # One day in seconds
-    except KeyboardInterrupt:
-        server.stop(0)
+    def AddDouble(self, request, context):
+        return self.addition.AddDouble(request, context)
+    
+    def AddDecimal(self, request, context):
+        return self.addition.AddDecimal(request, context)
+    
+    def Subtract(self, request, context):
+        return self.subtraction.Subtract(request, context)
+    
+    def SubtractDouble(self, request, context):
+        return self.subtraction.SubtractDouble(request, context)
+    
+    def SubtractDecimal(self, request, context):
+        return self.subtraction.SubtractDecimal(request, context)
+    
+    def Multiply(self, request, context):
+        return self.multiplication.Multiply(request, context)
+    
+    def MultiplyDouble(self, request, context):
+        return self.multiplication.MultiplyDouble(request, context)
+    
+    def MultiplyDecimal(self, request, context):
+        return self.multiplication.MultiplyDecimal(request, context)
+    
+    def Divide(self, request, context):
+        return self.division.Divide(request, context)
+    
+    def DivideDouble(self, request, context):
+        return self.division.DivideDouble(request, context)
+    
+    def DivideDecimal(self, request, context):
+        return self.division.DivideDecimal(request, context)
+    
+    def WatchOperation(self, request, context):
+        message_queues = [
+            service.message_queue
+            for service in (self.addition, self.subtraction, self.multiplication, self.division)
+        ]
+        return watch_operation(message_queues, request, context)
 
 
-def run_subtraction_server():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    calculator_pb2_grpc.add_CalculatorServicer_to_server(
-        SubtractionService(), server)
-    server.add_insecure_port('[::]:50052')
+# Server implementations for each microservice
+def _run_server_process(worker_index, service_factory, service_name, port, max_workers,
+                        batch_window=0, batch_size=64):
+    """Run one gRPC server process until interrupted"""
+    # SO_REUSEPORT lets every pre-forked worker bind the same port; the kernel
+    # then spreads incoming connections across them
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        interceptors=(tracing.server_interceptors() or []) + profiling.server_interceptors(),
+        options=grpc_options.server_options(('grpc.so_reuseport', 1)),
+        compression=grpc_options.server_compression()
+    )
+    servicer = service_factory(batch_window, batch_size)
+    calculator_pb2_grpc.add_CalculatorServicer_to_server(servicer, server)
+    server.add_insecure_port(f'[::]:{port}')
     server.start()
-    print("Subtraction service running on port 50052")
+    print(f"{service_name} service running on port {port} (pid {os.getpid()})")
+    profiling.start_from_env()
+    
+    # Workers share the queue, so one consumer per service is enough
+    if worker_index == 0:
+        servicer.start_recovery()
     
     try:
         while True:
@@ -265,31 +658,61 @@ def run_subtraction_server():
         server.stop(0)
 
 
-def run_multiplication_server():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    calculator_pb2_grpc.add_CalculatorServicer_to_server(
-        MultiplicationService(), server)
-    server.add_insecure_port('[::]:50053')
-    server.start()
-    print("Multiplication service running on port 50053")
+def run_prefork(target, args, workers):
+    """Run target(worker_index, *args) in N forked processes sharing one port"""
+    if workers <= 1:
+        target(0, *args)
+        return
+    
+    # gRPC must not be initialised before the fork, so every worker builds its
+    # own server; the queues they share are guarded by a file lock
+    context = multiprocessing.get_context('fork')
+    processes = [
+        context.Process(target=target, args=(index,) + tuple(args))
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
     
+    # Installed after forking so the workers keep the default SIGTERM behaviour
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     try:
-        while True:
-            time.sleep(86400)  # One day in seconds
-    except KeyboardInterrupt:
-        server.stop(0)
+        for process in processes:
+            process.join()
+    except (KeyboardInterrupt, SystemExit):
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
 
 
-def run_division_server():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    calculator_pb2_grpc.add_CalculatorServicer_to_server(
-        DivisionService(), server)
-    server.add_insecure_port('[::]:50054')
-    server.start()
-    print("Division service running on port 50054")
-    
-    try:
-        while True:
-            time.sleep(86400)  # One day in seconds
-    except KeyboardInterrupt:
-        server.stop(0)
\ No newline at end of file
+def serve(service_factory, service_name, port, workers=1, max_workers=10,
+          batch_window=0, batch_size=64):
+    """Serve a calculator servicer with one or more pre-forked worker processes"""
+    run_prefork(
+        _run_server_process,
+        (service_factory, service_name, port, max_workers, batch_window, batch_size),
+        workers
+    )
+
+
+def run_addition_server(port=50051, workers=1, max_workers=10, batch_window=0):
+    serve(AdditionService, "Addition", port, workers, max_workers, batch_window=batch_window)
+
+
+def run_subtraction_server(port=50052, workers=1, max_workers=10, batch_window=0):
+    serve(SubtractionService, "Subtraction", port, workers, max_workers, batch_window=batch_window)
+
+
+def run_multiplication_server(port=50053, workers=1, max_workers=10, batch_window=0):
+    serve(MultiplicationService, "Multiplication", port, workers, max_workers, batch_window=batch_window)
+
+
+def run_division_server(port=50054, workers=1, max_workers=10, batch_window=0):
+    serve(DivisionService, "Division", port, workers, max_workers, batch_window=batch_window)
+
+
+def run_combined_server(port=50050, max_workers=10, workers=1, batch_window=0):
+    """Serve every operation from one process and one shared worker pool"""
+    serve(CombinedCalculatorService, "Combined calculator", port, workers, max_workers,
+          batch_window=batch_window)
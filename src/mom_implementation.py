@@ -1,65 +1,626 @@
 import json
 import os
+import zlib
 import threading
+import itertools
 import time
+import collections
+from contextlib import nullcontext
 from pathlib import Path
+import tracing
+import profiling
+import replication
+from message_record import MessageRecord, MessageStatus, message_id_floor, new_message_id
+from storage_backends import (
+    BACKENDS, DEFAULT_BACKEND, CachedBackend, StorageFullError, open_backend
+)
 
-class MessageQueue:
-    def __init__(self, queue_name):
-        self.queue_name = queue_name
-        self.queue_dir = f"queues/{queue_name}"
-        Path(self.queue_dir).mkdir(parents=True, exist_ok=True)
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+
+class QueueLock:
+    """Lock shared by threads of this process and by every other process using the queue
+    
+    With cross_process=False (queues only this process can see) it is a plain RLock.
+    """
+    def __init__(self, lock_path, cross_process=True):
+        self.lock_path = lock_path
+        self.cross_process = cross_process and fcntl is not None
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.lock_file = None
+        self.owner_pid = None
+        
+    def __enter__(self):
+        wait_start = time.perf_counter()
+        self.thread_lock.acquire()
+        if self.depth == 0 and self.cross_process:
+            # flock is tied to the open file description, so a descriptor
+            # inherited across fork() would be shared with the parent
+            if self.owner_pid != os.getpid():
+                self.lock_file = open(self.lock_path, 'a')
+                self.owner_pid = os.getpid()
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        if self.depth == 0:
+            # Contention shows up on the span of the queue operation
+            tracing.current_span().set_attribute(
+                'mom.lock_wait_ms', round((time.perf_counter() - wait_start) * 1000, 3)
+            )
+            # Followers acknowledge writes made under the lock after it is released
+            replication.defer_acks()
+        self.depth += 1
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        released = self.depth == 0
+        if released and self.cross_process:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+        self.thread_lock.release()
+        if released:
+            replication.wait_for_acks()
+        return False
+
+
+# Priority levels, lower values are drained first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {
+    'high': PRIORITY_HIGH,
+    'normal': PRIORITY_NORMAL,
+    'low': PRIORITY_LOW
+}
+DEFAULT_TENANT = 'default'
+
+# Share of dequeues each priority level gets while all levels have a backlog
+DEFAULT_PRIORITY_WEIGHTS = {
+    PRIORITY_HIGH: 8,
+    PRIORITY_NORMAL: 4,
+    PRIORITY_LOW: 1
+}
+
+
+def parse_priority(value):
+    """Accept a priority name ('high', 'normal', 'low') or level number"""
+    if value is None:
+        return PRIORITY_NORMAL
+    if isinstance(value, str) and value.lower() in PRIORITY_NAMES:
+        return PRIORITY_NAMES[value.lower()]
+    try:
+        priority = int(value)
+    except (TypeError, ValueError):
+        priority = None
+    if priority not in DEFAULT_PRIORITY_WEIGHTS:
+        raise ValueError(f"Unknown priority: {value}")
+    return priority
+
+
+class WeightedFairScheduler:
+    """Deficit round robin over priority levels, round robin over tenants within a level"""
+    def __init__(self, weights=None):
+        self.weights = weights or DEFAULT_PRIORITY_WEIGHTS
+        self.credits = {}
+        self.last_tenant = {}
         self.lock = threading.Lock()
         
-    def enqueue(self, message):
-        """Add a message to the queue"""
+    def choose(self, levels):
+        """Pick (priority, tenant) from {priority: {tenant: [messages]}} with a backlog"""
         with self.lock:
-            # Generate unique message ID based on timestamp
-            message_id = f"{time.time()}_{threading.get_ident()}"
-            message_path = os.path.join(self.queue_dir, f"{message_id}.json")
+            # Idle levels do not bank credit while they have nothing to send
+            for priority in list(self.credits):
+                if priority not in levels:
+                    del self.credits[priority]
             
-            # Store message with metadata
-            with open(message_path, 'w') as f:
-                data = {
-                    'id': message_id,
-                    'timestamp': time.time(),
-                    'content': message,
-                    'status': 'pending'  # pending, processing, completed, failed
-                }
-                json.dump(data, f)
+            priorities = sorted(levels)
+            # Within a round, higher priorities spend their credit first, so
+            # latency-sensitive work goes out ahead while bulk still gets its share
+            if not any(self.credits.get(priority, 0) >= 1 for priority in priorities):
+                for priority in priorities:
+                    self.credits[priority] = self.credits.get(priority, 0) + self.weights.get(priority, 1)
             
-            return message_id
+            for priority in priorities:
+                if self.credits.get(priority, 0) >= 1:
+                    self.credits[priority] -= 1
+                    return priority, self._next_tenant(priority, levels[priority])
+    
+    def _next_tenant(self, priority, tenants):
+        names = sorted(tenants)
+        last = self.last_tenant.get(priority)
+        following = [name for name in names if last is None or name > last]
+        tenant = following[0] if following else names[0]
+        self.last_tenant[priority] = tenant
+        return tenant
+
+
+# How long a consumer may hold a message before it is handed out again, and how
+# many deliveries a message gets before it is moved to the dead-letter queue
+DEFAULT_VISIBILITY_TIMEOUT = float(os.environ.get('MOM_VISIBILITY_TIMEOUT', '30'))
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get('MOM_MAX_ATTEMPTS', '5'))
+DEAD_LETTER_SUFFIX = '.dlq'
+
+# Backlog limits (0 = unlimited); MOM_MAX_DEPTH_<QUEUE> overrides per queue
+DEFAULT_MAX_DEPTH = int(os.environ.get('MOM_MAX_DEPTH', '0'))
+DEFAULT_MAX_BYTES = int(os.environ.get('MOM_MAX_BYTES', '0'))
+# Fraction of the limits each priority may fill, so low priority work is shed first
+PRIORITY_ADMISSION = {
+    PRIORITY_HIGH: 1.0,
+    PRIORITY_NORMAL: 0.9,
+    PRIORITY_LOW: 0.7
+}
+# Backlog size is measured by scanning the queue, at most this often
+BACKLOG_STATS_TTL = 1.0
+
+# Shards per queue (MOM_SHARDS_<QUEUE> overrides per queue); 1 keeps a single directory
+DEFAULT_SHARDS = int(os.environ.get('MOM_SHARDS', '1'))
+# Message IDs of a sharded queue end in this separator and the shard number
+SHARD_ID_SEPARATOR = '.'
+
+# Recent operation_ids remembered per queue to drop duplicate messages
+# (MOM_IDEMPOTENCY_KEYS_<QUEUE> overrides per queue); 0 turns deduplication off
+DEFAULT_IDEMPOTENCY_KEYS = int(os.environ.get('MOM_IDEMPOTENCY_KEYS', '100000'))
+
+
+def queue_setting(name, queue_name, default):
+    """Read MOM_<NAME>_<QUEUE> from the environment, falling back to default"""
+    key = f"MOM_{name}_{queue_name.upper().replace('.', '_')}"
+    return type(default)(os.environ.get(key, default))
+
+
+class QueueFullError(Exception):
+    """Raised when a message would push a queue past its backlog limits"""
+    def __init__(self, queue_name, depth, size_bytes, priority):
+        super().__init__(
+            f"Queue {queue_name} is full ({depth} messages, {size_bytes} bytes) "
+            f"for priority {priority}"
+        )
+        self.queue_name = queue_name
+        self.depth = depth
+        self.size_bytes = size_bytes
+        self.priority = priority
+
+
+# Statuses after which a message is never processed again, as callers see them
+TERMINAL_STATUSES = tuple(status.label for status in MessageStatus if status.is_terminal)
+# Terminal statuses are appended to queues/<name>/.events so that waiters in
+# other processes see them; the log starts over once it passes this size
+EVENT_LOG_MAX_BYTES = 1024 * 1024
+EVENT_POLL_INTERVAL = float(os.environ.get('MOM_EVENT_POLL_INTERVAL', '0.05'))
+
+
+class IdempotencyStore:
+    """The message that carries each recently seen operation_id, least recently used evicted
+    
+    Call with the queue lock held.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.message_ids = collections.OrderedDict()
+    
+    def get(self, operation_id):
+        message_id = self.message_ids.get(operation_id)
+        if message_id is not None:
+            self.message_ids.move_to_end(operation_id)
+        return message_id
+    
+    def put(self, operation_id, message_id):
+        self.message_ids[operation_id] = message_id
+        self.message_ids.move_to_end(operation_id)
+        if len(self.message_ids) > self.capacity:
+            self.message_ids.popitem(last=False)
+    
+    def __len__(self):
+        return len(self.message_ids)
+
+
+class CompletionNotifier:
+    """Wakes threads waiting for messages of one queue to reach a terminal status
+    
+    Completions made in this process wake waiters directly. Completions made by
+    other processes are picked up by a daemon thread tailing the event log,
+    started the first time somebody waits. With cross_process=False there is
+    no event log.
+    """
+    def __init__(self, queue_dir, cross_process=True):
+        self.event_log = os.path.join(queue_dir, '.events')
+        self.cross_process = cross_process
+        self.waiters = {}
+        self.lock = threading.Lock()
+        self.tailer_pid = None
+    
+    def publish(self, message_id):
+        """Announce that a message reached a terminal status (call with the queue lock held)"""
+        if not self.cross_process:
+            self._notify([message_id])
+            return
+        try:
+            mode = 'w' if os.path.getsize(self.event_log) > EVENT_LOG_MAX_BYTES else 'a'
+        except OSError:
+            mode = 'a'
+        with open(self.event_log, mode) as f:
+            f.write(message_id + '\n')
+        self._notify([message_id])
+    
+    def subscribe(self, message_id):
+        """Return an Event set when message_id is published"""
+        event = threading.Event()
+        with self.lock:
+            self.waiters.setdefault(message_id, []).append(event)
+            # Threads do not survive fork(), so each process starts its own tailer
+            if self.cross_process and self.tailer_pid != os.getpid():
+                self.tailer_pid = os.getpid()
+                threading.Thread(target=self._tail, daemon=True).start()
+        return event
     
-    def dequeue(self):
-        """Get the next pending message from the queue"""
+    def unsubscribe(self, message_id, event):
         with self.lock:
-            pending_messages = []
-            for filename in os.listdir(self.queue_dir):
-                if not filename.endswith('.json'):
+            events = self.waiters.get(message_id, [])
+            if event in events:
+                events.remove(event)
+            if not events:
+                self.waiters.pop(message_id, None)
+    
+    def _notify(self, message_ids):
+        with self.lock:
+            for message_id in message_ids:
+                for event in self.waiters.get(message_id, ()):
+                    event.set()
+    
+    def _notify_all(self):
+        with self.lock:
+            for events in self.waiters.values():
+                for event in events:
+                    event.set()
+    
+    def _size(self):
+        try:
+            return os.path.getsize(self.event_log)
+        except OSError:
+            return 0
+    
+    def _tail(self):
+        offset = self._size()
+        while True:
+            time.sleep(EVENT_POLL_INTERVAL)
+            size = self._size()
+            if size < offset:
+                # The log started over and events written in between may be
+                # lost, so let every waiter check its message again
+                offset = 0
+                self._notify_all()
+            if size == offset:
+                continue
+            
+            try:
+                with open(self.event_log, 'r') as f:
+                    f.seek(offset)
+                    chunk = f.read(size - offset)
+            except OSError:
+                continue
+            # Leave a partially written last line for the next round
+            complete = chunk[:chunk.rfind('\n') + 1]
+            offset += len(complete)
+            self._notify(complete.split())
+
+
+class MessageQueue:
+    """A named queue whose messages live in a storage backend
+    
+    backend is a name from storage_backends.BACKENDS; by default MOM_BACKEND,
+    or MOM_BACKEND_<QUEUE> for this queue. Writes are also shipped to the
+    followers of replicator, by default those listed in MOM_REPLICAS.
+    exclusive=True is for a process that is the only user of the queue (the
+    broker server): messages are then read from an in-memory copy.
+    """
+    def __init__(self, queue_name, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, max_depth=None, max_bytes=None,
+                 backend=None, id_suffix='', replicator=None, exclusive=False):
+        self.queue_name = queue_name
+        self.exclusive = exclusive
+        # Appended to every new message ID; ShardedQueue marks IDs with their shard
+        self.id_suffix = id_suffix
+        self.queue_dir = f"queues/{queue_name}"
+        Path(self.queue_dir).mkdir(parents=True, exist_ok=True)
+        self.backend_name = backend or queue_setting('BACKEND', queue_name, DEFAULT_BACKEND)
+        self.backend = open_backend(self.backend_name, self.queue_dir)
+        if exclusive:
+            self.backend = CachedBackend(self.backend)
+        # Followers configured with MOM_REPLICAS get a copy of every write
+        self.replicator = replicator or replication.default_replicator()
+        if self.replicator is not None:
+            self.backend = replication.ReplicatedBackend(self.backend, queue_name, self.replicator)
+        self.lock = QueueLock(os.path.join(self.queue_dir, '.lock'), self.backend.shared)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.max_depth = max_depth if max_depth is not None else queue_setting(
+            'MAX_DEPTH', queue_name, DEFAULT_MAX_DEPTH)
+        self.max_bytes = max_bytes if max_bytes is not None else queue_setting(
+            'MAX_BYTES', queue_name, DEFAULT_MAX_BYTES)
+        self._backlog = None
+        self._backlog_time = 0
+        self._dead_letter_queue = None
+        self.notifier = CompletionNotifier(self.queue_dir, self.backend.shared)
+        keys = queue_setting('IDEMPOTENCY_KEYS', queue_name, DEFAULT_IDEMPOTENCY_KEYS)
+        self.operations = IdempotencyStore(keys) if keys > 0 else None
+    
+    @property
+    def shards(self):
+        """Queues to run one consumer on each; a plain queue is its own single shard"""
+        return [self]
+    
+    @property
+    def dead_letter_queue(self):
+        """Queue holding messages that exhausted their deliveries"""
+        if self._dead_letter_queue is None:
+            self._dead_letter_queue = MessageQueue(
+                f"{self.queue_name}{DEAD_LETTER_SUFFIX}", backend=self.backend_name,
+                replicator=self.replicator, exclusive=self.exclusive
+            )
+        return self._dead_letter_queue
+    
+    def backlog_stats(self, max_age=BACKLOG_STATS_TTL):
+        """Return (depth, bytes) of unacknowledged messages, cached for max_age seconds"""
+        with tracing.child_span("mom.backlog_stats", queue=self.queue_name), self.lock:
+            if self._backlog is None or time.monotonic() - self._backlog_time > max_age:
+                self._backlog = list(self.backend.backlog())
+                self._backlog_time = time.monotonic()
+            return tuple(self._backlog)
+    
+    def has_capacity(self, priority=PRIORITY_NORMAL, new_messages=1, new_bytes=0):
+        """Whether the backlog can take more messages of this priority"""
+        if not self.max_depth and not self.max_bytes:
+            return True
+        
+        depth, size_bytes = self.backlog_stats()
+        share = PRIORITY_ADMISSION.get(priority, 1.0)
+        if self.max_depth and depth + new_messages > self.max_depth * share:
+            return False
+        if self.max_bytes and size_bytes + new_bytes > self.max_bytes * share:
+            return False
+        return True
+    
+    def _admit(self, priority, new_messages, new_bytes):
+        """Raise QueueFullError if the backlog cannot take more messages of this priority"""
+        if not self.max_depth and not self.max_bytes:
+            return
+        
+        if not self.has_capacity(priority, new_messages, new_bytes):
+            depth, size_bytes = self.backlog_stats()
+            raise QueueFullError(self.queue_name, depth, size_bytes, priority)
+        
+        # Count our own writes until the next scan
+        self._backlog[0] += new_messages
+        self._backlog[1] += new_bytes
+    
+    def _lease(self, record):
+        """Hand a message to a consumer until its visibility timeout runs out"""
+        record.status = MessageStatus.PROCESSING
+        record.attempts = (record.attempts or 0) + 1
+        record.lease_expires_at = time.time() + self.visibility_timeout
+        
+    def _enqueue_lock(self, status):
+        """The queue lock, if writing new messages of this status needs it
+        
+        Only the backlog limits, deduplication and backends that serialize
+        writers do; the message IDs themselves are unique without it.
+        """
+        limited = status == MessageStatus.PENDING and (self.max_depth or self.max_bytes)
+        if limited or self.operations is not None or not self.backend.concurrent_put:
+            return self.lock
+        return nullcontext()
+    
+    def _earlier_message(self, record, added):
+        """The message already carrying record's operation_id, or None (call with the lock held)
+        
+        added maps the IDs of messages about to be stored to their records.
+        Recently enqueued operations are remembered in memory; backends with
+        an operation index are also asked, so messages enqueued by other
+        processes or before an eviction are found too.
+        """
+        operation_id = record.operation_id
+        if operation_id is None:
+            return None
+        earlier = None
+        earlier_id = self.operations.get(operation_id)
+        if earlier_id is not None:
+            earlier = (added.get(earlier_id) or self.backend.get(earlier_id)
+                       or self.dead_letter_queue.backend.get(earlier_id))
+        elif self.backend.indexed_find:
+            earlier = self.backend.find(operation_id)
+        self.operations.put(operation_id, earlier.id if earlier is not None else record.id)
+        return earlier
+    
+    def enqueue(self, message, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT, status='pending'):
+        """Add a message to the queue
+        
+        Handlers that process the message right away enqueue it as 'processing'
+        so consumers draining the backlog do not pick it up a second time.
+        Pending messages count against the backlog limits and raise
+        QueueFullError when the queue is full for their priority. A message
+        whose operation_id the queue already holds is not added; the ID of
+        the earlier message is returned instead.
+        """
+        return self._enqueue([message], priority, tenant, status, "mom.enqueue")[0][0]
+    
+    def enqueue_operation(self, message, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                          status='pending'):
+        """enqueue() returning (message_id, earlier), earlier being the data of the
+        message that already carried the operation_id, or None if message was added
+        
+        A handler enqueuing as 'processing' should answer from earlier if its
+        status is terminal instead of computing the operation again. An earlier
+        message that is pending or processing is leased to the caller instead.
+        """
+        return self._enqueue([message], priority, tenant, status, "mom.enqueue")[0]
+    
+    def enqueue_batch(self, messages, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                      status='pending'):
+        """Add several messages under a single lock acquisition"""
+        return [message_id for message_id, _ in self.enqueue_operations(messages, priority,
+                                                                         tenant, status)]
+    
+    def enqueue_operations(self, messages, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                           status='pending'):
+        """enqueue_operation() for several messages under a single lock acquisition"""
+        return self._enqueue(messages, priority, tenant, status, "mom.enqueue_batch")
+    
+    def _enqueue(self, messages, priority, tenant, status, span_name):
+        status = MessageStatus.parse(status)
+        # Sortable by creation time, so the oldest message is the lowest ID
+        message_ids = [new_message_id() + self.id_suffix for _ in messages]
+        with tracing.child_span(span_name, queue=self.queue_name, status=status.label,
+                                size=len(messages)), self._enqueue_lock(status):
+            # Consumers continue the trace of whoever enqueued the message
+            timestamp = time.time()
+            trace_context = tracing.traceparent() or None
+            results = []
+            added = {}
+            leased = []
+            for message, message_id in zip(messages, message_ids):
+                record = MessageRecord(message_id, timestamp, message, status, priority, tenant,
+                                       traceparent=trace_context)
+                earlier = None
+                if self.operations is not None:
+                    earlier = self._earlier_message(record, added)
+                if earlier is None:
+                    if status == MessageStatus.PROCESSING:
+                        self._lease(record)
+                    added[message_id] = record
+                    results.append((message_id, None))
                     continue
-                    
-                file_path = os.path.join(self.queue_dir, filename)
-                try:
-                    with open(file_path, 'r') as f:
-                        message_data = json.load(f)
-                        if message_data['status'] == 'pending':
-                            pending_messages.append((message_data, file_path))
-                except Exception as e:
-                    print(f"Error reading message file {file_path}: {e}")
+                if (status == MessageStatus.PROCESSING and not earlier.status.is_terminal
+                        and earlier.id not in added):
+                    # The caller is about to process it; recovery must not as well
+                    self._lease(earlier)
+                    leased.append(earlier)
+                results.append((earlier.id, earlier.to_dict()))
             
-            if not pending_messages:
-                return None
-                
-            # Sort by timestamp (oldest first)
-            pending_messages.sort(key=lambda x: x[0]['timestamp'])
-            message_data, file_path = pending_messages[0]
+            batch = list(added.values())
+            if batch and status == MessageStatus.PENDING:
+                self._admit(priority, len(batch),
+                            len(json.dumps([record.content for record in batch])))
+            try:
+                if leased or batch:
+                    self.backend.put_many(leased + batch)
+            except StorageFullError:
+                depth, size_bytes = self.backend.backlog()
+                raise QueueFullError(self.queue_name, depth, size_bytes, priority)
+            return results
+    
+    def dequeue(self, scheduler=None):
+        """Get the next pending message from the queue
+        
+        Without a scheduler this is strict priority order, oldest first within a
+        level. A WeightedFairScheduler instead picks the priority level and
+        tenant to serve, and the oldest message of that group is returned.
+        The message is leased: unless it is marked completed or failed within
+        the visibility timeout, requeue_expired() hands it out again. Messages
+        whose operation another message already completed are completed with
+        its result on the way, without being handed out.
+        """
+        with tracing.child_span("mom.dequeue", queue=self.queue_name) as span, self.lock:
+            pending_messages = list(self.backend.scan((MessageStatus.PENDING,)))
+            span.set_attribute('mom.pending', len(pending_messages))
             
-            # Mark as processing
-            message_data['status'] = 'processing'
-            with open(file_path, 'w') as f:
-                json.dump(message_data, f)
+            while pending_messages:
+                candidates = pending_messages
+                if scheduler is not None:
+                    levels = {}
+                    for record in pending_messages:
+                        levels.setdefault(record.priority, {}).setdefault(record.tenant, []).append(record)
+                    priority, tenant = scheduler.choose(levels)
+                    candidates = levels[priority][tenant]
                 
-            return message_data
+                # Sort by priority, then enqueue order (oldest ID first)
+                record = min(candidates, key=lambda x: (x.priority, x.id))
+                
+                completed = self._completed_earlier(record)
+                if completed is not None:
+                    record.status = MessageStatus.COMPLETED
+                    record.result = completed.result
+                    self.backend.put(record)
+                    self.notifier.publish(record.id)
+                    pending_messages.remove(record)
+                    continue
+                
+                # Mark as processing
+                self._lease(record)
+                self.backend.put(record)
+                if self.operations is not None and record.operation_id is not None:
+                    # Any other copy of the operation can wait for this one
+                    self.operations.put(record.operation_id, record.id)
+                
+                return record.to_dict()
+            return None
+    
+    def _completed_earlier(self, record):
+        """Another message known to have completed record's operation, or None"""
+        if self.operations is None or record.operation_id is None:
+            return None
+        earlier_id = self.operations.get(record.operation_id)
+        if earlier_id is None or earlier_id == record.id:
+            return None
+        earlier = self.backend.get(earlier_id)
+        if earlier is None or earlier.status != MessageStatus.COMPLETED:
+            return None
+        return earlier
+    
+    def wait_for_messages(self, timeout):
+        """Block until a message may have been enqueued, or timeout seconds pass
+        
+        Backends that notify consumers (ring, memory) return as soon as a
+        message becomes pending; the others simply sleep.
+        """
+        self.backend.wait_for_messages(timeout)
+    
+    def requeue_expired(self):
+        """Return messages whose lease ran out to pending, or dead-letter them
+        
+        Returns (requeued, dead_lettered) counts. A message that was delivered
+        max_attempts times without being acknowledged is treated as poison.
+        """
+        requeued = 0
+        dead_lettered = 0
+        with tracing.child_span("mom.requeue_expired", queue=self.queue_name), self.lock:
+            now = time.time()
+            for record in list(self.backend.scan((MessageStatus.PROCESSING,))):
+                # Messages written before leases existed expire from their timestamp
+                lease_expires_at = record.lease_expires_at
+                if lease_expires_at is None:
+                    lease_expires_at = record.timestamp + self.visibility_timeout
+                if lease_expires_at > now:
+                    continue
+                
+                if (record.attempts or 0) >= self.max_attempts:
+                    self._move_to_dead_letter(record, "Maximum deliveries exceeded")
+                    dead_lettered += 1
+                else:
+                    record.status = MessageStatus.PENDING
+                    record.lease_expires_at = None
+                    self.backend.put(record)
+                    requeued += 1
+        
+        if requeued or dead_lettered:
+            print(f"Queue {self.queue_name}: {requeued} expired messages requeued, "
+                  f"{dead_lettered} moved to the dead-letter queue")
+        return requeued, dead_lettered
+    
+    def _move_to_dead_letter(self, record, reason):
+        dead_letter_queue = self.dead_letter_queue
+        record.status = MessageStatus.DEAD_LETTER
+        record.dead_letter_reason = reason
+        record.lease_expires_at = None
+        with dead_letter_queue.lock:
+            dead_letter_queue.backend.put(record)
+        self.backend.delete(record.id)
+        self.notifier.publish(record.id)
+    
+    def get_dead_letters(self):
+        """List the messages that were moved to this queue's dead-letter queue"""
+        return [record.to_dict() for record in self.dead_letter_queue.backend.scan()]
     
     def mark_completed(self, message_id, result=None):
         """Mark a message as completed"""
@@ -69,48 +630,98 @@ class MessageQueue:
         """Mark a message as failed"""
         self._update_message_status(message_id, 'failed', error)
     
+    def release(self, message_id):
+        """Return a message being processed to pending so it is delivered again"""
+        return self._update_message_status(message_id, 'pending')
+    
+    def save_progress(self, message_id, progress):
+        """Store partial results of a message being processed and extend its lease"""
+        with self.lock:
+            record = self.backend.get(message_id)
+            if record is None:
+                return False
+            record.progress = progress
+            if record.status == MessageStatus.PROCESSING:
+                record.lease_expires_at = time.time() + self.visibility_timeout
+            self.backend.put(record)
+            return True
+    
+    def update_batch(self, updates):
+        """Apply (message_id, status, result) updates under a single lock acquisition"""
+        with self.lock:
+            return [
+                self._update_message_status(message_id, status, result)
+                for message_id, status, result in updates
+            ]
+    
     def _update_message_status(self, message_id, status, result=None):
         """Update message status and optionally add result data"""
-        with self.lock:
-            for filename in os.listdir(self.queue_dir):
-                if not filename.endswith('.json'):
-                    continue
-                    
-                file_path = os.path.join(self.queue_dir, filename)
-                try:
-                    with open(file_path, 'r') as f:
-                        message_data = json.load(f)
-                        
-                    if message_data['id'] == message_id:
-                        message_data['status'] = status
-                        if result is not None:
-                            message_data['result'] = result
-                            
-                        with open(file_path, 'w') as f:
-                            json.dump(message_data, f)
-                        return True
-                except Exception as e:
-                    print(f"Error updating message {file_path}: {e}")
+        status = MessageStatus.parse(status)
+        with tracing.child_span("mom.update_status", queue=self.queue_name,
+                                status=status.label), self.lock:
+            try:
+                record = self.backend.get(message_id)
+                if record is None:
+                    return False
+                record.status = status
+                record.lease_expires_at = None
+                if result is not None:
+                    record.result = result
+                self.backend.put(record)
+            except Exception as e:
+                print(f"Error updating message {message_id}: {e}")
+                return False
             
-            return False
+            if status.is_terminal:
+                self.notifier.publish(message_id)
+            return True
+    
+    def get_message(self, message_id):
+        """Read a message by ID, looking in the dead-letter queue too; None if it is gone"""
+        for queue in (self, self.dead_letter_queue):
+            record = queue.backend.get(message_id)
+            if record is not None:
+                return record.to_dict()
+        return None
+    
+    def find_operation(self, operation_id):
+        """Return the message carrying operation_id in any status, or None"""
+        with tracing.child_span("mom.find_operation", queue=self.queue_name):
+            return self._find_operation(operation_id)
+    
+    def _find_operation(self, operation_id):
+        for queue in (self, self.dead_letter_queue):
+            record = queue.backend.find(operation_id)
+            if record is not None:
+                return record.to_dict()
+        return None
+    
+    def wait_for_completion(self, message_id, timeout):
+        """Block until a message reaches a terminal status or timeout seconds pass
+        
+        Returns the latest message data, or None if the message no longer exists.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            # Subscribe before reading so a completion in between is not missed
+            event = self.notifier.subscribe(message_id)
+            try:
+                message_data = self.get_message(message_id)
+                if message_data is None or message_data['status'] in TERMINAL_STATUSES:
+                    return message_data
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return message_data
+                event.wait(remaining)
+            finally:
+                self.notifier.unsubscribe(message_id, event)
     
     def get_pending_operations(self):
         """Get all pending operations (for recovery)"""
-        pending = []
-        for filename in os.listdir(self.queue_dir):
-            if not filename.endswith('.json'):
-                continue
-                
-            file_path = os.path.join(self.queue_dir, filename)
-            try:
-                with open(file_path, 'r') as f:
-                    message_data = json.load(f)
-                    if message_data['status'] in ['pending', 'processing']:
-                        pending.append(message_data)
-            except Exception as e:
-                print(f"Error reading message file {file_path}: {e}")
-        
-        return pending
+        return [
+            record.to_dict()
+            for record in self.backend.scan((MessageStatus.PENDING, MessageStatus.PROCESSING))
+        ]
     
     def cleanup_old_messages(self, max_age_hours=24):
         """Cleanup completed messages older than max_age_hours"""
@@ -118,42 +729,232 @@ class MessageQueue:
             current_time = time.time()
             max_age_seconds = max_age_hours * 3600
             
-            for filename in os.listdir(self.queue_dir):
-                if not filename.endswith('.json'):
-                    continue
-                    
-                file_path = os.path.join(self.queue_dir, filename)
+            # Remove completed or failed messages that are old. Only IDs up to
+            # the cutoff millisecond can be (older-style IDs all sort below
+            # it); the timestamps decide within that millisecond
+            cutoff_id = message_id_floor(current_time - max_age_seconds + 0.001)
+            finished = (MessageStatus.COMPLETED, MessageStatus.FAILED)
+            for record in list(self.backend.scan_range(end_id=cutoff_id, statuses=finished)):
                 try:
-                    with open(file_path, 'r') as f:
-                        message_data = json.load(f)
-                        
-                    # Remove completed or failed messages that are old
-                    if message_data['status'] in ['completed', 'failed']:
-                        age = current_time - message_data['timestamp']
-                        if age > max_age_seconds:
-                            os.remove(file_path)
+                    if current_time - record.timestamp > max_age_seconds:
+                        self.backend.delete(record.id)
                 except Exception as e:
-                    print(f"Error cleaning up message {file_path}: {e}")
+                    print(f"Error cleaning up message {record.id}: {e}")
+
+
+class ShardedQueue:
+    """A logical queue split into shards, each a MessageQueue with its own lock and storage
+    
+    Messages are placed by a hash of their operation_id, so every message of
+    an operation lands on the same shard; messages without one are spread
+    round robin. Shard 0 is the directory of the unsharded queue, so messages
+    queued before sharding was enabled are still drained. Message IDs end in
+    their shard number, which routes acknowledgements and lookups. Priority
+    and fairness hold within each shard, and the backlog limits of the
+    logical queue are split evenly between the shards.
+    """
+    def __init__(self, queue_name, shards, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, max_depth=None, max_bytes=None,
+                 backend=None, exclusive=False):
+        self.queue_name = queue_name
+        self.backend_name = backend or queue_setting('BACKEND', queue_name, DEFAULT_BACKEND)
+        self.max_depth = max_depth if max_depth is not None else queue_setting(
+            'MAX_DEPTH', queue_name, DEFAULT_MAX_DEPTH)
+        self.max_bytes = max_bytes if max_bytes is not None else queue_setting(
+            'MAX_BYTES', queue_name, DEFAULT_MAX_BYTES)
+        self.shards = [
+            MessageQueue(
+                queue_name if index == 0 else f"{queue_name}{SHARD_ID_SEPARATOR}{index}",
+                visibility_timeout, max_attempts,
+                max_depth=-(-self.max_depth // shards), max_bytes=-(-self.max_bytes // shards),
+                backend=self.backend_name, id_suffix=f"{SHARD_ID_SEPARATOR}{index}",
+                exclusive=exclusive
+            )
+            for index in range(shards)
+        ]
+        self._round_robin = itertools.count()
+    
+    def shard_for_operation(self, operation_id):
+        """The shard that messages of operation_id are placed on"""
+        if operation_id is None:
+            return self.shards[next(self._round_robin) % len(self.shards)]
+        # crc32 rather than hash(), which differs between processes
+        return self.shards[zlib.crc32(str(operation_id).encode()) % len(self.shards)]
+    
+    def _shard_for_message(self, message):
+        operation_id = message.get('operation_id') if isinstance(message, dict) else None
+        return self.shard_for_operation(operation_id)
+    
+    def _shard_for_id(self, message_id):
+        _, _, index = message_id.rpartition(SHARD_ID_SEPARATOR)
+        if index.isdigit() and int(index) < len(self.shards):
+            return self.shards[int(index)]
+        # Queued before sharding, or while there were more shards
+        for shard in self.shards:
+            if shard.get_message(message_id) is not None:
+                return shard
+        return self.shards[0]
+    
+    def backlog_stats(self, max_age=BACKLOG_STATS_TTL):
+        depth = 0
+        size_bytes = 0
+        for shard in self.shards:
+            shard_depth, shard_bytes = shard.backlog_stats(max_age)
+            depth += shard_depth
+            size_bytes += shard_bytes
+        return depth, size_bytes
+    
+    def has_capacity(self, priority=PRIORITY_NORMAL, new_messages=1, new_bytes=0):
+        """Whether any shard can take more messages of this priority"""
+        return any(shard.has_capacity(priority, new_messages, new_bytes) for shard in self.shards)
+    
+    def enqueue(self, message, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT, status='pending'):
+        return self._shard_for_message(message).enqueue(message, priority, tenant, status)
+    
+    def enqueue_operation(self, message, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                          status='pending'):
+        return self._shard_for_message(message).enqueue_operation(message, priority, tenant,
+                                                                  status)
+    
+    def enqueue_batch(self, messages, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                      status='pending'):
+        return [message_id for message_id, _ in self.enqueue_operations(messages, priority,
+                                                                         tenant, status)]
+    
+    def enqueue_operations(self, messages, priority=PRIORITY_NORMAL, tenant=DEFAULT_TENANT,
+                           status='pending'):
+        """Add several messages, one enqueue_operations per shard they land on"""
+        placed = {}
+        for position, message in enumerate(messages):
+            shard = self._shard_for_message(message)
+            placed.setdefault(shard, []).append(position)
+        
+        results = [None] * len(messages)
+        for shard, positions in placed.items():
+            shard_results = shard.enqueue_operations(
+                [messages[position] for position in positions], priority, tenant, status
+            )
+            for position, result in zip(positions, shard_results):
+                results[position] = result
+        return results
+    
+    def dequeue(self, scheduler=None):
+        """Get the next pending message of any shard, starting from a different shard each time"""
+        start = next(self._round_robin)
+        for step in range(len(self.shards)):
+            message_data = self.shards[(start + step) % len(self.shards)].dequeue(scheduler)
+            if message_data is not None:
+                return message_data
+        return None
+    
+    def wait_for_messages(self, timeout):
+        """Wait on each shard in turn; consumers that need prompt wake-ups run one per shard"""
+        for shard in self.shards:
+            shard.wait_for_messages(timeout / len(self.shards))
+    
+    def requeue_expired(self):
+        requeued = 0
+        dead_lettered = 0
+        for shard in self.shards:
+            shard_requeued, shard_dead_lettered = shard.requeue_expired()
+            requeued += shard_requeued
+            dead_lettered += shard_dead_lettered
+        return requeued, dead_lettered
+    
+    def get_dead_letters(self):
+        return [message_data for shard in self.shards for message_data in shard.get_dead_letters()]
+    
+    def mark_completed(self, message_id, result=None):
+        self._shard_for_id(message_id).mark_completed(message_id, result)
+    
+    def mark_failed(self, message_id, error=None):
+        self._shard_for_id(message_id).mark_failed(message_id, error)
+    
+    def release(self, message_id):
+        return self._shard_for_id(message_id).release(message_id)
+    
+    def save_progress(self, message_id, progress):
+        return self._shard_for_id(message_id).save_progress(message_id, progress)
+    
+    def update_batch(self, updates):
+        """Apply (message_id, status, result) updates, one update_batch per shard"""
+        placed = {}
+        for position, update in enumerate(updates):
+            placed.setdefault(self._shard_for_id(update[0]), []).append(position)
+        
+        results = [None] * len(updates)
+        for shard, positions in placed.items():
+            shard_results = shard.update_batch([updates[position] for position in positions])
+            for position, result in zip(positions, shard_results):
+                results[position] = result
+        return results
+    
+    def get_message(self, message_id):
+        return self._shard_for_id(message_id).get_message(message_id)
+    
+    def find_operation(self, operation_id):
+        """Look on the operation's shard first, then on the others in case the shard count changed"""
+        placed = self.shard_for_operation(operation_id)
+        message_data = placed.find_operation(operation_id)
+        if message_data is not None:
+            return message_data
+        for shard in self.shards:
+            if shard is not placed:
+                message_data = shard.find_operation(operation_id)
+                if message_data is not None:
+                    return message_data
+        return None
+    
+    def wait_for_completion(self, message_id, timeout):
+        return self._shard_for_id(message_id).wait_for_completion(message_id, timeout)
+    
+    def get_pending_operations(self):
+        return [message_data for shard in self.shards
+                for message_data in shard.get_pending_operations()]
+    
+    def cleanup_old_messages(self, max_age_hours=24):
+        for shard in self.shards:
+            shard.cleanup_old_messages(max_age_hours)
 
 
 class MessageBroker:
     _instance = None
+    _lock = threading.Lock()
     
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MessageBroker, cls).__new__(cls)
-            cls._instance.queues = {}
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(MessageBroker, cls).__new__(cls)
+                cls._instance.queues = {}
         return cls._instance
     
-    def get_queue(self, queue_name):
-        """Get or create a queue with the given name"""
-        if queue_name not in self.queues:
-            self.queues[queue_name] = MessageQueue(queue_name)
-        return self.queues[queue_name]
+    def get_queue(self, queue_name, backend=None, shards=None, exclusive=False):
+        """Get or create a queue with the given name
+        
+        backend picks the storage of a new queue; by default it comes from
+        MOM_BACKEND_<QUEUE> or MOM_BACKEND. With more than one shard
+        (MOM_SHARDS_<QUEUE> or MOM_SHARDS by default) the queue is a
+        ShardedQueue, which callers use exactly like a MessageQueue.
+        exclusive is passed to new queues (see MessageQueue).
+        """
+        with self._lock:
+            if queue_name not in self.queues:
+                shards = shards or queue_setting('SHARDS', queue_name, DEFAULT_SHARDS)
+                if shards > 1:
+                    self.queues[queue_name] = ShardedQueue(queue_name, shards, backend=backend,
+                                                           exclusive=exclusive)
+                else:
+                    self.queues[queue_name] = MessageQueue(queue_name, backend=backend,
+                                                           exclusive=exclusive)
+            return self.queues[queue_name]
     
     def periodic_cleanup(self):
         """Periodically clean up old messages"""
         while True:
             for queue in self.queues.values():
                 queue.cleanup_old_messages()
-            time.sleep(3600)  # Run every hour
\ No newline at end of file
+            time.sleep(3600)  # Run every hour
+
+
+# Queue and storage calls show up in profiling.timings() while profiling runs
+profiling.register(MessageQueue, ShardedQueue, CachedBackend, *BACKENDS.values())
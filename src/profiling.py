@@ -0,0 +1,338 @@
+# On-demand profiling: a sampling profiler writing flamegraph-ready stacks, and
+# per-call timings of the queue methods and gRPC handlers
+#
+# Start with PROFILE=1, POST /admin/profile/start on the gateway, or SIGUSR2 on a
+# service (a second SIGUSR2 stops it and writes the stacks to PROFILE_DIR). While
+# stopped nothing is sampled or wrapped; gRPC handlers cost one check.
+import os
+import sys
+import json
+import time
+import signal
+import inspect
+import argparse
+import functools
+import threading
+import collections
+import grpc
+
+PROFILE = os.environ.get('PROFILE', '0') == '1'
+# Seconds between stack samples
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', '0.005'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '.')
+SERVICE_NAME = os.environ.get(
+    'TRACE_SERVICE_NAME', os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+)
+
+# Classes whose public methods are timed while profiling
+_classes = []
+# (class, name, original function) of every method currently wrapped
+_wrapped = []
+# name -> [calls, total seconds, slowest call in seconds]
+_timings = {}
+# Reentrant: the SIGUSR2 handler may interrupt a thread holding it
+_lock = threading.RLock()
+_sampler = None
+# Process the profiler was started in; it does not survive fork()
+_pid = None
+
+
+def enabled():
+    return _pid == os.getpid()
+
+
+def register(*classes):
+    """Time the public methods of classes whenever profiling runs"""
+    for cls in classes:
+        if cls not in _classes:
+            _classes.append(cls)
+            if enabled():
+                _wrap(cls)
+
+
+def record(name, seconds):
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            _timings[name] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+
+
+def _timed_function(name, function):
+    @functools.wraps(function)
+    def timed_call(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+    return timed_call
+
+
+def timed(name=None):
+    """Decorator timing a function while profiling runs"""
+    def decorate(function):
+        timed_call = _timed_function(name or function.__qualname__, function)
+
+        @functools.wraps(function)
+        def call(*args, **kwargs):
+            if _pid is None:
+                return function(*args, **kwargs)
+            return timed_call(*args, **kwargs)
+        return call
+    return decorate
+
+
+def _wrap(cls):
+    for name, attribute in list(vars(cls).items()):
+        # Generators would only be timed until their first yield
+        if (name.startswith('_') or not inspect.isfunction(attribute)
+                or inspect.isgeneratorfunction(attribute)):
+            continue
+        setattr(cls, name, _timed_function(f"{cls.__name__}.{name}", attribute))
+        _wrapped.append((cls, name, attribute))
+
+
+def _unwrap():
+    while _wrapped:
+        cls, name, attribute = _wrapped.pop()
+        setattr(cls, name, attribute)
+
+
+class Sampler:
+    """Samples the stack of every thread and counts identical stacks
+
+    A sample is weighted by the CPU time its thread used since the previous one,
+    so threads blocked on locks, sockets or sleeps do not show up. Without
+    per-thread CPU clocks every sample weighs the interval (wall-clock time).
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        # "outer;...;inner" -> microseconds
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.running = False
+        self.cpu_time = {}
+        self.labels = {}
+
+    def start(self):
+        self.running = True
+        thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self.labels[code] = label
+        return label
+
+    def _weight(self, ident):
+        """Microseconds of CPU the thread used since the last sample"""
+        try:
+            now = time.clock_gettime_ns(time.pthread_getcpuclockid(ident)) // 1000
+        except (AttributeError, OSError):
+            return int(self.interval * 1e6)
+        previous = self.cpu_time.get(ident)
+        self.cpu_time[ident] = now
+        return now - previous if previous is not None else 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while self.running:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                weight = self._weight(ident)
+                if weight <= 0:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += weight
+            self.samples += 1
+            # Forget threads that have exited
+            for ident in [ident for ident in self.cpu_time if ident not in frames]:
+                del self.cpu_time[ident]
+
+
+def start(interval=None):
+    """Start sampling and timing in this process, discarding earlier results"""
+    global _sampler, _pid
+    with _lock:
+        if enabled():
+            return False
+        _pid = os.getpid()
+        _timings.clear()
+        # Wrappers inherited across fork() from a profiled parent
+        _unwrap()
+        _sampler = Sampler(interval or PROFILE_INTERVAL)
+    for cls in _classes:
+        _wrap(cls)
+    _sampler.start()
+    return True
+
+
+def stop():
+    """Stop profiling; the results stay available until the next start()"""
+    global _pid
+    with _lock:
+        if not enabled():
+            return False
+        _pid = None
+        _sampler.stop()
+        _unwrap()
+    return True
+
+
+def timings():
+    """Timed calls, slowest total first"""
+    with _lock:
+        items = [(name, list(timing)) for name, timing in _timings.items()]
+    items.sort(key=lambda item: item[1][1], reverse=True)
+    return {
+        name: {
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "mean_us": round(total / calls * 1e6, 1),
+            "max_ms": round(slowest * 1000, 3)
+        }
+        for name, (calls, total, slowest) in items
+    }
+
+
+def report():
+    return {
+        "enabled": enabled(),
+        "pid": os.getpid(),
+        "samples": _sampler.samples if _sampler is not None else 0,
+        "interval": _sampler.interval if _sampler is not None else PROFILE_INTERVAL,
+        "timings": timings()
+    }
+
+
+def collapsed():
+    """Sampled stacks in collapsed format ("outer;inner weight" lines), for flamegraph.pl
+    or speedscope"""
+    if _sampler is None:
+        return ''
+    stacks = dict(_sampler.stacks)
+    return ''.join(f"{stack} {weight}\n" for stack, weight in sorted(stacks.items()))
+
+
+def dump(directory=None):
+    """Write the stacks and timings of this process; returns the stacks file"""
+    base = os.path.join(directory or PROFILE_DIR, f"profile-{SERVICE_NAME}-{os.getpid()}")
+    with open(base + '.collapsed', 'w') as f:
+        f.write(collapsed())
+    with open(base + '.json', 'w') as f:
+        json.dump(report(), f, indent=2)
+    return base + '.collapsed'
+
+
+def _toggle(signum, frame):
+    # Runs in the main thread between bytecodes, so file writes are safe here
+    if start():
+        print(f"Profiling started (pid {os.getpid()})")
+    elif stop():
+        print(f"Profiling stopped, stacks written to {dump()}")
+
+
+def start_from_env():
+    """Per-process setup: start if PROFILE=1, and let SIGUSR2 start/stop profiling
+
+    Call it in every worker after fork(), from the main thread.
+    """
+    if hasattr(signal, 'SIGUSR2') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR2, _toggle)
+    if PROFILE:
+        start()
+
+
+def _server_method_name(handler_call_details):
+    return "grpc " + handler_call_details.method.rsplit('/', 1)[-1]
+
+
+class ProfilingServerInterceptor(grpc.ServerInterceptor):
+    """Times unary gRPC handlers while profiling runs"""
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if _pid is None or handler is None or handler.unary_unary is None:
+            return handler
+        return grpc.unary_unary_rpc_method_handler(
+            _timed_function(_server_method_name(handler_call_details), handler.unary_unary),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
+
+
+class AsyncProfilingServerInterceptor(grpc.aio.ServerInterceptor):
+    """ProfilingServerInterceptor for grpc.aio servers"""
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if _pid is None or handler is None or handler.unary_unary is None:
+            return handler
+
+        behavior = handler.unary_unary
+        name = _server_method_name(handler_call_details)
+
+        async def timed_call(request, context):
+            start_time = time.perf_counter()
+            try:
+                return await behavior(request, context)
+            finally:
+                record(name, time.perf_counter() - start_time)
+
+        return grpc.unary_unary_rpc_method_handler(
+            timed_call,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
+
+
+def server_interceptors(use_async=False):
+    """Interceptors to pass to grpc.server()/grpc.aio.server()"""
+    if use_async:
+        return [AsyncProfilingServerInterceptor()]
+    return [ProfilingServerInterceptor()]
+
+
+def print_profile(path, top=20):
+    """Print the functions using the most time in a collapsed stacks file"""
+    own = collections.Counter()
+    inclusive = collections.Counter()
+    total = 0
+    with open(path) as f:
+        for line in f:
+            stack, _, weight = line.rstrip('\n').rpartition(' ')
+            frames = stack.split(';')
+            weight = int(weight)
+            total += weight
+            own[frames[-1]] += weight
+            for label in set(frames):
+                inclusive[label] += weight
+    if not total:
+        print("No samples")
+        return
+    print(f"{total / 1000:.1f}ms sampled")
+    print(f"{'self':>7} {'total':>7}  function")
+    for label, weight in own.most_common(top):
+        print(f"{weight / total:7.1%} {inclusive[label] / total:7.1%}  {label}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize stacks written by the profiler")
+    parser.add_argument("file", help="A profile-*.collapsed file")
+    parser.add_argument("--top", type=int, default=20, help="Functions to show")
+    args = parser.parse_args()
+    print_profile(args.file, args.top)
@@ -0,0 +1,395 @@
+# queue_conformance.py
+# Checks that every storage backend gives MessageQueue the same behaviour
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from storage_backends import BACKENDS
+from message_record import MessageRecord, MessageStatus
+from mom_implementation import (
+    MessageQueue,
+    ShardedQueue,
+    QueueFullError,
+    PRIORITY_HIGH,
+    PRIORITY_LOW
+)
+
+
+class ConformanceError(Exception):
+    pass
+
+
+def expect(condition, message):
+    if not condition:
+        raise ConformanceError(message)
+
+
+def check_round_trip(make_queue):
+    queue = make_queue()
+    message_id = queue.enqueue({'num1': 1, 'num2': 2, 'operation_id': 'op-1'},
+                               PRIORITY_LOW, 'tenant-a')
+    message_data = queue.get_message(message_id)
+    expect(message_data is not None, "enqueued message not found")
+    expect(message_data['content'] == {'num1': 1, 'num2': 2, 'operation_id': 'op-1'},
+           f"content changed: {message_data['content']}")
+    expect(message_data['status'] == 'pending', f"status is {message_data['status']}")
+    expect(message_data['priority'] == PRIORITY_LOW and message_data['tenant'] == 'tenant-a',
+           "priority or tenant lost")
+    expect(queue.find_operation('op-1')['id'] == message_id, "find_operation missed the message")
+    expect(queue.find_operation('op-unknown') is None, "find_operation invented a message")
+    expect(queue.get_message('missing') is None, "get_message invented a message")
+
+
+def check_dequeue_order(make_queue):
+    queue = make_queue()
+    low = queue.enqueue({'n': 'low'}, PRIORITY_LOW)
+    first = queue.enqueue({'n': 'first'})
+    second = queue.enqueue({'n': 'second'})
+    high = queue.enqueue({'n': 'high'}, PRIORITY_HIGH)
+    order = [queue.dequeue()['id'] for _ in range(4)]
+    expect(order == [high, first, second, low], f"dequeue order {order}")
+    expect(queue.dequeue() is None, "dequeue returned a message from an empty queue")
+    message_data = queue.get_message(first)
+    expect(message_data['status'] == 'processing', "dequeued message is not processing")
+    expect(message_data['attempts'] == 1, "delivery was not counted")
+
+
+def check_acknowledge(make_queue):
+    queue = make_queue()
+    completed = queue.enqueue({'n': 1})
+    failed = queue.enqueue({'n': 2})
+    queue.dequeue()
+    queue.dequeue()
+    queue.mark_completed(completed, 3)
+    queue.mark_failed(failed, "boom")
+    expect(queue.get_message(completed)['status'] == 'completed', "mark_completed lost")
+    expect(queue.get_message(completed)['result'] == 3, "result lost")
+    expect(queue.get_message(failed)['result'] == "boom", "error lost")
+    expect(queue.release('missing') is False, "released a message that does not exist")
+    expect(not queue.get_pending_operations(), "acknowledged messages are still pending")
+
+
+def check_batches(make_queue):
+    queue = make_queue()
+    message_ids = queue.enqueue_batch([{'n': i} for i in range(5)])
+    expect(len(set(message_ids)) == 5, "batch IDs are not unique")
+    expect(len(queue.get_pending_operations()) == 5, "batch was not stored")
+    processing = queue.enqueue_batch([{'n': i} for i in range(2)], status='processing')
+    expect(queue.dequeue()['id'] in message_ids, "processing batch was handed out")
+    results = queue.update_batch([(message_id, 'completed', 0) for message_id in processing])
+    expect(results == [True, True], f"update_batch returned {results}")
+    expect(queue.get_message(processing[1])['status'] == 'completed', "batch update lost")
+
+
+def check_release_and_progress(make_queue):
+    queue = make_queue(visibility_timeout=60)
+    message_id = queue.enqueue({'n': 1})
+    leased = queue.dequeue()
+    expect(queue.save_progress(message_id, {'a': 1}), "save_progress failed")
+    message_data = queue.get_message(message_id)
+    expect(message_data['progress'] == {'a': 1}, "progress lost")
+    expect(message_data['lease_expires_at'] >= leased['lease_expires_at'], "lease not extended")
+    expect(queue.release(message_id), "release failed")
+    redelivered = queue.dequeue()
+    expect(redelivered['id'] == message_id and redelivered['attempts'] == 2,
+           "released message was not delivered again")
+    expect(redelivered['progress'] == {'a': 1}, "progress lost on redelivery")
+
+
+def check_redelivery(make_queue):
+    queue = make_queue(visibility_timeout=0, max_attempts=2)
+    message_id = queue.enqueue({'n': 1, 'operation_id': 'op-poison'})
+    queue.dequeue()
+    expect(queue.requeue_expired() == (1, 0), "expired lease was not requeued")
+    queue.dequeue()
+    expect(queue.requeue_expired() == (0, 1), "poison message was not dead-lettered")
+    dead_letters = queue.get_dead_letters()
+    expect([message_data['id'] for message_data in dead_letters] == [message_id],
+           "dead letter not listed")
+    expect(queue.get_message(message_id)['status'] == 'dead_letter',
+           "get_message did not look in the dead-letter queue")
+    expect(queue.find_operation('op-poison')['id'] == message_id,
+           "find_operation did not look in the dead-letter queue")
+    expect(queue.dequeue() is None, "dead letter is still pending")
+
+
+def check_id_order(make_queue):
+    queue = make_queue()
+    first = queue.enqueue({'n': 1})
+    batch = queue.enqueue_batch([{'n': i} for i in range(3)])
+    last = queue.enqueue({'n': 5})
+    expect([first] + batch + [last] == sorted([first] + batch + [last]),
+           "IDs do not sort in enqueue order")
+    in_range = [record.id for record in queue.backend.scan_range(batch[0], last)]
+    expect(in_range == batch, f"scan_range returned {in_range}")
+    expect([record.id for record in queue.backend.scan_range(start_id=last)] == [last],
+           "scan_range with an open end is wrong")
+    pending = queue.backend.scan_range(end_id=batch[1], statuses=(MessageStatus.PENDING,))
+    expect([record.id for record in pending] == [first, batch[0]],
+           "scan_range did not filter by status")
+
+
+def check_sharding(make_queue):
+    queue = make_queue()
+    sharded = ShardedQueue(f"{queue.queue_name}-sharded", 4, backend=queue.backend_name)
+    message_ids = [sharded.enqueue({'n': i, 'operation_id': f"op-{i}"}) for i in range(12)]
+    for i, message_id in enumerate(message_ids):
+        placed = sharded.shard_for_operation(f"op-{i}")
+        expect(placed.get_message(message_id) is not None, f"op-{i} is not on its shard")
+        expect(sharded.find_operation(f"op-{i}")['id'] == message_id,
+               f"find_operation missed op-{i}")
+    expect(len({sharded.shard_for_operation(f"op-{i}").queue_name for i in range(12)}) > 1,
+           "every operation landed on one shard")
+    batch = sharded.enqueue_batch([{'n': i, 'operation_id': f"batch-{i}"} for i in range(6)])
+    contents = [sharded.get_message(message_id)['content']['n'] for message_id in batch]
+    expect(contents == list(range(6)), "enqueue_batch IDs are out of order")
+
+    delivered = []
+    for shard in sharded.shards:
+        while True:
+            message_data = shard.dequeue()
+            if message_data is None:
+                break
+            delivered.append(message_data['id'])
+    expect(sorted(delivered) == sorted(message_ids + batch), "shards did not deliver every message")
+    sharded.mark_completed(message_ids[0], 1)
+    expect(sharded.get_message(message_ids[0])['status'] == 'completed', "acknowledgement not routed")
+    results = sharded.update_batch([(message_id, 'failed', 'x') for message_id in batch])
+    expect(results == [True] * 6, f"update_batch returned {results}")
+    expect(sharded.backlog_stats(max_age=0)[0] == 11, "backlog is not summed over the shards")
+
+
+def check_idempotency(make_queue):
+    queue = make_queue()
+    if queue.operations is None:
+        return  # Turned off with MOM_IDEMPOTENCY_KEYS=0
+    first = queue.enqueue({'n': 1, 'operation_id': 'op-once'})
+    expect(queue.enqueue({'n': 1, 'operation_id': 'op-once'}) == first,
+           "duplicate operation was enqueued again")
+    batch = queue.enqueue_batch([{'n': 2, 'operation_id': 'op-twice'},
+                                 {'n': 2, 'operation_id': 'op-twice'}, {'n': 3}, {'n': 3}])
+    expect(batch[0] == batch[1] and batch[2] != batch[3], f"batch deduplicated as {batch}")
+    expect(queue.enqueue({'n': 4, 'operation_id': ''}) != queue.enqueue({'n': 4, 'operation_id': ''}),
+           "messages without an operation_id were deduplicated")
+
+    # A handler taking over a queued operation leases it away from consumers
+    message_id, earlier = queue.enqueue_operation({'n': 1, 'operation_id': 'op-once'},
+                                                  status='processing')
+    expect(message_id == first and earlier['content']['n'] == 1, "earlier message not returned")
+    expect(earlier['status'] == 'processing' and queue.get_message(first)['status'] == 'processing',
+           "earlier message was not leased")
+    queue.mark_completed(first, 2)
+    _, earlier = queue.enqueue_operation({'n': 1, 'operation_id': 'op-once'}, status='processing')
+    expect(earlier['status'] == 'completed' and earlier['result'] == 2, "stored result not returned")
+
+    # A copy written behind the queue's back (by another process) is completed, not delivered
+    expect(queue.dequeue()['id'] == batch[0], "dequeue order changed")
+    queue.mark_completed(batch[0], 5)
+    copy = dict(queue.get_message(batch[0]), id='mz-copy', status='pending')
+    queue.backend.put(MessageRecord.from_dict(copy))
+    delivered = [queue.dequeue()['id'] for _ in range(4)]
+    expect(queue.dequeue() is None, "copy of a completed operation was delivered")
+    expect('mz-copy' not in delivered, "copy of a completed operation was delivered")
+    expect(queue.get_message('mz-copy')['status'] == 'completed'
+           and queue.get_message('mz-copy')['result'] == 5, "copy did not get the stored result")
+
+
+def check_backlog_limits(make_queue):
+    queue = make_queue(max_depth=4)
+    queue.enqueue({'n': 1})
+    queue.enqueue({'n': 2}, status='processing')
+    expect(queue.backlog_stats(max_age=0)[0] == 2, "backlog depth is wrong")
+    expect(queue.backlog_stats(max_age=0)[1] > 0, "backlog bytes are missing")
+    queue.enqueue({'n': 3}, PRIORITY_HIGH)
+    try:
+        queue.enqueue({'n': 4}, PRIORITY_LOW)
+    except QueueFullError:
+        pass
+    else:
+        raise ConformanceError("low priority message was admitted to a full queue")
+    expect(queue.has_capacity(PRIORITY_HIGH), "high priority may fill the whole queue")
+
+
+def check_cleanup(make_queue):
+    queue = make_queue()
+    old = queue.enqueue({'n': 1})
+    kept = queue.enqueue({'n': 2})
+    queue.mark_completed(old, 1)
+    queue.cleanup_old_messages(max_age_hours=0)
+    expect(queue.get_message(old) is None, "old completed message was not removed")
+    expect(queue.get_message(kept) is not None, "pending message was removed")
+
+
+def check_wait_for_completion(make_queue):
+    queue = make_queue()
+    message_id = queue.enqueue({'n': 1})
+    timer = threading.Timer(0.2, queue.mark_completed, (message_id, 1))
+    timer.start()
+    start = time.monotonic()
+    message_data = queue.wait_for_completion(message_id, 5)
+    expect(message_data['status'] == 'completed', "waiter did not see the completion")
+    expect(time.monotonic() - start < 2, "waiter was not woken up")
+
+
+def check_concurrent_consumers(make_queue):
+    queue = make_queue()
+    queue.enqueue_batch([{'n': i} for i in range(40)])
+    delivered = []
+
+    def consume():
+        while True:
+            message_data = queue.dequeue()
+            if message_data is None:
+                return
+            delivered.append(message_data['id'])
+
+    threads = [threading.Thread(target=consume) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expect(len(delivered) == 40 and len(set(delivered)) == 40,
+           f"{len(delivered)} deliveries of {len(set(delivered))} messages")
+
+
+def check_wakeup(make_queue):
+    queue = make_queue()
+    timer = threading.Timer(0.1, queue.enqueue, ({'n': 1},))
+    timer.start()
+    start = time.monotonic()
+    queue.wait_for_messages(5)
+    expect(time.monotonic() - start < 2, "consumer was not woken up by the enqueue")
+    expect(queue.dequeue() is not None, "woken up without a pending message")
+
+
+def check_durability(make_queue):
+    queue = make_queue()
+    message_id = queue.enqueue({'n': 1})
+    queue.backend.close()
+    reopened = make_queue()
+    expect(reopened.get_message(message_id) is not None, "message lost when the queue was reopened")
+
+
+def _enqueue_in_child(queue_name, backend, connection):
+    queue = MessageQueue(queue_name, backend=backend)
+    connection.send(queue.enqueue({'from': 'child'}))
+
+
+def check_cross_process(make_queue):
+    queue = make_queue()
+    # A fresh interpreter, like a separately started service
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    child = context.Process(
+        target=_enqueue_in_child, args=(queue.queue_name, queue.backend_name, sender)
+    )
+    child.start()
+    expect(receiver.poll(30), "child process did not enqueue")
+    message_id = receiver.recv()
+    child.join()
+    expect(queue.get_message(message_id)['content'] == {'from': 'child'},
+           "message written by another process not visible")
+
+
+CHECKS = [
+    check_round_trip,
+    check_dequeue_order,
+    check_acknowledge,
+    check_batches,
+    check_id_order,
+    check_sharding,
+    check_idempotency,
+    check_release_and_progress,
+    check_redelivery,
+    check_backlog_limits,
+    check_cleanup,
+    check_wait_for_completion,
+    check_concurrent_consumers
+]
+# Only meaningful for backends that claim the property
+DURABLE_CHECKS = [check_durability]
+SHARED_CHECKS = [check_cross_process]
+NOTIFY_CHECKS = [check_wakeup]
+
+
+def backend_checks(backend, exclusive=False):
+    """The checks that apply to backend
+
+    exclusive checks queues opened as the broker server opens them, which
+    no other process may share.
+    """
+    backend_class = BACKENDS[backend]
+    checks = list(CHECKS)
+    if backend_class.durable:
+        checks += DURABLE_CHECKS
+    if backend_class.shared and not exclusive:
+        checks += SHARED_CHECKS
+    if backend_class.notifies:
+        checks += NOTIFY_CHECKS
+    return checks
+
+
+def queue_factory(backend, check, exclusive=False):
+    """make_queue argument of check; queues are created in the working directory"""
+    # Each check gets its own queue name, reused when it reopens the queue
+    queue_name = f"conformance-{backend}-{check.__name__}"
+
+    def make_queue(**options):
+        return MessageQueue(queue_name, backend=backend, exclusive=exclusive, **options)
+    return make_queue
+
+
+def backend_available(backend, directory):
+    """None if backend can be opened, else why not (e.g. a missing package)"""
+    try:
+        BACKENDS[backend](directory).close()
+    except RuntimeError as e:
+        return str(e)
+    return None
+
+
+def run_backend(backend, exclusive=False):
+    """Run every check against backend; returns the number of failures"""
+    failures = 0
+    for check in backend_checks(backend, exclusive):
+        try:
+            check(queue_factory(backend, check, exclusive))
+            print(f"PASS {backend:8} {check.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"FAIL {backend:8} {check.__name__}: {type(e).__name__}: {e}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage backend conformance checks")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS),
+                        help="Backend to check (repeatable); all of them by default")
+    parser.add_argument("--exclusive", action="store_true",
+                        help="Open the queues as the broker server does (in-memory copy)")
+    args = parser.parse_args()
+
+    # Queues are created relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="queue-conformance-")
+    os.chdir(workdir)
+    failures = 0
+    try:
+        for backend in args.backend or sorted(BACKENDS):
+            unavailable = backend_available(backend, tempfile.mkdtemp(dir=workdir))
+            if unavailable:
+                print(f"SKIP {backend:8} {unavailable}")
+                continue
+            failures += run_backend(backend, args.exclusive)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{failures} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
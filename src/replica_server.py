@@ -0,0 +1,133 @@
+# replica_server.py
+# Follower broker: stores the queue writes leaders ship to it (see replication.py)
+import os
+import json
+import time
+import argparse
+import threading
+import collections
+from pathlib import Path
+from concurrent import futures
+import grpc
+import broker_pb2
+import broker_pb2_grpc
+import grpc_options
+from message_record import MessageRecord
+from storage_backends import DEFAULT_BACKEND, open_backend
+from mom_implementation import QueueLock, queue_setting
+
+# Messages per queue whose latest written_at is remembered, least recently
+# written forgotten first
+REPLICA_VERSIONS = int(os.environ.get('MOM_REPLICA_VERSIONS', '1000000'))
+
+
+class ReplicationServicer(broker_pb2_grpc.ReplicationServicer):
+    """Applies replicated writes to the queues in this process's queues/ directory
+
+    The directory has the same layout as the leader's, so after losing the
+    leader the gateway and services can be started on it.
+    """
+    def __init__(self):
+        self.queues = {}
+        # Queue name -> {message_id: written_at of the write stored last}
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def _queue(self, queue_name):
+        with self.lock:
+            if queue_name not in self.queues:
+                queue_dir = f"queues/{queue_name}"
+                Path(queue_dir).mkdir(parents=True, exist_ok=True)
+                backend = open_backend(
+                    queue_setting('BACKEND', queue_name, DEFAULT_BACKEND), queue_dir
+                )
+                lock = QueueLock(os.path.join(queue_dir, '.lock'), backend.shared)
+                self.queues[queue_name] = (backend, lock)
+                self.versions[queue_name] = collections.OrderedDict()
+            return self.queues[queue_name]
+
+    def _apply(self, writes):
+        # One lock acquisition per queue per batch, keeping the order within a queue
+        by_queue = {}
+        for write in writes:
+            by_queue.setdefault(write.queue_name, []).append(write)
+        for queue_name, queue_writes in by_queue.items():
+            backend, lock = self._queue(queue_name)
+            versions = self.versions[queue_name]
+            with lock:
+                records = []
+                for write in queue_writes:
+                    record = MessageRecord.from_dict(json.loads(write.record)) if write.record else None
+                    if not self._newer(backend, versions, write, record):
+                        continue
+                    if record is not None:
+                        records.append(record)
+                        continue
+                    if records:
+                        backend.put_many(records)
+                        records = []
+                    backend.delete(write.message_id)
+                if records:
+                    backend.put_many(records)
+
+    def _newer(self, backend, versions, write, record):
+        """Whether write is newer than what is stored for its message, remembering it if so
+
+        Several leader processes write the same queues over separate streams, and
+        each sends copies of every queue when it connects, so an older state of
+        a message may arrive after a newer one.
+        """
+        latest = versions.get(write.message_id)
+        if latest is not None and write.written_at < latest:
+            return False
+        if latest is None and write.snapshot and record is not None:
+            # Unknown message (e.g. this follower restarted): finished messages
+            # never go back, so keep a stored final status
+            if not record.status.is_terminal:
+                current = backend.get(record.id)
+                if current is not None and current.status.is_terminal:
+                    return False
+        versions[write.message_id] = write.written_at
+        versions.move_to_end(write.message_id)
+        if len(versions) > REPLICA_VERSIONS:
+            versions.popitem(last=False)
+        return True
+
+    def Replicate(self, request_iterator, context):
+        for batch in request_iterator:
+            try:
+                self._apply(batch.writes)
+            except Exception as e:
+                print(f"Error storing replicated batch {batch.sequence}: {e}")
+                yield broker_pb2.ReplicationAck(sequence=batch.sequence, error_message=str(e))
+                return
+            yield broker_pb2.ReplicationAck(sequence=batch.sequence)
+
+
+def run_replica_server(port=50090, max_workers=32):
+    # Every leader process (gateway, services) keeps one stream open, each holding a thread
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers),
+                         options=grpc_options.server_options(),
+                         compression=grpc_options.server_compression())
+    broker_pb2_grpc.add_ReplicationServicer_to_server(ReplicationServicer(), server)
+    server.add_insecure_port(f'[::]:{port}')
+    server.start()
+    print(f"Replica server running on port {port} (pid {os.getpid()}), storing in {os.getcwd()}")
+    try:
+        while True:
+            time.sleep(86400)  # One day in seconds
+    except KeyboardInterrupt:
+        server.stop(0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follower broker holding a copy of the queues")
+    parser.add_argument("--port", type=int, default=50090, help="Port to listen on")
+    parser.add_argument("--max-workers", type=int, default=32,
+                        help="Handler threads; one per connected leader process")
+    parser.add_argument("--data-dir", default=".",
+                        help="Directory whose queues/ receives the copy (not the leader's)")
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.chdir(args.data_dir)
+    run_replica_server(args.port, args.max_workers)
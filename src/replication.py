@@ -0,0 +1,284 @@
+# replication.py
+# Ships every queue write to follower brokers (replica_server.py) over gRPC
+import os
+import json
+import time
+import itertools
+import threading
+import collections
+import grpc
+import broker_pb2
+import broker_pb2_grpc
+import grpc_options
+
+# Followers as host:port,host:port; no replication when unset
+REPLICA_ADDRESSES = [
+    address.strip() for address in os.environ.get('MOM_REPLICAS', '').split(',') if address.strip()
+]
+# Followers that should store a write before it returns; 0 ships writes in the background
+REPLICA_ACKS = int(os.environ.get('MOM_REPLICA_ACKS', '1'))
+# Seconds a write waits for its acknowledgements before it is counted as under-replicated
+REPLICATION_TIMEOUT = float(os.environ.get('MOM_REPLICATION_TIMEOUT', '2'))
+# Most writes sent to a follower in one message
+REPLICATION_BATCH_SIZE = int(os.environ.get('MOM_REPLICATION_BATCH_SIZE', '256'))
+# Writes queued for a follower that is down or slow; past this they are
+# dropped, and the follower gets a fresh copy of every queue instead
+REPLICATION_BUFFER = int(os.environ.get('MOM_REPLICATION_BUFFER', '100000'))
+RECONNECT_DELAY = 1.0
+# Seconds between two under-replication warnings
+UNDER_REPLICATED_LOG_INTERVAL = 10.0
+
+# Writes made while this thread holds a queue lock, whose acknowledgements are
+# awaited once it lets go of the last one
+_deferred = threading.local()
+
+
+def replicated_write(queue_name, message_id, record=None, snapshot=False, written_at=None):
+    """A put of record, or a delete of message_id when record is None
+
+    Followers keep the write with the latest written_at for each message. Writes
+    to one message are serialized by the queue lock, so their wall clock times
+    order them even when they come from different processes.
+    """
+    return broker_pb2.ReplicatedWrite(
+        queue_name=queue_name,
+        message_id=message_id,
+        record=json.dumps(record.to_dict()).encode() if record is not None else b'',
+        snapshot=snapshot,
+        written_at=written_at or time.time_ns()
+    )
+
+
+def defer_acks():
+    """Until the matching wait_for_acks(), writes of this thread return without waiting
+    for the followers (called when a queue lock is taken)"""
+    _deferred.depth = getattr(_deferred, 'depth', 0) + 1
+
+
+def wait_for_acks():
+    """Wait for the writes deferred since the outermost defer_acks() (called after the
+    queue lock is released, so other writers are not held up meanwhile)"""
+    _deferred.depth -= 1
+    if _deferred.depth == 0 and getattr(_deferred, 'sequences', None):
+        sequences, _deferred.sequences = _deferred.sequences, {}
+        for replicator, sequence in sequences.items():
+            replicator.wait(sequence)
+
+
+class _Follower:
+    """The stream to one follower and the writes it has not acknowledged yet
+
+    Batches are sent as soon as there are writes, without waiting for the
+    acknowledgements of earlier batches. Every (re)connection starts with a
+    copy of every queue, since the follower may have missed writes or lost
+    its disk; writes are whole records, so storing one twice is harmless.
+    """
+    def __init__(self, address, replicator):
+        self.address = address
+        self.replicator = replicator
+        self.condition = replicator.condition
+        self.pending = collections.deque()  # (sequence, write) not sent yet
+        self.unacked = collections.deque()  # Sent, waiting for the acknowledgement
+        self.acked = 0
+        self.stream_id = 0
+        # Whether the stream is up; writes only wait for connected followers
+        self.connected = False
+        thread = threading.Thread(target=self._run, name=f"replication-{address}")
+        thread.daemon = True
+        thread.start()
+
+    def add(self, sequence, write):
+        # Call with the condition held
+        if len(self.pending) + len(self.unacked) >= REPLICATION_BUFFER:
+            # Too far behind: reconnect, which starts over from a copy
+            self.pending.clear()
+            self.unacked.clear()
+            self.stream_id += 1
+        self.pending.append((sequence, write))
+
+    def snapshot(self, backends, replace=False):
+        """Queue a copy of every message of backends, in place of all queued writes if replace"""
+        with self.condition:
+            if replace:
+                self.pending.clear()
+                self.unacked.clear()
+            # Every write up to here is stored locally, so the scan below covers it
+            covered = self.replicator.last_sequence
+        # Each message is read after this instant, so the copy is at least as new
+        # as any write made before it
+        written_at = time.time_ns()
+        writes = [
+            (covered, replicated_write(queue_name, record.id, record, True, written_at))
+            for queue_name, backend in backends
+            for record in backend.scan()
+        ]
+        with self.condition:
+            if replace:
+                self.pending.extendleft(reversed(writes))
+            else:
+                self.pending.extend(writes)
+            self.condition.notify_all()
+
+    def _batches(self, stream_id):
+        while True:
+            with self.condition:
+                while not self.pending and self.stream_id == stream_id:
+                    self.condition.wait(RECONNECT_DELAY)
+                if self.stream_id != stream_id:
+                    return
+                batch = [self.pending.popleft()
+                         for _ in range(min(len(self.pending), REPLICATION_BATCH_SIZE))]
+                self.unacked.extend(batch)
+            yield broker_pb2.ReplicationBatch(
+                sequence=max(sequence for sequence, _ in batch),
+                writes=[write for _, write in batch]
+            )
+
+    def _run(self):
+        channel = grpc.insecure_channel(self.address, options=grpc_options.channel_options())
+        stub = broker_pb2_grpc.ReplicationStub(channel)
+        while True:
+            try:
+                # Copying the queues is pointless while the follower is down
+                grpc.channel_ready_future(channel).result()
+                with self.condition:
+                    self.stream_id += 1
+                    stream_id = self.stream_id
+                    backends = list(self.replicator.backends.items())
+                self.snapshot(backends, replace=True)
+                with self.condition:
+                    self.connected = True
+                for ack in stub.Replicate(self._batches(stream_id),
+                                          compression=grpc_options.call_compression(None)):
+                    if ack.error_message:
+                        raise RuntimeError(ack.error_message)
+                    with self.condition:
+                        while self.unacked and self.unacked[0][0] <= ack.sequence:
+                            self.unacked.popleft()
+                        self.acked = max(self.acked, ack.sequence)
+                        self.condition.notify_all()
+            except Exception as e:
+                reason = e.code().name if isinstance(e, grpc.RpcError) else e
+                print(f"Replication to {self.address} interrupted: {reason}")
+                time.sleep(RECONNECT_DELAY)
+            with self.condition:
+                # Ends the request stream if the follower went away, and
+                # stops writes from waiting for it
+                self.stream_id += 1
+                self.connected = False
+                self.condition.notify_all()
+
+
+class Replicator:
+    """Ships the writes of every replicated queue in this process to the followers
+
+    A write waits until acks followers stored it (capped at the number of
+    followers), at most timeout seconds and only for followers that are
+    connected. Writes that end up on fewer followers are stored locally all
+    the same; they are counted in under_replicated and logged.
+    """
+    def __init__(self, addresses, acks=REPLICA_ACKS, timeout=REPLICATION_TIMEOUT):
+        self.acks = min(acks, len(addresses))
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.sequence = itertools.count(1)
+        self.last_sequence = 0
+        self.under_replicated = 0
+        self.last_warning = 0.0
+        # Queue name -> local backend, for snapshots
+        self.backends = {}
+        self.followers = [_Follower(address, self) for address in addresses]
+
+    def register(self, queue_name, backend):
+        with self.condition:
+            self.backends[queue_name] = backend
+        # Messages written before this process started may be missing too
+        for follower in self.followers:
+            follower.snapshot([(queue_name, backend)])
+
+    def replicate(self, writes):
+        """Ship writes, waiting for their acknowledgements unless this thread defers them"""
+        with self.condition:
+            for write in writes:
+                self.last_sequence = next(self.sequence)
+                for follower in self.followers:
+                    follower.add(self.last_sequence, write)
+            sequence = self.last_sequence
+            self.condition.notify_all()
+        if not self.acks:
+            return
+        if getattr(_deferred, 'depth', 0):
+            sequences = getattr(_deferred, 'sequences', None)
+            if sequences is None:
+                sequences = _deferred.sequences = {}
+            sequences[self] = sequence
+        else:
+            self.wait(sequence)
+
+    def wait(self, sequence):
+        """Wait for the acknowledgements of every write up to sequence"""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self._stored(sequence) >= min(self.acks, self._connected()),
+                self.timeout
+            )
+            stored = self._stored(sequence)
+            if stored >= self.acks:
+                return
+            self.under_replicated += 1
+            if time.monotonic() - self.last_warning < UNDER_REPLICATED_LOG_INTERVAL:
+                return
+            self.last_warning = time.monotonic()
+        print(f"Write {sequence} reached {stored} of {self.acks} followers; "
+              f"{self.under_replicated} under-replicated writes so far")
+
+    def _stored(self, sequence):
+        return sum(1 for follower in self.followers if follower.acked >= sequence)
+
+    def _connected(self):
+        return sum(1 for follower in self.followers if follower.connected)
+
+
+class ReplicatedBackend:
+    """A StorageBackend whose writes are also shipped to the followers"""
+    def __init__(self, backend, queue_name, replicator):
+        self.backend = backend
+        self.queue_name = queue_name
+        self.replicator = replicator
+        replicator.register(queue_name, backend)
+
+    def __getattr__(self, name):
+        # Reads and backend properties go to the local backend
+        return getattr(self.backend, name)
+
+    def put(self, record):
+        self.backend.put(record)
+        self.replicator.replicate([replicated_write(self.queue_name, record.id, record)])
+
+    def put_many(self, records):
+        self.backend.put_many(records)
+        self.replicator.replicate([
+            replicated_write(self.queue_name, record.id, record) for record in records
+        ])
+
+    def delete(self, message_id):
+        self.backend.delete(message_id)
+        self.replicator.replicate([replicated_write(self.queue_name, message_id)])
+
+
+_replicator = None
+_replicator_pid = None
+_replicator_lock = threading.Lock()
+
+
+def default_replicator():
+    """The Replicator of this process configured by MOM_REPLICAS, or None"""
+    global _replicator, _replicator_pid
+    if not REPLICA_ADDRESSES:
+        return None
+    with _replicator_lock:
+        # Channels and threads do not survive fork(), so each process has its own
+        if _replicator_pid != os.getpid():
+            _replicator = Replicator(REPLICA_ADDRESSES)
+            _replicator_pid = os.getpid()
+        return _replicator
@@ -5,14 +5,26 @@ import time
 import subprocess
 import signal
 import atexit
+import argparse
 from client import run_manual_mode ,run_autotest_mode
 processes = []
 
-def start_service(script_name, *args):
+# Base port of each microservice; replica i listens on base port + 10 * i
+SERVICES = [
+    ("addition_service.py", "add", 50051),
+    ("subtraction_service.py", "subtract", 50052),
+    ("multiplication_service.py", "multiply", 50053),
+    ("division_service.py", "divide", 50054)
+]
+COMBINED_PORT = 50050
+# Above the replica ports, which grow by 10 per replica
+BROKER_PORT = 50100
+
+def start_service(script_name, *args, env=None):
     """Start a service in a new process with optional command-line arguments"""
     cmd = [sys.executable, script_name] + list(args)
     print(f"Starting {' '.join(cmd)}...")
-    process = subprocess.Popen(cmd)
+    process = subprocess.Popen(cmd, env=env)
     processes.append((script_name, process))
     return process
 
@@ -30,27 +42,73 @@ def cleanup():
     print("All services shut down")
 
 def main():
+    parser = argparse.ArgumentParser(description="Start all MOM-gRPC services")
+    parser.add_argument(
+        "--replicas",
+        type=int,
+        default=1,
+        help="Number of processes to start for each microservice"
+    )
+    parser.add_argument(
+        "--combined",
+        action="store_true",
+        help="Serve all four operations from calculator_service.py instead of one process each"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Pre-forked worker processes per service, sharing its port"
+    )
+    parser.add_argument(
+        "--broker",
+        action="store_true",
+        help="Keep every queue in one broker process (broker_server.py) instead of in each service"
+    )
+    args = parser.parse_args()
+    base_ports = [COMBINED_PORT] if args.combined else [port for _, _, port in SERVICES]
+    if args.broker and max(base_ports) + 10 * (args.replicas - 1) >= BROKER_PORT:
+        parser.error(f"--broker listens on port {BROKER_PORT}, which these --replicas would reach")
+    
     # Register cleanup function
     atexit.register(cleanup)
     signal.signal(signal.SIGINT, lambda sig, frame: sys.exit(0))
     signal.signal(signal.SIGTERM, lambda sig, frame: sys.exit(0))
     
-    # Start all microservices
-    
-    start_service("addition_service.py")
-    time.sleep(1)
+    if args.broker:
+        start_service("broker_server.py", "--port", str(BROKER_PORT))
+        # Inherited by every process started below
+        os.environ["MOM_BROKER_ADDRESS"] = f"localhost:{BROKER_PORT}"
+        time.sleep(1)
     
-    start_service("subtraction_service.py")
-    time.sleep(1)
-    
-    start_service("multiplication_service.py")
-    time.sleep(1)
+    # Start all microservices, telling the gateway where every replica listens
+    gateway_env = dict(os.environ)
+    if args.combined:
+        addresses = []
+        for replica in range(args.replicas):
+            port = COMBINED_PORT + 10 * replica
+            start_service("calculator_service.py", "--port", str(port),
+                          "--workers", str(args.workers))
+            addresses.append(f"localhost:{port}")
+        for _, operation, _ in SERVICES:
+            gateway_env[f"SERVICE_ENDPOINTS_{operation.upper()}"] = ",".join(addresses)
+        time.sleep(1)
+    else:
+        for script_name, operation, base_port in SERVICES:
+            addresses = []
+            for replica in range(args.replicas):
+                port = base_port + 10 * replica
+                start_service(script_name, "--port", str(port),
+                              "--workers", str(args.workers))
+                addresses.append(f"localhost:{port}")
+            gateway_env[f"SERVICE_ENDPOINTS_{operation.upper()}"] = ",".join(addresses)
+            time.sleep(1)
     
-    start_service("division_service.py")
-    time.sleep(1)
+    # Expression evaluation dispatches its steps to the same replicas
+    start_service("expression_service.py", env=gateway_env)
     
     # Start API gateway
-    start_service("api_gateway.py")
+    start_service("api_gateway.py", env=gateway_env)
     time.sleep(3)
     
     # Start client for testing
@@ -11,6 +11,7 @@ def install_dependencies():
         "grpcio",
         "grpcio-tools",
         "flask",
+        "gunicorn",
         "requests"
     ]
     
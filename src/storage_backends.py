@@ -0,0 +1,805 @@
+# Storage backends holding the messages of a MessageQueue
+import os
+import json
+import mmap
+import time
+import errno
+import select
+import struct
+import sqlite3
+import threading
+from message_record import MessageRecord, MessageStatus
+
+try:
+    import lmdb
+except ImportError:  # Optional: only needed for MOM_BACKEND=lmdb
+    lmdb = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+# Backend used by queues without a MOM_BACKEND_<QUEUE> override
+DEFAULT_BACKEND = os.environ.get('MOM_BACKEND', 'file')
+# NORMAL survives a crashed process; FULL also survives a power failure
+SQLITE_SYNCHRONOUS = os.environ.get('MOM_SQLITE_SYNCHRONOUS', 'NORMAL')
+LMDB_MAP_SIZE = int(os.environ.get('MOM_LMDB_MAP_SIZE', str(1024 ** 3)))
+# Size of new ring buffers; existing ones keep the size they were created with
+RING_CAPACITY = int(os.environ.get('MOM_RING_CAPACITY', '4096'))
+RING_RECORD_SIZE = int(os.environ.get('MOM_RING_RECORD_SIZE', '1024'))
+
+BACKLOG_STATUSES = (MessageStatus.PENDING, MessageStatus.PROCESSING)
+
+
+class StorageFullError(Exception):
+    """Raised by bounded backends when there is no room for another message"""
+
+
+def in_id_range(message_id, start_id, end_id):
+    return ((start_id is None or message_id >= start_id)
+            and (end_id is None or message_id < end_id))
+
+
+class StorageBackend:
+    """Stores the messages of one queue as MessageRecords keyed by message ID
+
+    MessageQueue holds its queue lock around every read-modify-write, so
+    backends only need each call to be atomic on its own. Message IDs are
+    unique without coordination, so new messages are put without the lock
+    unless the backend sets concurrent_put to False.
+    """
+    name = None
+    # Messages survive the process that wrote them
+    durable = True
+    # Other processes on this host see the same messages
+    shared = True
+    # wait_for_messages returns as soon as a message becomes pending
+    notifies = False
+    # put() of a new message may run without the queue lock, alongside other writers
+    concurrent_put = True
+    # find() uses an index instead of scanning every message
+    indexed_find = False
+
+    def __init__(self, queue_dir):
+        self.queue_dir = queue_dir
+
+    def put(self, record):
+        """Insert or replace a message"""
+        raise NotImplementedError
+
+    def put_many(self, records):
+        for record in records:
+            self.put(record)
+
+    def get(self, message_id):
+        """Return a message, or None if there is none with this ID"""
+        raise NotImplementedError
+
+    def delete(self, message_id):
+        raise NotImplementedError
+
+    def scan(self, statuses=None):
+        """Yield every message, or only those whose MessageStatus is in statuses"""
+        raise NotImplementedError
+
+    def scan_range(self, start_id=None, end_id=None, statuses=None):
+        """Yield messages with start_id <= ID < end_id in ID order, i.e. creation order
+
+        A None bound leaves that side of the range open.
+        """
+        records = [
+            record for record in self.scan(statuses)
+            if in_id_range(record.id, start_id, end_id)
+        ]
+        records.sort(key=lambda record: record.id)
+        yield from records
+
+    def find(self, operation_id):
+        """Return a message carrying operation_id, or None"""
+        for record in self.scan():
+            if record.operation_id == operation_id:
+                return record
+        return None
+
+    def backlog(self):
+        """Return (depth, bytes) of pending and processing messages"""
+        depth = 0
+        size_bytes = 0
+        for record in self.scan(BACKLOG_STATUSES):
+            depth += 1
+            size_bytes += len(json.dumps(record.to_dict()))
+        return depth, size_bytes
+
+    def wait_for_messages(self, timeout):
+        """Block until a message may have become pending, or timeout seconds pass
+
+        Backends without notifications just sleep, so consumers poll.
+        """
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+
+class FileBackend(StorageBackend):
+    """One JSON file per message in the queue directory"""
+    name = 'file'
+
+    def _path(self, message_id):
+        return os.path.join(self.queue_dir, f"{message_id}.json")
+
+    def put(self, record):
+        # Atomically replace the file so other processes never read a partial write
+        file_path = self._path(record.id)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record.to_dict(), f)
+        os.replace(tmp_path, file_path)
+
+    def get(self, message_id):
+        try:
+            with open(self._path(message_id), 'r') as f:
+                return MessageRecord.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, message_id):
+        try:
+            os.remove(self._path(message_id))
+        except FileNotFoundError:
+            pass
+
+    def _files(self, start_id=None, end_id=None):
+        for filename in os.listdir(self.queue_dir):
+            if filename.endswith('.json') and in_id_range(filename[:-5], start_id, end_id):
+                yield os.path.join(self.queue_dir, filename)
+
+    def scan(self, statuses=None, start_id=None, end_id=None):
+        for file_path in self._files(start_id, end_id):
+            try:
+                with open(file_path, 'r') as f:
+                    record = MessageRecord.from_dict(json.load(f))
+            except FileNotFoundError:
+                # Removed by another process between listdir and open
+                continue
+            except Exception as e:
+                print(f"Error reading message file {file_path}: {e}")
+                continue
+            if statuses is None or record.status in statuses:
+                yield record
+
+    def scan_range(self, start_id=None, end_id=None, statuses=None):
+        # Only the files whose names are in range are read
+        yield from sorted(self.scan(statuses, start_id, end_id), key=lambda record: record.id)
+
+    def backlog(self):
+        depth = 0
+        size_bytes = 0
+        for file_path in self._files():
+            try:
+                with open(file_path, 'r') as f:
+                    status = MessageStatus.parse(json.load(f)['status'])
+                if status in BACKLOG_STATUSES:
+                    depth += 1
+                    size_bytes += os.path.getsize(file_path)
+            except (OSError, ValueError):
+                continue
+        return depth, size_bytes
+
+
+class MemoryBackend(StorageBackend):
+    """Dict in this process; fastest, but lost on exit and invisible to other processes"""
+    name = 'memory'
+    durable = False
+    shared = False
+    notifies = True
+
+    def __init__(self, queue_dir):
+        super().__init__(queue_dir)
+        self.messages = {}
+        self.lock = threading.Lock()
+        self.pending = threading.Condition(self.lock)
+
+    # Copies, so callers changing a record do not change the stored one
+    def put(self, record):
+        with self.lock:
+            self.messages[record.id] = record.copy()
+            if record.status == MessageStatus.PENDING:
+                self.pending.notify_all()
+
+    def wait_for_messages(self, timeout):
+        with self.lock:
+            self.pending.wait(timeout)
+
+    def get(self, message_id):
+        with self.lock:
+            record = self.messages.get(message_id)
+        return record.copy() if record is not None else None
+
+    def delete(self, message_id):
+        with self.lock:
+            self.messages.pop(message_id, None)
+
+    def scan(self, statuses=None):
+        with self.lock:
+            records = list(self.messages.values())
+        for record in records:
+            if statuses is None or record.status in statuses:
+                yield record.copy()
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite database in WAL mode, with status and operation_id indexed"""
+    name = 'sqlite'
+    indexed_find = True
+
+    def __init__(self, queue_dir):
+        super().__init__(queue_dir)
+        self.path = os.path.join(queue_dir, 'messages.db')
+        self.local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, operation_id TEXT, data TEXT NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS messages_status ON messages (status)")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS messages_operation ON messages (operation_id)"
+        )
+
+    def _connection(self):
+        # Connections cannot be shared between threads, nor carried across fork()
+        if getattr(self.local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    def _row(self, record):
+        return (record.id, record.status.label, record.operation_id, json.dumps(record.to_dict()))
+
+    def _record(self, row):
+        return MessageRecord.from_dict(json.loads(row[0])) if row else None
+
+    def put(self, record):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)", self._row(record)
+        )
+
+    def put_many(self, records):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)",
+                [self._row(record) for record in records]
+            )
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def get(self, message_id):
+        return self._record(self._connection().execute(
+            "SELECT data FROM messages WHERE id = ?", (message_id,)
+        ).fetchone())
+
+    def delete(self, message_id):
+        self._connection().execute("DELETE FROM messages WHERE id = ?", (message_id,))
+
+    def scan(self, statuses=None):
+        if statuses is None:
+            rows = self._connection().execute("SELECT data FROM messages").fetchall()
+        else:
+            placeholders = ", ".join("?" * len(statuses))
+            rows = self._connection().execute(
+                f"SELECT data FROM messages WHERE status IN ({placeholders})",
+                [status.label for status in statuses]
+            ).fetchall()
+        for row in rows:
+            yield self._record(row)
+
+    def scan_range(self, start_id=None, end_id=None, statuses=None):
+        # Served from the primary key index
+        conditions = []
+        parameters = []
+        if start_id is not None:
+            conditions.append("id >= ?")
+            parameters.append(start_id)
+        if end_id is not None:
+            conditions.append("id < ?")
+            parameters.append(end_id)
+        if statuses is not None:
+            conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+            parameters.extend(status.label for status in statuses)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        rows = self._connection().execute(
+            f"SELECT data FROM messages {where}ORDER BY id", parameters
+        ).fetchall()
+        for row in rows:
+            yield self._record(row)
+
+    def find(self, operation_id):
+        return self._record(self._connection().execute(
+            "SELECT data FROM messages WHERE operation_id = ? LIMIT 1", (operation_id,)
+        ).fetchone())
+
+    def backlog(self):
+        placeholders = ", ".join("?" * len(BACKLOG_STATUSES))
+        depth, size_bytes = self._connection().execute(
+            f"SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM messages "
+            f"WHERE status IN ({placeholders})", [status.label for status in BACKLOG_STATUSES]
+        ).fetchone()
+        return depth, size_bytes
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None and self.local.pid == os.getpid():
+            connection.close()
+        self.local = threading.local()
+
+
+class LMDBBackend(StorageBackend):
+    """Memory-mapped LMDB environment; reads never block and writes are serialized"""
+    name = 'lmdb'
+
+    def __init__(self, queue_dir):
+        if lmdb is None:
+            raise RuntimeError("The lmdb backend needs the lmdb package (pip install lmdb)")
+        super().__init__(queue_dir)
+        self.path = os.path.join(queue_dir, 'messages.lmdb')
+        self.env = None
+        self.owner_pid = None
+        self.lock = threading.Lock()
+        self._env()
+
+    def _env(self):
+        with self.lock:
+            if self.owner_pid != os.getpid():
+                # LMDB forbids using an environment after fork(), and the
+                # inherited one keeps this process from opening it again
+                if self.env is not None:
+                    raise RuntimeError(f"LMDB queue {self.path} was opened before fork(); "
+                                       f"open lmdb queues in the worker processes")
+                self.env = lmdb.open(self.path, map_size=LMDB_MAP_SIZE)
+                self.owner_pid = os.getpid()
+            return self.env
+
+    def put(self, record):
+        self.put_many([record])
+
+    def put_many(self, records):
+        with self._env().begin(write=True) as txn:
+            for record in records:
+                txn.put(record.id.encode(), json.dumps(record.to_dict()).encode())
+
+    def get(self, message_id):
+        with self._env().begin() as txn:
+            value = txn.get(message_id.encode())
+        return MessageRecord.from_dict(json.loads(value)) if value is not None else None
+
+    def delete(self, message_id):
+        with self._env().begin(write=True) as txn:
+            txn.delete(message_id.encode())
+
+    def scan(self, statuses=None):
+        with self._env().begin() as txn:
+            values = [value for _, value in txn.cursor()]
+        for value in values:
+            record = MessageRecord.from_dict(json.loads(value))
+            if statuses is None or record.status in statuses:
+                yield record
+
+    def scan_range(self, start_id=None, end_id=None, statuses=None):
+        # LMDB keeps keys sorted, so the cursor starts at start_id and stops at end_id
+        values = []
+        with self._env().begin() as txn:
+            cursor = txn.cursor()
+            found = cursor.set_range(start_id.encode()) if start_id is not None else cursor.first()
+            while found:
+                if end_id is not None and cursor.key() >= end_id.encode():
+                    break
+                values.append(cursor.value())
+                found = cursor.next()
+        for value in values:
+            record = MessageRecord.from_dict(json.loads(value))
+            if statuses is None or record.status in statuses:
+                yield record
+
+    def close(self):
+        if self.env is not None and self.owner_pid == os.getpid():
+            self.env.close()
+        self.env = None
+        self.owner_pid = None
+
+
+# Ring buffer file: a header page, then capacity slots of record_size bytes each
+RING_MAGIC = b'MOMR'
+RING_HEADER = struct.Struct('<4sIIIQQ')  # magic, version, capacity, record size, cursor, generation
+RING_HEADER_SIZE = 4096
+RING_CURSOR_OFFSET = 16
+RING_GENERATION_OFFSET = 24
+# The rest of the header page records which slot each recent write went to,
+# so other processes can catch up on changes without reading every slot
+RING_LOG_OFFSET = 64
+RING_LOG_SIZE = 1000
+LOG_ENTRY = struct.Struct('<I')
+# Slot header: sequence (odd while being written), MessageStatus value (0 for a
+# free slot), payload length, message ID
+SLOT_HEADER = struct.Struct('<QBxxxI64s')
+SLOT_STATUS_OFFSET = 8
+SEQUENCE = struct.Struct('<Q')
+SLOT_EMPTY = 0
+# Slots a new message may take over: free ones and finished messages
+RECLAIMABLE_SLOTS = (SLOT_EMPTY, MessageStatus.COMPLETED, MessageStatus.FAILED,
+                     MessageStatus.DEAD_LETTER)
+# Give up on a slot whose writer died halfway after this many torn reads
+MAX_READ_RETRIES = 1000
+
+
+class RingBufferBackend(StorageBackend):
+    """Fixed-size binary records in a file every process on the host maps into memory
+
+    Each slot holds one message. A new message takes the first slot after
+    the write cursor that is free or holds a finished message, so results
+    stay readable until the ring wraps around to them; StorageFullError is
+    raised when every slot is pending or processing. Writers are serialized
+    by the queue lock, and readers retry torn reads using the slot sequence
+    number instead of locking. Making a message pending writes a byte to a
+    FIFO in the queue directory, which wakes consumers blocked in
+    wait_for_messages right away.
+    """
+    name = 'ring'
+    notifies = True
+    concurrent_put = False
+
+    def __init__(self, queue_dir, capacity=None, record_size=None):
+        super().__init__(queue_dir)
+        self.path = os.path.join(queue_dir, 'ring.mmap')
+        self.fifo_path = os.path.join(queue_dir, '.ring.fifo')
+        capacity = capacity or RING_CAPACITY
+        record_size = record_size or RING_RECORD_SIZE
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Another process may be creating the same ring
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size < RING_HEADER_SIZE:
+                os.ftruncate(fd, RING_HEADER_SIZE + capacity * record_size)
+                os.pwrite(fd, RING_HEADER.pack(RING_MAGIC, 1, capacity, record_size, 0, 0), 0)
+            magic, _, self.capacity, self.record_size, _, _ = RING_HEADER.unpack(
+                os.pread(fd, RING_HEADER.size, 0)
+            )
+            if magic != RING_MAGIC:
+                raise ValueError(f"{self.path} is not a ring buffer queue")
+            self.map = mmap.mmap(fd, RING_HEADER_SIZE + self.capacity * self.record_size)
+        finally:
+            # The mapping keeps a duplicate of fd, so closing it would not release the flock
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self.max_payload = self.record_size - SLOT_HEADER.size
+
+        if hasattr(os, 'mkfifo'):
+            try:
+                os.mkfifo(self.fifo_path)
+            except FileExistsError:
+                pass
+        self.fifo_fd = None
+        self.fifo_pid = None
+
+        # Message ID -> slot and back, up to date as of synced_generation
+        self.index = {}
+        self.slots = {}
+        self.synced_generation = None
+        self.index_lock = threading.Lock()
+
+    def _offset(self, slot):
+        return RING_HEADER_SIZE + slot * self.record_size
+
+    def _generation(self):
+        return SEQUENCE.unpack_from(self.map, RING_GENERATION_OFFSET)[0]
+
+    def _statuses(self):
+        """The status byte of every slot, read in one go"""
+        start = RING_HEADER_SIZE + SLOT_STATUS_OFFSET
+        return self.map[start:start + self.capacity * self.record_size:self.record_size]
+
+    def _read_slot(self, slot, with_payload=True):
+        """Return (status, message_id, payload) of a slot without tearing"""
+        offset = self._offset(slot)
+        for _ in range(MAX_READ_RETRIES):
+            sequence, status, length, message_id = SLOT_HEADER.unpack_from(self.map, offset)
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            payload = None
+            if with_payload and status != SLOT_EMPTY:
+                start = offset + SLOT_HEADER.size
+                payload = self.map[start:start + min(length, self.max_payload)]
+            if SEQUENCE.unpack_from(self.map, offset)[0] == sequence:
+                return status, message_id.rstrip(b'\0').decode(), payload
+        return SLOT_EMPTY, '', None
+
+    def _index(self, slot, status, message_id):
+        old_id = self.slots.pop(slot, None)
+        if old_id is not None and self.index.get(old_id) == slot:
+            del self.index[old_id]
+        if status != SLOT_EMPTY:
+            self.index[message_id] = slot
+            self.slots[slot] = message_id
+
+    def _write_slot(self, slot, status, message_id, payload):
+        # Call with the queue lock held; writers are never concurrent
+        offset = self._offset(slot)
+        sequence = SEQUENCE.unpack_from(self.map, offset)[0] | 1
+        SEQUENCE.pack_into(self.map, offset, sequence)
+        start = offset + SLOT_HEADER.size
+        self.map[start:start + len(payload)] = payload
+        SLOT_HEADER.pack_into(self.map, offset, sequence + 1, status, len(payload),
+                              message_id.encode())
+
+        with self.index_lock:
+            generation = self._generation()
+            LOG_ENTRY.pack_into(self.map, RING_LOG_OFFSET + generation % RING_LOG_SIZE * 4, slot)
+            SEQUENCE.pack_into(self.map, RING_GENERATION_OFFSET, generation + 1)
+            if self.synced_generation == generation:
+                self.synced_generation = generation + 1
+                self._index(slot, status, message_id)
+
+    def _changed_slots(self, generation):
+        """Slots written since the index was synced, or None if the log no longer covers them"""
+        if self.synced_generation is None or generation - self.synced_generation > RING_LOG_SIZE:
+            return None
+        changed = {
+            LOG_ENTRY.unpack_from(self.map, RING_LOG_OFFSET + written % RING_LOG_SIZE * 4)[0]
+            for written in range(self.synced_generation, generation)
+        }
+        # Writers may have lapped the log while it was being read
+        if self._generation() - self.synced_generation > RING_LOG_SIZE:
+            return None
+        return changed
+
+    def _sync_index(self):
+        with self.index_lock:
+            generation = self._generation()
+            if generation == self.synced_generation:
+                return
+            changed = self._changed_slots(generation)
+            if changed is None:
+                self.index = {}
+                self.slots = {}
+                changed = [
+                    slot for slot, status in enumerate(self._statuses()) if status != SLOT_EMPTY
+                ]
+            for slot in changed:
+                status, message_id, _ = self._read_slot(slot, with_payload=False)
+                self._index(slot, status, message_id)
+            self.synced_generation = generation
+
+    def _find_slot(self, message_id):
+        with self.index_lock:
+            slot = self.index.get(message_id)
+        if slot is not None:
+            status, slot_id, _ = self._read_slot(slot, with_payload=False)
+            if status != SLOT_EMPTY and slot_id == message_id:
+                return slot
+        # Written or moved by another process since the index was synced
+        self._sync_index()
+        with self.index_lock:
+            return self.index.get(message_id)
+
+    def _claim_slot(self):
+        cursor = SEQUENCE.unpack_from(self.map, RING_CURSOR_OFFSET)[0]
+        statuses = self._statuses()
+        for step in range(self.capacity):
+            slot = (cursor + step) % self.capacity
+            if statuses[slot] in RECLAIMABLE_SLOTS:
+                SEQUENCE.pack_into(self.map, RING_CURSOR_OFFSET, (slot + 1) % self.capacity)
+                return slot
+        raise StorageFullError(f"All {self.capacity} slots of {self.path} hold unfinished messages")
+
+    def _store(self, record):
+        message_id = record.id
+        payload = json.dumps(record.to_dict()).encode()
+        if len(message_id.encode()) > 64:
+            raise ValueError(f"Message ID {message_id} is longer than 64 bytes")
+        if len(payload) > self.max_payload:
+            raise ValueError(f"Message {message_id} is {len(payload)} bytes; "
+                             f"ring records hold at most {self.max_payload}")
+
+        slot = self._find_slot(message_id)
+        if slot is None:
+            slot = self._claim_slot()
+        self._write_slot(slot, record.status, message_id, payload)
+        return record.status == MessageStatus.PENDING
+
+    def put(self, record):
+        if self._store(record):
+            self._notify()
+
+    def put_many(self, records):
+        if any([self._store(record) for record in records]):
+            self._notify()
+
+    def get(self, message_id):
+        slot = self._find_slot(message_id)
+        if slot is None:
+            return None
+        status, slot_id, payload = self._read_slot(slot)
+        if status == SLOT_EMPTY or slot_id != message_id:
+            return None
+        return MessageRecord.from_dict(json.loads(payload))
+
+    def delete(self, message_id):
+        slot = self._find_slot(message_id)
+        if slot is not None:
+            self._write_slot(slot, SLOT_EMPTY, '', b'')
+
+    def scan(self, statuses=None, start_id=None, end_id=None):
+        messages = []
+        for slot, status in enumerate(self._statuses()):
+            if status == SLOT_EMPTY or (statuses is not None and status not in statuses):
+                continue
+            status, message_id, payload = self._read_slot(slot)
+            if (status != SLOT_EMPTY and (statuses is None or status in statuses)
+                    and in_id_range(message_id, start_id, end_id)):
+                messages.append(payload)
+        for payload in messages:
+            yield MessageRecord.from_dict(json.loads(payload))
+
+    def scan_range(self, start_id=None, end_id=None, statuses=None):
+        yield from sorted(self.scan(statuses, start_id, end_id), key=lambda record: record.id)
+
+    def backlog(self):
+        depth = 0
+        size_bytes = 0
+        for slot, status in enumerate(self._statuses()):
+            if status in BACKLOG_STATUSES:
+                depth += 1
+                size_bytes += SLOT_HEADER.unpack_from(self.map, self._offset(slot))[2]
+        return depth, size_bytes
+
+    def _notify(self):
+        try:
+            fd = os.open(self.fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            # No consumer is waiting (ENXIO), or there is no FIFO on this platform
+            return
+        try:
+            os.write(fd, b'\0')
+        except OSError as e:
+            # A full FIFO already has wake-ups in it
+            if e.errno != errno.EAGAIN:
+                raise
+        finally:
+            os.close(fd)
+
+    def wait_for_messages(self, timeout):
+        if not os.path.exists(self.fifo_path):
+            return super().wait_for_messages(timeout)
+        if self.fifo_pid != os.getpid():
+            # Opened read-write so the FIFO never reports end-of-file when
+            # the last producer closes it
+            self.fifo_fd = os.open(self.fifo_path, os.O_RDWR | os.O_NONBLOCK)
+            self.fifo_pid = os.getpid()
+        readable, _, _ = select.select([self.fifo_fd], [], [], timeout)
+        if readable:
+            try:
+                while os.read(self.fifo_fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        if self.fifo_fd is not None and self.fifo_pid == os.getpid():
+            os.close(self.fifo_fd)
+        self.fifo_fd = None
+        self.fifo_pid = None
+        self.map.close()
+
+
+class CachedBackend(StorageBackend):
+    """Write-through copy of another backend in memory, indexed by status and operation_id
+
+    Only correct while this process is the only one using the queue, as the
+    broker server is: writes by other processes would not show up. Reads
+    never touch the underlying storage, and a dequeue looks only at the
+    pending messages.
+    """
+    shared = False
+    notifies = True
+    indexed_find = True
+
+    def __init__(self, backend):
+        super().__init__(backend.queue_dir)
+        self.backend = backend
+        self.name = backend.name
+        self.durable = backend.durable
+        self.concurrent_put = backend.concurrent_put
+        self.records = {}
+        self.by_status = {status: {} for status in MessageStatus}
+        self.operations = {}
+        self.lock = threading.Lock()
+        self.pending = threading.Condition(self.lock)
+        for record in backend.scan():
+            self._index(record)
+
+    def _index(self, record):
+        # Call with the lock held
+        self._unindex(record.id)
+        self.records[record.id] = record
+        self.by_status[record.status][record.id] = record
+        if record.operation_id is not None:
+            self.operations[record.operation_id] = record.id
+
+    def _unindex(self, message_id):
+        record = self.records.pop(message_id, None)
+        if record is not None:
+            del self.by_status[record.status][message_id]
+            if self.operations.get(record.operation_id) == message_id:
+                del self.operations[record.operation_id]
+
+    def put(self, record):
+        self.put_many([record])
+
+    def put_many(self, records):
+        self.backend.put_many(records)
+        with self.lock:
+            for record in records:
+                self._index(record.copy())
+            if any(record.status == MessageStatus.PENDING for record in records):
+                self.pending.notify_all()
+
+    def get(self, message_id):
+        with self.lock:
+            record = self.records.get(message_id)
+        return record.copy() if record is not None else None
+
+    def delete(self, message_id):
+        self.backend.delete(message_id)
+        with self.lock:
+            self._unindex(message_id)
+
+    def scan(self, statuses=None):
+        with self.lock:
+            if statuses is None:
+                records = list(self.records.values())
+            else:
+                records = [record for status in statuses
+                           for record in self.by_status[status].values()]
+        for record in records:
+            yield record.copy()
+
+    def find(self, operation_id):
+        with self.lock:
+            message_id = self.operations.get(operation_id)
+        return self.get(message_id) if message_id is not None else None
+
+    def wait_for_messages(self, timeout):
+        with self.lock:
+            if not self.by_status[MessageStatus.PENDING]:
+                self.pending.wait(timeout)
+
+    def close(self):
+        self.backend.close()
+
+
+BACKENDS = {
+    'file': FileBackend,
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend,
+    'lmdb': LMDBBackend,
+    'ring': RingBufferBackend
+}
+
+
+def open_backend(name, queue_dir):
+    """Create the storage backend called name for the queue in queue_dir"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown queue backend: {name}")
+    return BACKENDS[name](queue_dir)
@@ -0,0 +1,78 @@
+# test_api_gateway.py
+# Gateway requests against an in-process calculator service
+import time
+from concurrent import futures
+import grpc
+import pytest
+import calculator_pb2_grpc
+import api_gateway
+from load_balancer import EndpointPool
+from mom_implementation import MessageBroker
+from microservice_implementation import AdditionService
+
+
+@pytest.fixture
+def batched_addition(tmp_path, monkeypatch):
+    """Gateway client whose 'add' requests reach a micro-batching AdditionService"""
+    # Queues are created relative to the working directory, by a fresh broker
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(MessageBroker, "_instance", None)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    calculator_pb2_grpc.add_CalculatorServicer_to_server(AdditionService(batch_window=0.002), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    monkeypatch.setitem(api_gateway.endpoint_pools, "add", EndpointPool([f"localhost:{port}"]))
+    try:
+        yield api_gateway.app.test_client()
+    finally:
+        server.stop(0)
+
+
+@pytest.mark.parametrize("precision", ["float", "double"])
+def test_idempotent_retry_against_batched_service(batched_addition, precision):
+    body = {"operation": "add", "num1": 1.5, "num2": 2, "precision": precision}
+    headers = {"Idempotency-Key": f"retry-{precision}"}
+
+    first = batched_addition.post("/calculate", json=body, headers=headers)
+    retry = batched_addition.post("/calculate", json=body, headers=headers)
+    assert first.status_code == 200 and retry.status_code == 200
+    assert retry.get_json()["result"] == first.get_json()["result"] == 3.5
+
+    changed = batched_addition.post("/calculate", json=dict(body, num2=3), headers=headers)
+    assert changed.status_code == 422
+
+
+@pytest.mark.parametrize("expression", ["-" * 3000 + "1", "1+" * 999 + "1"])
+def test_deeply_nested_expression_is_rejected(expression):
+    response = api_gateway.app.test_client().post("/evaluate", json={"expression": expression})
+    assert response.status_code == 400
+    assert "nested too deeply" in response.get_json()["error"]
+
+
+class SlowlyFailingEvaluator(calculator_pb2_grpc.ExpressionEvaluatorServicer):
+    """Replica that fails every evaluation after a while"""
+    def Evaluate(self, request, context):
+        time.sleep(0.5)
+        context.abort(grpc.StatusCode.UNAVAILABLE, "overloaded")
+
+
+def test_evaluate_retries_share_one_deadline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(MessageBroker, "_instance", None)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    calculator_pb2_grpc.add_ExpressionEvaluatorServicer_to_server(SlowlyFailingEvaluator(), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    # Two replicas on one server: the retry reaches the second with 0.3s left
+    monkeypatch.setattr(api_gateway, "expression_pool",
+                        EndpointPool([f"localhost:{port}", f"127.0.0.1:{port}"]))
+    try:
+        start = time.monotonic()
+        response = api_gateway.app.test_client().post(
+            "/evaluate", json={"expression": "1 + 2", "timeout": 0.8})
+        elapsed = time.monotonic() - start
+    finally:
+        server.stop(0)
+
+    assert response.status_code == 504
+    assert elapsed < 1.0
@@ -0,0 +1,45 @@
+# test_expression_service.py
+# Recovery of queued evaluations while a calculator service is down
+import time
+import grpc
+import broker_client
+from mom_implementation import MessageQueue
+from expression_service import ExpressionService
+
+
+class Unavailable(grpc.RpcError):
+    def code(self):
+        return grpc.StatusCode.UNAVAILABLE
+
+
+class DownDispatcher:
+    """Dispatcher whose calculator services are all unreachable"""
+    def __init__(self):
+        self.calls = 0
+
+    def compute(self, operation, num1, num2, precision, digits, operation_id):
+        self.calls += 1
+        raise Unavailable()
+
+
+def test_recovery_backs_off_while_a_service_is_down(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # The memory backend wakes consumers as soon as a message is pending again
+    queue = MessageQueue("expressions", backend="memory")
+    monkeypatch.setattr(broker_client, "get_queue", lambda queue_name: queue)
+    dispatcher = DownDispatcher()
+    service = ExpressionService(dispatcher=dispatcher)
+    message_id = queue.enqueue({'expression': '1 + 2', 'variables': {}, 'precision': 'double',
+                                'digits': 0, 'operation': 'evaluate', 'operation_id': 'op-down'})
+
+    service.start_recovery(poll_interval=0.5)
+    try:
+        time.sleep(1.2)
+    finally:
+        service.stopped.set()
+
+    # One attempt per poll, not a busy loop against the down service
+    assert 1 <= dispatcher.calls <= 3
+    message_data = queue.get_message(message_id)
+    assert message_data['status'] == 'pending'
+    assert message_data['attempts'] <= 3
@@ -0,0 +1,25 @@
+# test_queue_conformance.py
+# Runs the storage backend conformance checks (queue_conformance.py) under pytest
+import pytest
+from storage_backends import BACKENDS
+from queue_conformance import backend_checks, queue_factory, backend_available
+
+CASES = [
+    pytest.param(backend, check, exclusive,
+                 id=f"{backend}{'-exclusive' if exclusive else ''}-{check.__name__}")
+    for backend in sorted(BACKENDS)
+    for exclusive in (False, True)
+    for check in backend_checks(backend, exclusive)
+]
+
+
+@pytest.mark.parametrize("backend, check, exclusive", CASES)
+def test_conformance(backend, check, exclusive, tmp_path, monkeypatch):
+    probe = tmp_path / "probe"
+    probe.mkdir()
+    unavailable = backend_available(backend, str(probe))
+    if unavailable:
+        pytest.skip(unavailable)
+    # Queues are created relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    check(queue_factory(backend, check, exclusive))
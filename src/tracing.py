@@ -0,0 +1,397 @@
+# Minimal distributed tracing: W3C trace context propagation and span export
+#
+# Enable with TRACE_EXPORTER=file (JSON lines in TRACE_FILE) or TRACE_EXPORTER=otlp
+# (OTLP/HTTP JSON to TRACE_OTLP_ENDPOINT). When disabled, spans cost one check.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import contextvars
+import urllib.request
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+import grpc
+
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'none')
+TRACE_FILE = os.environ.get('TRACE_FILE', 'traces.jsonl')
+TRACE_OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+SERVICE_NAME = os.environ.get(
+    'TRACE_SERVICE_NAME', os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+)
+
+TRACEPARENT_HEADER = 'traceparent'
+
+# A parent received from another process
+SpanContext = namedtuple('SpanContext', ['trace_id', 'span_id'])
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def parse_traceparent(value):
+    """Return the SpanContext of a W3C traceparent value, or None if it is malformed"""
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return SpanContext(parts[1], parts[2])
+
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_time', 'start',
+                 'attributes', 'error', 'ended')
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.ended = False
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, error):
+        if isinstance(error, grpc.RpcError) and hasattr(error, 'code'):
+            self.error = f"{error.code().name}: {error.details()}"
+        else:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.ended:
+            return
+        self.ended = True
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(self, time.perf_counter() - self.start)
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled"""
+    traceparent = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_NOOP_CONTEXT = nullcontext(NOOP_SPAN)
+
+
+def span_record(span, duration):
+    return {
+        "trace_id": span.trace_id,
+        "span_id": span.span_id,
+        "parent_id": span.parent_id,
+        "name": span.name,
+        "service": SERVICE_NAME,
+        "pid": os.getpid(),
+        "start": span.start_time,
+        "duration_ms": round(duration * 1000, 3),
+        "attributes": span.attributes,
+        "error": span.error
+    }
+
+
+class FileExporter:
+    """Appends one JSON line per span; processes may share the file"""
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        self.pid = None
+
+    def export(self, span, duration):
+        line = (json.dumps(span_record(span, duration), default=str) + '\n').encode()
+        if self.pid != os.getpid():
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self.pid = os.getpid()
+        # A single O_APPEND write keeps lines from different processes whole
+        os.write(self.fd, line)
+
+
+class OtlpHttpExporter:
+    """Posts spans in batches to an OTLP/HTTP collector (JSON encoding)"""
+    def __init__(self, endpoint, flush_interval=1.0, max_batch=512):
+        self.endpoint = endpoint
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.spans = []
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def export(self, span, duration):
+        with self.lock:
+            # The flushing thread does not survive fork()
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.spans = []
+                threading.Thread(target=self._flush_loop, daemon=True).start()
+            if len(self.spans) < self.max_batch * 10:
+                self.spans.append(span_record(span, duration))
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            with self.lock:
+                batch, self.spans = self.spans, []
+            for start in range(0, len(batch), self.max_batch):
+                self._post(batch[start:start + self.max_batch])
+
+    def _post(self, records):
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        spans = []
+        for record in records:
+            start_ns = int(record["start"] * 1e9)
+            otlp_span = {
+                "traceId": record["trace_id"],
+                "spanId": record["span_id"],
+                "name": record["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(record["duration_ms"] * 1e6)),
+                "attributes": [attribute(k, v) for k, v in record["attributes"].items()],
+                "status": {"code": 2, "message": record["error"]} if record["error"] else {}
+            }
+            if record["parent_id"]:
+                otlp_span["parentSpanId"] = record["parent_id"]
+            spans.append(otlp_span)
+
+        body = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "mom-grpc"}, "spans": spans}]
+        }]}).encode()
+        request = urllib.request.Request(
+            self.endpoint, data=body, headers={"Content-Type": "application/json"}
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            print(f"Could not export {len(spans)} spans to {self.endpoint}: {e}")
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    global _exporter
+    if TRACE_EXPORTER == 'none':
+        return None
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                if TRACE_EXPORTER == 'file':
+                    _exporter = FileExporter(TRACE_FILE)
+                elif TRACE_EXPORTER == 'otlp':
+                    _exporter = OtlpHttpExporter(TRACE_OTLP_ENDPOINT)
+                else:
+                    raise ValueError(f"Unknown TRACE_EXPORTER: {TRACE_EXPORTER}")
+    return _exporter
+
+
+def enabled():
+    return TRACE_EXPORTER != 'none'
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def start_span(name, parent=None, attributes=None):
+    """Start a span that the caller must end(); parent defaults to the current span
+
+    parent may be a Span, a SpanContext or a traceparent string.
+    """
+    if not enabled():
+        return NOOP_SPAN
+    if parent is None:
+        parent = _current_span.get()
+    elif isinstance(parent, str):
+        parent = parse_traceparent(parent)
+    if parent is None:
+        return Span(name, '%032x' % random.getrandbits(128), None, attributes)
+    return Span(name, parent.trace_id, parent.span_id, attributes)
+
+
+def activate(span):
+    """Make span the current one; returns a token for deactivate()"""
+    return _current_span.set(span if span is not NOOP_SPAN else None)
+
+
+def deactivate(token):
+    _current_span.reset(token)
+
+
+@contextmanager
+def span(name, parent=None, **attributes):
+    """Run the block inside a new span, recording any exception it raises"""
+    if not enabled():
+        yield NOOP_SPAN
+        return
+    new_span = start_span(name, parent, attributes)
+    token = activate(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.record_error(e)
+        raise
+    finally:
+        deactivate(token)
+        new_span.end()
+
+
+def child_span(name, **attributes):
+    """Like span(), but only recorded inside an existing trace
+
+    For frequent internal operations, such as idle queue polling, that are only
+    interesting as part of a request.
+    """
+    if _current_span.get() is None:
+        return _NOOP_CONTEXT
+    return span(name, **attributes)
+
+
+def traceparent():
+    """traceparent value for the current span, or None outside a trace"""
+    current = _current_span.get()
+    return current.traceparent if current is not None else None
+
+
+def grpc_metadata():
+    """Outgoing gRPC metadata carrying the current trace context"""
+    value = traceparent()
+    return ((TRACEPARENT_HEADER, value),) if value else None
+
+
+def metadata_traceparent(metadata):
+    for key, value in metadata or ():
+        if key == TRACEPARENT_HEADER:
+            return value
+    return None
+
+
+def _server_span_name(handler_call_details):
+    return "grpc.server " + handler_call_details.method.rsplit('/', 1)[-1]
+
+
+class TracingServerInterceptor(grpc.ServerInterceptor):
+    """Wraps unary gRPC handlers in a span continuing the caller's trace"""
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None or not enabled():
+            return handler
+
+        behavior = handler.unary_unary
+        parent = metadata_traceparent(handler_call_details.invocation_metadata)
+        name = _server_span_name(handler_call_details)
+
+        def traced(request, context):
+            with span(name, parent=parent):
+                return behavior(request, context)
+
+        return grpc.unary_unary_rpc_method_handler(
+            traced,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
+
+
+class AsyncTracingServerInterceptor(grpc.aio.ServerInterceptor):
+    """TracingServerInterceptor for grpc.aio servers"""
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None or not enabled():
+            return handler
+
+        behavior = handler.unary_unary
+        parent = metadata_traceparent(handler_call_details.invocation_metadata)
+        name = _server_span_name(handler_call_details)
+
+        async def traced(request, context):
+            with span(name, parent=parent):
+                return await behavior(request, context)
+
+        return grpc.unary_unary_rpc_method_handler(
+            traced,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
+
+
+def server_interceptors(use_async=False):
+    """Interceptors to pass to grpc.server()/grpc.aio.server(); none while disabled"""
+    if not enabled():
+        return None
+    if use_async:
+        return [AsyncTracingServerInterceptor()]
+    return [TracingServerInterceptor()]
+
+
+def print_traces(path, trace_id=None):
+    """Print every trace in a span file as an indented tree with durations"""
+    traces = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if trace_id is None or record["trace_id"] == trace_id:
+                traces.setdefault(record["trace_id"], []).append(record)
+
+    for spans in traces.values():
+        children = {}
+        span_ids = {record["span_id"] for record in spans}
+        for record in sorted(spans, key=lambda record: record["start"]):
+            parent = record["parent_id"] if record["parent_id"] in span_ids else None
+            children.setdefault(parent, []).append(record)
+        trace_start = min(record["start"] for record in spans)
+
+        def show(record, depth):
+            offset = (record["start"] - trace_start) * 1000
+            error = f"  ERROR {record['error']}" if record["error"] else ""
+            print(f"{'  ' * depth}{record['name']} [{record['service']}] "
+                  f"+{offset:.1f}ms {record['duration_ms']:.3f}ms{error}")
+            for child in children.get(record["span_id"], []):
+                show(child, depth + 1)
+
+        print(f"trace {spans[0]['trace_id']}")
+        for root in children.get(None, []):
+            show(root, 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show traces recorded with TRACE_EXPORTER=file")
+    parser.add_argument("file", nargs="?", default=TRACE_FILE, help="Span file (default: TRACE_FILE)")
+    parser.add_argument("--trace-id", help="Only show this trace")
+    args = parser.parse_args()
+    print_traces(args.file, args.trace_id)